@@ -0,0 +1,88 @@
+"""Benchmark: loading the cleaned data from CSV vs Parquet vs Feather.
+
+Writes the cleaned train frame (optionally replicated to more rows) in
+each format to a temporary directory, checks that
+``delivery.storage.read_cleaned_file`` gives identical frames for all
+three, and times a full load and a projected load of the columns a
+typical reader needs.
+
+    python benchmarks/bench_cleaned_formats.py --scale 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow.feather as feather
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from delivery.storage import load_cleaned, read_cleaned_file  # noqa: E402
+
+PROJECTED = ['ID', 'City', 'Order_Date', 'delivery_distance_km', 'Time_taken(min)']
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def readers(directory):
+    csv_path = os.path.join(directory, 'train_clean.csv')
+    parquet_path = os.path.join(directory, 'train_clean.parquet')
+    feather_path = os.path.join(directory, 'train_clean.feather')
+    return {
+        # CSV readers have to re-parse the date to get the typed frame back
+        'csv': (csv_path,
+                lambda: pd.read_csv(csv_path, parse_dates=['Order_Date']),
+                lambda: pd.read_csv(csv_path, usecols=PROJECTED, parse_dates=['Order_Date'])),
+        'parquet': (parquet_path,
+                    lambda: pd.read_parquet(parquet_path),
+                    lambda: pd.read_parquet(parquet_path, columns=PROJECTED)),
+        'feather': (feather_path,
+                    lambda: feather.read_feather(feather_path),
+                    lambda: feather.read_feather(feather_path, columns=PROJECTED)),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1, help="Replicate the cleaned train frame N times")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = load_cleaned('train')
+    if args.scale > 1:
+        df = pd.concat([df] * args.scale, ignore_index=True)
+    print(f"Rows: {len(df):,}  Columns: {len(df.columns)}\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        df.to_csv(os.path.join(directory, 'train_clean.csv'), index=False)
+        df.to_parquet(os.path.join(directory, 'train_clean.parquet'), index=False)
+        feather.write_feather(df, os.path.join(directory, 'train_clean.feather'))
+
+        # The storage readers must give the same frame whichever format they read
+        frames = {fmt: read_cleaned_file(path) for fmt, (path, _, _) in readers(directory).items()}
+        for fmt in ['csv', 'feather']:
+            pd.testing.assert_frame_equal(frames['parquet'], frames[fmt], check_exact=True)
+        del frames
+
+        results = {}
+        for fmt, (path, full, projected) in readers(directory).items():
+            results[fmt] = {
+                'size_mb': os.path.getsize(path) / 1e6,
+                'full_s': best_of(full, args.repeat),
+                'projected_s': best_of(projected, args.repeat),
+            }
+
+    print(f"{'Format':<10}{'Size (MB)':>12}{'Full load (s)':>16}{'5 columns (s)':>16}{'Speedup':>10}")
+    for fmt, r in results.items():
+        speedup = results['csv']['full_s'] / r['full_s']
+        print(f"{fmt:<10}{r['size_mb']:>12.1f}{r['full_s']:>16.3f}{r['projected_s']:>16.3f}{speedup:>9.1f}x")
+    print("[CSV, Parquet and Feather reads identical]")
@@ -0,0 +1,78 @@
+"""Benchmark: sklearn tree ensemble predict vs the flat NumPy engine by batch size.
+
+Trains the 50-tree, depth-12 random forest on the cleaned training data
+(or, with ``--bundle``, uses the CURRENT bundle's model), exports it with
+``FlatForest.from_model`` and times both engines on batches of encoded
+rows, reporting the time per call, rows/s, the speedup and the largest
+difference between their predictions. Run after 06_ml_model_training.py.
+
+    python benchmarks/bench_flat_forest.py --batch-sizes 1 100 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from delivery.bundle import ModelBundle  # noqa: E402
+from delivery.flat_forest import FlatForest  # noqa: E402
+from delivery.storage import load_cleaned  # noqa: E402
+
+TARGET = 'Time_taken(min)'
+
+
+def train_forest(X, y):
+    from sklearn.ensemble import RandomForestRegressor
+
+    forest = RandomForestRegressor(n_estimators=50, max_depth=12, random_state=42, n_jobs=-1)
+    return forest.fit(X, y)
+
+
+def time_call(predict, X, min_seconds):
+    """Best time of repeated calls, repeating for at least ``min_seconds`` (and 3 calls)."""
+    best, total, calls = float('inf'), 0.0, 0
+    while calls < 3 or total < min_seconds:
+        start = time.perf_counter()
+        predict(X)
+        seconds = time.perf_counter() - start
+        best, total, calls = min(best, seconds), total + seconds, calls + 1
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 100_000])
+    parser.add_argument('--bundle', action='store_true', help="Use the CURRENT bundle's model")
+    parser.add_argument('--min-seconds', type=float, default=1.0, help="Time spent per measurement")
+    args = parser.parse_args()
+
+    bundle = ModelBundle()
+    train = load_cleaned('train').dropna(subset=[TARGET])
+    X_train = bundle.preprocessor.transform(train)
+    if args.bundle:
+        name, model = bundle.name, bundle.model
+        if bundle.scaled:
+            X_train = pd.DataFrame(bundle.scaler.transform(X_train), columns=X_train.columns)
+    else:
+        name, model = 'Random Forest (50 trees)', train_forest(X_train, train[TARGET])
+
+    start = time.perf_counter()
+    flat = FlatForest.from_model(model)
+    export_seconds = time.perf_counter() - start
+    print(f"Model: {name}  ({flat.n_trees} trees, {flat.n_nodes:,} nodes, depth {flat.depth}, "
+          f"exported in {export_seconds * 1000:.1f} ms)\n")
+
+    print(f"{'Rows':>8}{'Engine':>10}{'ms/call':>12}{'Rows/s':>14}{'Speedup':>10}{'Max |diff|':>13}")
+    for rows in args.batch_sizes:
+        X = pd.concat([X_train] * -(-rows // len(X_train)), ignore_index=True).iloc[:rows]
+        diff = np.abs(model.predict(X) - flat.predict(X)).max()
+        sklearn_seconds = time_call(model.predict, X, args.min_seconds)
+        flat_seconds = time_call(flat.predict, X, args.min_seconds)
+        for engine, seconds in [('sklearn', sklearn_seconds), ('flat', flat_seconds)]:
+            speedup = f"{sklearn_seconds / seconds:>9.1f}x" if engine == 'flat' else f"{'':>10}"
+            max_diff = f"{diff:>13.1e}" if engine == 'flat' else ''
+            print(f"{rows:>8,}{engine:>10}{seconds * 1000:>12.3f}{rows / seconds:>14,.0f}{speedup}{max_diff}")
@@ -0,0 +1,96 @@
+"""Benchmark: cold start of the model from a pickle vs the memory-mapped bundle.
+
+Saves the CURRENT bundle's model (and, with ``--forest``, the old
+50-tree, depth-12 random forest trained on the cleaned data) as a pickle
+and as a bundle, then times loading each one in a fresh interpreter and
+reports the resident memory it added (Linux). Run after
+06_ml_model_training.py.
+
+    python benchmarks/bench_model_load.py --forest
+"""
+import argparse
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python')
+sys.path.insert(0, PYTHON_DIR)
+
+from delivery.bundle import ModelBundle, save_bundle  # noqa: E402
+
+# Runs in a fresh interpreter: import cost is excluded, load time and RSS growth are printed
+LOADER = '''
+import os, sys, time
+sys.path.insert(0, {python_dir!r})
+import pickle
+import sklearn.ensemble
+from delivery.bundle import ModelBundle
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+before = rss()
+start = time.perf_counter()
+if {kind!r} == 'pickle':
+    with open({path!r}, 'rb') as f:
+        model = pickle.load(f)
+else:
+    model = ModelBundle({path!r}, mmap_mode={mmap!r}, verify={verify!r}).model
+seconds = time.perf_counter() - start
+print(seconds, (rss() - before) / 2**20)
+'''
+
+
+def cold_load(kind, path, mmap=None, verify=False, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        code = LOADER.format(python_dir=PYTHON_DIR, kind=kind, path=path, mmap=mmap, verify=verify)
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        seconds, rss_mb = map(float, out.stdout.split())
+        timings.append((seconds, rss_mb))
+    return min(timings)
+
+
+def train_forest():
+    from sklearn.ensemble import RandomForestRegressor
+    from delivery.storage import load_cleaned
+
+    bundle = ModelBundle()
+    train = load_cleaned('train').dropna(subset=['Time_taken(min)'])
+    X = bundle.preprocessor.transform(train)
+    forest = RandomForestRegressor(n_estimators=50, max_depth=12, random_state=42, n_jobs=-1)
+    return forest.fit(X, train['Time_taken(min)'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--forest', action='store_true',
+                        help="Also compare the 50-tree random forest the pipeline used to save")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    current = ModelBundle()
+    models = {current.name: (current.model, current.scaled)}
+    if args.forest:
+        models['Random Forest (50 trees)'] = (train_forest(), False)
+
+    print(f"{'Model':<28}{'Format':<22}{'Size (MB)':>10}{'Load (s)':>10}{'RSS (MB)':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (model, scaled) in models.items():
+            pickle_path = os.path.join(directory, 'model.pkl')
+            with open(pickle_path, 'wb') as f:
+                pickle.dump(model, f)
+            bundle_path = save_bundle(model, current.scaler, current.preprocessor, name, scaled=scaled,
+                                      directory=os.path.join(directory, 'bundles'))
+            bundle_size = os.path.getsize(os.path.join(bundle_path, 'model.joblib'))
+
+            rows = [
+                ('pickle', os.path.getsize(pickle_path), cold_load('pickle', pickle_path, repeat=args.repeat)),
+                ('bundle (mmap)', bundle_size, cold_load('bundle', bundle_path, 'r', repeat=args.repeat)),
+                ('bundle (mmap, verify)', bundle_size,
+                 cold_load('bundle', bundle_path, 'r', verify=True, repeat=args.repeat)),
+                ('bundle (in memory)', bundle_size, cold_load('bundle', bundle_path, repeat=args.repeat)),
+            ]
+            for fmt, size, (seconds, rss_mb) in rows:
+                print(f"{name:<28}{fmt:<22}{size / 1e6:>10.2f}{seconds:>10.4f}{rss_mb:>10.1f}")
@@ -0,0 +1,87 @@
+"""Benchmark: prediction server latency and throughput with and without micro-batching.
+
+Starts ``PredictionServer`` in-process on a free port and sends raw test
+orders from concurrent keep-alive HTTP clients, once with batching off
+(``max_batch=1``) and once with micro-batching. Prints client-side
+p50/p99 latency, requests per second and the mean batch size. Run after
+06_ml_model_training.py.
+
+    python benchmarks/bench_prediction_server.py --clients 16 --requests 2000
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from delivery.serving import DEFAULT_MAX_BATCH, DEFAULT_MAX_WAIT_MS, OrderPredictor, PredictionServer  # noqa: E402
+
+RAW_TEST = 'data/raw data/test.csv'
+
+
+def client(port, bodies, latencies):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    for body in bodies:
+        start = time.perf_counter()
+        connection.request('POST', '/predict', body, {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+    connection.close()
+
+
+def run(predictor, bodies, clients, max_batch, max_wait_ms):
+    server = PredictionServer(predictor, port=0, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.server_address[1]
+
+    latencies = []
+    threads = [threading.Thread(target=client, args=(port, bodies[i::clients], latencies))
+               for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    seconds = time.perf_counter() - start
+
+    server.shutdown()
+    server.server_close()
+    latencies = np.array(latencies) * 1000
+    return {
+        'p50_ms': np.percentile(latencies, 50),
+        'p99_ms': np.percentile(latencies, 99),
+        'rps': len(latencies) / seconds,
+        'mean_batch': server.batcher.summary()['mean_batch'],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent HTTP connections")
+    parser.add_argument('--requests', type=int, default=2000, help="Single-order requests per configuration")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    orders = [{key: None if isinstance(value, float) and math.isnan(value) else value
+               for key, value in order.items()} for order in pd.read_csv(RAW_TEST).to_dict('records')]
+    bodies = [json.dumps(orders[i % len(orders)]) for i in range(args.requests)]
+    predictor = OrderPredictor()
+    print(f"Requests: {args.requests:,}  Clients: {args.clients}  Model: {predictor.bundle.name}\n")
+
+    print(f"{'Configuration':<28}{'p50 (ms)':>10}{'p99 (ms)':>10}{'Req/s':>10}{'Mean batch':>12}")
+    for label, max_batch in [('no batching', 1), (f"micro-batch <= {args.max_batch}", args.max_batch)]:
+        r = run(predictor, bodies, args.clients, max_batch, args.max_wait_ms)
+        print(f"{label:<28}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['rps']:>10.0f}{r['mean_batch']:>12.1f}")
@@ -0,0 +1,240 @@
+"""Benchmark suite: the pipeline scripts on synthetic raw orders at growing sizes.
+
+For each size, writes ``train.csv`` (N rows) and ``test.csv`` (N / 4
+rows) with ``delivery.synthetic`` into a scratch workspace and runs the
+cleaning (``clean_delivery_data``), SQL load, SQL analytics, training and
+``07_predictions.py`` scoring scripts there, each as its own process, so
+the repository's data and models are never touched. Every stage reports
+wall time, rows/s and the peak resident memory of its process, plus the
+steps it recorded with ``delivery.instrument``. A stage that fails or
+times out is recorded as such and the stages that need its outputs are
+skipped, so the size at which a stage stops scaling is visible.
+
+``--save`` writes the results as a JSON baseline; ``--compare`` checks a
+run against one and exits with status 1 when a stage got slower or
+bigger than ``--tolerance`` allows, or no longer completes.
+
+    python benchmarks/bench_scale.py --sizes 100000 1000000 10000000 --save benchmarks/scale_baseline.json
+    python benchmarks/bench_scale.py --sizes 100000 --compare benchmarks/scale_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import pyarrow.parquet as pq
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(REPO_DIR, 'python'))
+
+from delivery.instrument import read_steps  # noqa: E402
+from delivery.model_selection import DEFAULT_FOLDS  # noqa: E402
+from delivery.pipeline import RAW_TEST, RAW_TRAIN, STAGES, upstream  # noqa: E402
+from delivery.storage import cleaned_path  # noqa: E402
+from delivery.synthetic import write_orders  # noqa: E402
+
+DEFAULT_SIZES = [100_000, 1_000_000, 10_000_000]
+SUITE_STAGES = ['clean', 'load_sql', 'sql_analytics', 'train', 'predict']
+DEFAULT_BASELINE = 'benchmarks/scale_baseline.json'
+DEFAULT_TOLERANCE = 0.25
+TEST_FRACTION = 0.25
+# Directories the scripts write into without creating them
+WORKSPACE_DIRS = ['data/raw data', 'data/cleaned data', 'docs/reports']
+
+
+def make_workspace(root, size):
+    directory = os.path.join(root, f"rows_{size}")
+    for path in WORKSPACE_DIRS + ['logs']:
+        os.makedirs(os.path.join(directory, path), exist_ok=True)
+    os.symlink(os.path.abspath(os.path.join(REPO_DIR, 'sql')), os.path.join(directory, 'sql'))
+    return directory
+
+
+def parquet_rows(path):
+    return pq.ParquetFile(path).metadata.num_rows if os.path.exists(path) else None
+
+
+def stage_rows(name, workspace, raw_rows):
+    """Rows a stage works through: raw rows for cleaning, cleaned rows after it."""
+    train = parquet_rows(os.path.join(workspace, cleaned_path('train')))
+    test = parquet_rows(os.path.join(workspace, cleaned_path('test')))
+    if name == 'clean':
+        return raw_rows
+    if name == 'train':
+        return train
+    if name == 'predict':
+        return test
+    return None if train is None or test is None else train + test
+
+
+def run_stage(stage, workspace, extra_args, timeout, run_id):
+    """Run one script in ``workspace``; returns (status, seconds, peak RSS in MB)."""
+    env = {**os.environ, 'DELIVERY_STEPS_FILE': os.path.join(workspace, 'steps.jsonl'),
+           'DELIVERY_RUN_ID': run_id}
+    command = [sys.executable, os.path.join(os.path.abspath(REPO_DIR), stage.script), *stage.args, *extra_args]
+    with open(os.path.join(workspace, 'logs', f"{stage.name}.log"), 'w') as log_file:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=workspace, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+        timer = threading.Timer(timeout, process.kill) if timeout else None
+        if timer is not None:
+            timer.start()
+        # wait4 gives this child's own peak RSS (ru_maxrss, KB on Linux)
+        _, wait_status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(wait_status)
+        timed_out = timer is not None and not timer.is_alive()
+        if timer is not None:
+            timer.cancel()
+    peak_mb = usage.ru_maxrss / (2**20 if sys.platform == 'darwin' else 2**10)
+    status = 'timeout' if timed_out and process.returncode != 0 else 'ok' if process.returncode == 0 else 'failed'
+    return status, seconds, round(peak_mb, 1)
+
+
+def recorded_steps(workspace, script):
+    path = os.path.join(workspace, 'steps.jsonl')
+    if not os.path.exists(path):
+        return []
+    steps = read_steps(path)
+    steps = steps[steps['script'] == os.path.basename(script)]
+    return [{key: (None if value != value else value) for key, value in row.items()}
+            for row in steps[['step', 'parent', 'wall_s', 'peak_rss_mb', 'rows']].to_dict('records')]
+
+
+def run_size(size, args, root):
+    workspace = make_workspace(root, size)
+    test_size = int(size * TEST_FRACTION)
+    start = time.perf_counter()
+    write_orders(os.path.join(workspace, RAW_TRAIN), size, seed=args.seed)
+    write_orders(os.path.join(workspace, RAW_TEST), test_size, seed=args.seed + 1, start_id=size, target=False)
+    generate_seconds = time.perf_counter() - start
+    print(f"\n{size:,} train + {test_size:,} test rows (generated in {generate_seconds:.1f}s)")
+
+    extra_args = {
+        'clean': ['--stream'] if args.stream_clean else [],
+        'train': ['--folds', str(args.folds), '--no-tuned'],
+    }
+    stages = {stage.name: stage for stage in STAGES}
+    depends_on = upstream(STAGES)
+    results = {}
+    for name in args.stages:
+        blocked = [dep for dep in depends_on[name] if dep in results and results[dep]['status'] != 'ok']
+        if blocked:
+            results[name] = {'status': 'skipped', 'reason': f"{', '.join(blocked)} did not complete"}
+            print(f"  {name:<14}{'skipped':>10}")
+            continue
+        status, seconds, peak_mb = run_stage(stages[name], workspace, extra_args.get(name, []),
+                                             args.timeout, run_id=f"bench-{size}")
+        rows = stage_rows(name, workspace, size + test_size)
+        results[name] = {
+            'status': status,
+            'seconds': round(seconds, 3),
+            'rows': rows,
+            'rows_per_second': round(rows / seconds, 1) if rows and status == 'ok' else None,
+            'peak_rss_mb': peak_mb,
+            'steps': recorded_steps(workspace, stages[name].script),
+        }
+        rate = f"{results[name]['rows_per_second']:>12,.0f}" if results[name]['rows_per_second'] else f"{'':>12}"
+        print(f"  {name:<14}{status:>10}{seconds:>10.1f}{rate}{peak_mb:>12,.0f}")
+
+    if not args.keep:
+        shutil.rmtree(workspace, ignore_errors=True)
+    return {'train_rows': size, 'test_rows': test_size, 'generate_seconds': round(generate_seconds, 3),
+            'stages': results}
+
+
+def environment():
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'numpy': numpy.__version__, 'pandas': pandas.__version__, 'sklearn': sklearn.__version__,
+            'commit': commit}
+
+
+def compare(current, baseline, tolerance):
+    """Lines describing every stage that regressed against ``baseline`` (empty when none did)."""
+    regressions = []
+    for size, result in current['results'].items():
+        before = baseline['results'].get(size)
+        if before is None:
+            continue
+        for name, stage in result['stages'].items():
+            old = before['stages'].get(name)
+            if old is None or old['status'] != 'ok':
+                continue
+            label = f"{int(size):,} rows / {name}"
+            if stage['status'] != 'ok':
+                regressions.append(f"{label}: {stage['status']} (baseline completed)")
+                continue
+            if old.get('rows_per_second') and stage['rows_per_second'] < old['rows_per_second'] * (1 - tolerance):
+                regressions.append(f"{label}: {stage['rows_per_second']:,.0f} rows/s vs "
+                                   f"{old['rows_per_second']:,.0f} in the baseline")
+            if stage['peak_rss_mb'] > old['peak_rss_mb'] * (1 + tolerance):
+                regressions.append(f"{label}: peak RSS {stage['peak_rss_mb']:,.0f} MB vs "
+                                   f"{old['peak_rss_mb']:,.0f} MB in the baseline")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Training rows per run")
+    parser.add_argument('--stages', nargs='+', choices=[stage.name for stage in STAGES], default=SUITE_STAGES)
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic orders")
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS, help="Cross-validation folds for training")
+    parser.add_argument('--stream-clean', action='store_true', help="Clean chunk by chunk (02 --stream)")
+    parser.add_argument('--timeout', type=float, default=None, help="Seconds a stage may run before it is killed")
+    parser.add_argument('--workdir', default=None, help="Where the scratch workspaces go (default: a temp dir)")
+    parser.add_argument('--keep', action='store_true', help="Keep each size's workspace (data, logs, steps)")
+    parser.add_argument('--save', nargs='?', const=DEFAULT_BASELINE, default=None, metavar='PATH',
+                        help=f"Write the results as a baseline (default path: {DEFAULT_BASELINE})")
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, default=None, metavar='PATH',
+                        help="Fail when a stage regressed against this baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative drop in rows/s and growth in peak memory")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+
+    root = tempfile.mkdtemp(prefix='bench_scale_', dir=args.workdir)
+    print(f"Workspace: {root}")
+    print(f"\n  {'Stage':<14}{'Status':>10}{'Seconds':>10}{'Rows/s':>12}{'Peak MB':>12}")
+    results = {'created': datetime.now().isoformat(timespec='seconds'), 'environment': environment(),
+               'seed': args.seed, 'folds': args.folds, 'stream_clean': args.stream_clean, 'results': {}}
+    try:
+        for size in args.sizes:
+            results['results'][str(size)] = run_size(size, args, root)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[Saved baseline: {args.save}]")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"\nCompared with {args.compare} ({baseline['environment'].get('commit')}, "
+              f"tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        if not regressions:
+            print("  no regressions")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,74 @@
+"""Benchmark: sharded scoring throughput against the number of worker processes.
+
+Replicates the cleaned test data to a larger Parquet file and scores it
+with the CURRENT model bundle, single-process (``StreamingScorer``) and
+with ``ShardedScorer`` on 2, 4, ... workers up to the CPU count, printing
+rows/s, speedup and parallel efficiency. Run after
+06_ml_model_training.py.
+
+    python benchmarks/bench_sharded_scoring.py --scale 50 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from delivery.bundle import ModelBundle  # noqa: E402
+from delivery.model_selection import DEFAULT_WORKERS  # noqa: E402
+from delivery.scoring import DEFAULT_BATCH_SIZE, ShardedScorer, StreamingScorer  # noqa: E402
+from delivery.storage import load_cleaned  # noqa: E402
+
+
+def worker_counts(limit):
+    counts = [1]
+    while counts[-1] * 2 <= limit:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != limit:
+        counts.append(limit)
+    return counts
+
+
+def quiet(message):
+    pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=20, help="Replicate the cleaned test data N times")
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help=f"Worker counts to run (default: powers of two up to {DEFAULT_WORKERS})")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    bundle = ModelBundle()
+    df = load_cleaned('test')
+    df = pd.concat([df] * args.scale, ignore_index=True)
+    print(f"Rows: {len(df):,}  Model: {bundle.name} ({bundle.version})  CPUs: {DEFAULT_WORKERS}\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, 'orders.parquet')
+        df.to_parquet(input_path, index=False, row_group_size=args.batch_size)
+        del df
+
+        print(f"{'Workers':>8}{'Seconds':>10}{'Rows/s':>12}{'Speedup':>10}{'Efficiency':>12}")
+        baseline = None
+        for workers in args.workers or worker_counts(DEFAULT_WORKERS):
+            output_path = os.path.join(directory, f"scored_{workers}.csv")
+            if workers == 1:
+                scorer = StreamingScorer(bundle, input_path, output_path, args.batch_size, log=quiet)
+            else:
+                scorer = ShardedScorer(bundle, input_path, output_path, args.batch_size,
+                                       workers=workers, log=quiet)
+            start = time.perf_counter()
+            run = scorer.run()
+            seconds = time.perf_counter() - start
+            rate = run['rows_scored'] / seconds
+            baseline = baseline or rate
+            print(f"{workers:>8}{seconds:>10.2f}{rate:>12,.0f}{rate / baseline:>9.2f}x"
+                  f"{rate / baseline / workers:>11.0%}")
+            os.remove(output_path)
@@ -0,0 +1,69 @@
+"""Benchmark: DataFrame.to_sql vs the bulk SQLite loader.
+
+Loads the cleaned train and test frames (optionally replicated, with
+unique IDs) into throwaway databases with both paths and reports rows
+per second. The bulk timing includes building the schema's indexes,
+which the to_sql path never creates.
+
+    python benchmarks/bench_sql_load.py --scale 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from delivery.database import bulk_load  # noqa: E402
+from delivery.storage import load_cleaned  # noqa: E402
+
+
+def replicate(df, scale):
+    if scale <= 1:
+        return df
+    copies = []
+    for i in range(scale):
+        copy = df.copy()
+        copy['ID'] = copy['ID'].astype(str) + f"_{i}"
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def load_with_to_sql(frames, path):
+    engine = create_engine(f'sqlite:///{path}')
+    frames[0].to_sql('deliveries', engine, if_exists='replace', index=False, chunksize=1000)
+    for frame in frames[1:]:
+        frame.to_sql('deliveries', engine, if_exists='append', index=False, chunksize=1000)
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    train = replicate(load_cleaned('train'), args.scale).rename(columns={'Time_taken(min)': 'Time_taken_min'})
+    test = replicate(load_cleaned('test'), args.scale)
+    test['Time_taken_min'] = None
+    rows = len(train) + len(test)
+    print(f"Rows: {rows:,}\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        load_with_to_sql([train, test], os.path.join(directory, 'to_sql.db'))
+        to_sql_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stats = bulk_load([train, test], path=os.path.join(directory, 'bulk.db'))
+        bulk_seconds = time.perf_counter() - start
+
+    print(f"{'Path':<28}{'Seconds':>10}{'Rows/sec':>14}")
+    print(f"{'to_sql (no indexes)':<28}{to_sql_seconds:>10.2f}{rows / to_sql_seconds:>14,.0f}")
+    print(f"{'bulk (+ 8 indexes)':<28}{bulk_seconds:>10.2f}{rows / bulk_seconds:>14,.0f}")
+    print(f"{'bulk insert only':<28}{stats['insert_seconds']:>10.2f}{rows / stats['insert_seconds']:>14,.0f}")
+    print(f"{'bulk index build':<28}{stats['index_seconds']:>10.2f}")
+    print(f"Speedup: {to_sql_seconds / bulk_seconds:.1f}x")
@@ -0,0 +1,92 @@
+"""Micro-benchmark: per-row string passes vs per-distinct-value cleaning.
+
+Compares the chained ``.str`` / ``to_numeric`` / ``to_datetime`` / ``.dt``
+calls clean_delivery_data used on the raw text, number and date columns
+with the factorize-based helpers in ``delivery.features``, on synthetic
+raw orders from ``delivery.synthetic``, and checks the outputs are
+identical.
+
+    python benchmarks/bench_text_cleaning.py --rows 1000000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from delivery import features  # noqa: E402
+from delivery.synthetic import generate_orders  # noqa: E402
+
+DATE_FORMAT = '%d-%m-%Y'
+
+
+def legacy_cleaning(raw):
+    """The per-row implementation clean_delivery_data used before factorizing."""
+    out = pd.DataFrame(index=raw.index)
+    out['Delivery_person_Age'] = pd.to_numeric(raw['Delivery_person_Age'], errors='coerce').astype(float)
+    out['Delivery_person_Ratings'] = pd.to_numeric(raw['Delivery_person_Ratings'], errors='coerce')
+    taken = raw['Time_taken(min)'].astype(str).str.extract(r'(\d+)')[0]
+    out['Time_taken(min)'] = pd.to_numeric(taken, errors='coerce')
+    weather = raw['Weatherconditions'].str.replace('conditions ', '', regex=False)
+    out['Weatherconditions'] = weather.str.strip().str.title()
+    out['Road_traffic_density'] = raw['Road_traffic_density'].str.strip().str.title()
+    out['Vehicle_condition'] = raw['Vehicle_condition'].astype(str).str.strip()
+    out['City'] = raw['City'].str.strip().str.title()
+    out['multiple_deliveries'] = pd.to_numeric(raw['multiple_deliveries'], errors='coerce').fillna(0).astype(int)
+    dates = pd.to_datetime(raw['Order_Date'], format=DATE_FORMAT, errors='coerce')
+    out['Order_Date'] = dates
+    out['order_year'] = dates.dt.year
+    out['order_month'] = dates.dt.month
+    out['order_day'] = dates.dt.day
+    out['order_dayofweek'] = dates.dt.dayofweek
+    out['order_week'] = dates.dt.isocalendar().week
+    out['day_name'] = dates.dt.day_name()
+    return out
+
+
+def distinct_cleaning(raw):
+    out = pd.DataFrame(index=raw.index)
+    out['Delivery_person_Age'] = features.to_numeric(raw['Delivery_person_Age']).astype(float)
+    out['Delivery_person_Ratings'] = features.to_numeric(raw['Delivery_person_Ratings'])
+    out['Time_taken(min)'] = features.extract_minutes(raw['Time_taken(min)'])
+    out['Weatherconditions'] = features.clean_text(raw['Weatherconditions'], prefix='conditions ')
+    out['Road_traffic_density'] = features.clean_text(raw['Road_traffic_density'])
+    out['Vehicle_condition'] = features.strip_text(raw['Vehicle_condition'])
+    out['City'] = features.clean_text(raw['City'])
+    out['multiple_deliveries'] = features.to_numeric(raw['multiple_deliveries']).fillna(0).astype(int)
+    dates = features.parse_dates(raw['Order_Date'], format=DATE_FORMAT)
+    out['Order_Date'] = dates
+    for col, values in features.date_parts(dates).items():
+        out[col] = values
+    return out
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    # Round-trip through CSV so the columns have the dtypes read_csv gives the raw dump
+    raw = generate_orders(args.rows, seed=42)
+    raw = pd.read_csv(io.StringIO(raw.to_csv(index=False)))
+
+    legacy, legacy_seconds = timed(legacy_cleaning, raw)
+    distinct, distinct_seconds = timed(distinct_cleaning, raw)
+
+    pd.testing.assert_frame_equal(legacy, distinct, check_exact=True)
+
+    print(f"Rows: {args.rows:,}")
+    print(f"  Per-row string passes: {legacy_seconds:8.3f} s")
+    print(f"  Per distinct value:    {distinct_seconds:8.3f} s")
+    print(f"  Speedup:               {legacy_seconds / distinct_seconds:8.1f}x")
+    print("[Outputs identical]")
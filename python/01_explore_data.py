@@ -3,14 +3,18 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from delivery.instrument import step
+
 print("=" * 60)
 print("FOOD DELIVERY DATASET - INITIAL EXPLORATION")
 print("=" * 60)
 
 # Load all files
-train = pd.read_csv('data/raw data/train.csv')
-test = pd.read_csv('data/raw data/test.csv')
-sample = pd.read_csv('data/raw data/Sample_Submission.csv')
+with step('read_csv') as timing:
+    train = pd.read_csv('data/raw data/train.csv')
+    test = pd.read_csv('data/raw data/test.csv')
+    sample = pd.read_csv('data/raw data/Sample_Submission.csv')
+    timing.rows = len(train) + len(test) + len(sample)
 
 # Convert columns to numeric for analysis
 train['Time_taken(min)'] = pd.to_numeric(train['Time_taken(min)'], errors='coerce')
@@ -57,7 +61,8 @@ print(f"Age range: {train['Delivery_person_Age'].min():.0f} - {train['Delivery_p
 print(f"Average rating: {train['Delivery_person_Ratings'].mean():.2f}")
 
 print(f"\n[DATE RANGE]:")
-train['Order_Date'] = pd.to_datetime(train['Order_Date'], format='%d-%m-%Y', errors='coerce')
+with step('to_datetime', rows=len(train)):
+    train['Order_Date'] = pd.to_datetime(train['Order_Date'], format='%d-%m-%Y', errors='coerce')
 print(f"From: {train['Order_Date'].min()}")
 print(f"To: {train['Order_Date'].max()}")
 print(f"Duration: {(train['Order_Date'].max() - train['Order_Date'].min()).days} days")
@@ -1,274 +1,147 @@
+import argparse
 import pandas as pd
-import numpy as np
-from datetime import datetime
-import re
 
-print("Starting data cleaning and feature engineering...\n")
-
-# ============================================
-# LOAD DATA
-# ============================================
-train = pd.read_csv('data/raw data/train.csv')
-test = pd.read_csv('data/raw data/test.csv')
+from delivery.cleaning import (DEFAULT_CHUNKSIZE, STATS_PATH, clean_delivery_data,
+                               compute_cleaning_stats, load_cleaning_stats,
+                               save_cleaning_stats, stream_clean_csv,
+                               summarize_target_counts)
+from delivery.dtypes import compact_dtypes, memory_bytes, memory_report
+from delivery.instrument import step
+from delivery.storage import FORMATS, CleanedWriter, cleaned_path, save_cleaned
+
+parser = argparse.ArgumentParser(description="Clean the raw delivery CSVs and engineer features.")
+parser.add_argument('--stream', action='store_true',
+                    help="Clean the raw CSVs chunk by chunk instead of loading them whole")
+parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                    help="Rows per chunk in streaming mode")
+parser.add_argument('--stats-file', default=None,
+                    help="Reuse saved train statistics instead of a first pass over train.csv")
+parser.add_argument('--formats', default='parquet',
+                    help=f"Comma-separated output formats ({', '.join(FORMATS)}); e.g. parquet,csv")
+args = parser.parse_args()
+
+formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+for fmt in formats:
+    if fmt not in FORMATS:
+        parser.error(f"unknown format: {fmt}")
+
+TRAIN_RAW = 'data/raw data/train.csv'
+TEST_RAW = 'data/raw data/test.csv'
 
-print(f"Loaded train: {len(train):,} rows")
-print(f"Loaded test: {len(test):,} rows")
+print("Starting data cleaning and feature engineering...\n")
 
 # ============================================
-# FUNCTION: Clean dataset
+# GLOBAL STATISTICS (first pass or saved file)
 # ============================================
-def clean_delivery_data(df, is_train=True):
-    df = df.copy()
-    
-    print(f"\n{'='*60}")
-    print(f"CLEANING {'TRAIN' if is_train else 'TEST'} DATASET")
-    print(f"{'='*60}")
-    
-    # 0. CONVERT STRING COLUMNS TO NUMERIC
-    print("\n[Step 0: Converting Data Types...]")
-    
-    # Convert Age to numeric
-    if 'Delivery_person_Age' in df.columns:
-        df['Delivery_person_Age'] = pd.to_numeric(df['Delivery_person_Age'], errors='coerce')
-    
-    # Convert Ratings to numeric
-    if 'Delivery_person_Ratings' in df.columns:
-        df['Delivery_person_Ratings'] = pd.to_numeric(df['Delivery_person_Ratings'], errors='coerce')
-    
-    # Convert Time_taken to numeric - extract numbers first if needed
-    if 'Time_taken(min)' in df.columns:
-        # First, extract just the numbers from the string (e.g., "30 min" -> 30)
-        df['Time_taken(min)'] = df['Time_taken(min)'].astype(str).str.extract(r'(\d+)')[0]
-        # Then convert to numeric
-        df['Time_taken(min)'] = pd.to_numeric(df['Time_taken(min)'], errors='coerce')
-    
-    # 1. HANDLE MISSING VALUES
-    print("\n[Step 1: Handling Missing Values...]")
-    print(f"Missing values before: {df.isnull().sum().sum()}")
-    
-    # Fill missing ages with median
-    if 'Delivery_person_Age' in df.columns:
-        df['Delivery_person_Age'].fillna(df['Delivery_person_Age'].median(), inplace=True)
-    
-    # Fill missing ratings with mean
-    if 'Delivery_person_Ratings' in df.columns:
-        df['Delivery_person_Ratings'].fillna(df['Delivery_person_Ratings'].mean(), inplace=True)
-    
-    # Fill categorical with mode
-    cat_cols = ['Weatherconditions', 'Road_traffic_density', 'Type_of_order', 
-                'Type_of_vehicle', 'City', 'Festival']
-    for col in cat_cols:
-        if col in df.columns and df[col].isnull().sum() > 0:
-            df[col].fillna(df[col].mode()[0], inplace=True)
-    
-    print(f"Missing values after: {df.isnull().sum().sum()}")
-    
-    # 2. CLEAN TEXT FIELDS
-    print("\n[Step 2: Cleaning Text Fields...]")
-    
-    # Remove 'conditions ' prefix from weather if present
-    if 'Weatherconditions' in df.columns:
-        df['Weatherconditions'] = df['Weatherconditions'].str.replace('conditions ', '', regex=False)
-        df['Weatherconditions'] = df['Weatherconditions'].str.strip().str.title()
-    
-    # Clean traffic density
-    if 'Road_traffic_density' in df.columns:
-        df['Road_traffic_density'] = df['Road_traffic_density'].str.strip().str.title()
-    
-    # Clean vehicle condition
-    if 'Vehicle_condition' in df.columns:
-        df['Vehicle_condition'] = df['Vehicle_condition'].astype(str).str.strip()
-    
-    # Clean city names
-    if 'City' in df.columns:
-        df['City'] = df['City'].str.strip().str.title()
-    
-    # 3. FIX DATA TYPES
-    print("\n[Step 3: Converting Data Types...]")
-    
-    # Convert Order_Date
-    df['Order_Date'] = pd.to_datetime(df['Order_Date'], format='%d-%m-%Y', errors='coerce')
-    
-    # Convert Time columns (they might be in format "11:50" or similar)
-    if 'Time_Orderd' in df.columns:
-        df['Time_Orderd'] = pd.to_datetime(df['Time_Orderd'], format='%H:%M', errors='coerce').dt.time
-    
-    if 'Time_Order_picked' in df.columns:
-        df['Time_Order_picked'] = pd.to_datetime(df['Time_Order_picked'], format='%H:%M', errors='coerce').dt.time
-    
-    # Convert Festival to boolean
-    if 'Festival' in df.columns:
-        df['Festival'] = df['Festival'].map({'Yes': 1, 'No': 0})
-    
-    # Convert multiple_deliveries to int
-    if 'multiple_deliveries' in df.columns:
-        df['multiple_deliveries'] = pd.to_numeric(df['multiple_deliveries'], errors='coerce').fillna(0).astype(int)
-    
-    # 4. FEATURE ENGINEERING
-    print("\n[Step 4: Creating New Features...]")
-    
-    # Extract date/time features
-    df['order_year'] = df['Order_Date'].dt.year
-    df['order_month'] = df['Order_Date'].dt.month
-    df['order_day'] = df['Order_Date'].dt.day
-    df['order_dayofweek'] = df['Order_Date'].dt.dayofweek
-    df['order_week'] = df['Order_Date'].dt.isocalendar().week
-    
-    # Day names
-    df['day_name'] = df['Order_Date'].dt.day_name()
-    
-    # Weekend flag
-    df['is_weekend'] = df['order_dayofweek'].isin([5, 6]).astype(int)
-    
-    # Extract hour from Time_Orderd
-    if 'Time_Orderd' in df.columns:
-        df['order_hour'] = pd.to_datetime(df['Time_Orderd'].astype(str), format='%H:%M:%S', errors='coerce').dt.hour
-        
-        # Time period
-        def get_time_period(hour):
-            if pd.isna(hour):
-                return 'Unknown'
-            if 6 <= hour < 12:
-                return 'Morning'
-            elif 12 <= hour < 17:
-                return 'Afternoon'
-            elif 17 <= hour < 21:
-                return 'Evening'
-            else:
-                return 'Night'
-        
-        df['time_period'] = df['order_hour'].apply(get_time_period)
-        
-        # Peak hours (lunch: 12-2pm, dinner: 7-9pm)
-        df['is_peak_hour'] = df['order_hour'].isin([12, 13, 19, 20]).astype(int)
-    
-    # Calculate distance using Haversine formula
-    def haversine_distance(lat1, lon1, lat2, lon2):
-        """Calculate distance between two points on Earth in km"""
-        R = 6371  # Earth's radius in km
-        
-        lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-        c = 2 * np.arcsin(np.sqrt(a))
-        distance = R * c
-        
-        return distance
-    
-    print("   Calculating delivery distances...")
-    df['delivery_distance_km'] = haversine_distance(
-        df['Restaurant_latitude'],
-        df['Restaurant_longitude'],
-        df['Delivery_location_latitude'],
-        df['Delivery_location_longitude']
-    )
-    
-    # Distance categories
-    df['distance_category'] = pd.cut(
-        df['delivery_distance_km'],
-        bins=[0, 2, 5, 10, 100],
-        labels=['Very Close (<2km)', 'Close (2-5km)', 'Medium (5-10km)', 'Far (>10km)']
-    )
-    
-    # Age groups
-    if 'Delivery_person_Age' in df.columns:
-        df['age_group'] = pd.cut(
-            df['Delivery_person_Age'],
-            bins=[0, 25, 35, 45, 100],
-            labels=['Young (18-25)', 'Mid (26-35)', 'Senior (36-45)', 'Veteran (45+)']
-        )
-    
-    # Rating categories
-    if 'Delivery_person_Ratings' in df.columns:
-        df['rating_category'] = pd.cut(
-            df['Delivery_person_Ratings'],
-            bins=[0, 3.5, 4.0, 4.5, 5.0],
-            labels=['Low (<3.5)', 'Average (3.5-4.0)', 'Good (4.0-4.5)', 'Excellent (4.5+)']
-        )
-    
-    # Weather severity
-    weather_severity = {
-        'Sunny': 1,
-        'Cloudy': 1,
-        'Fog': 2,
-        'Windy': 2,
-        'Sandstorms': 3,
-        'Stormy': 3
-    }
-    if 'Weatherconditions' in df.columns:
-        df['weather_severity'] = df['Weatherconditions'].map(weather_severity).fillna(1)
-    
-    # Traffic density mapping
-    traffic_mapping = {
-        'Low': 1,
-        'Medium': 2,
-        'High': 3,
-        'Jam': 4
+if args.stats_file:
+    train_stats = load_cleaning_stats(args.stats_file)
+    print(f"Loaded train statistics: {args.stats_file}")
+else:
+    train_stats = None
+
+if args.stream:
+    # ============================================
+    # STREAMING MODE: clean chunk by chunk
+    # ============================================
+    print(f"[Streaming mode: {args.chunksize:,} rows per chunk]")
+
+    if train_stats is None:
+        with step('cleaning_stats'):
+            train_stats = compute_cleaning_stats(pd.read_csv(TRAIN_RAW, chunksize=args.chunksize))
+    with step('stream_clean_train') as timing, CleanedWriter('train', formats) as writer:
+        train_summary = stream_clean_csv(TRAIN_RAW, writer, is_train=True,
+                                         stats=train_stats, chunksize=args.chunksize)
+        timing.rows = train_summary['rows_in']
+    with step('stream_clean_test') as timing, CleanedWriter('test', formats) as writer:
+        test_summary = stream_clean_csv(TEST_RAW, writer, is_train=False,
+                                        stats=train_stats, chunksize=args.chunksize)
+        timing.rows = test_summary['rows_in']
+
+    target = summarize_target_counts(train_summary['target_counts'])
+    train_rows, train_clean_rows = train_summary['rows_in'], train_summary['rows_out']
+    test_clean_rows = test_summary['rows_out']
+    train_columns = train_summary['columns']
+    unique_counts = {col: len(values) for col, values in train_summary['uniques'].items()}
+    train_missing, test_missing = train_summary['missing'], test_summary['missing']
+    date_min, date_max = train_summary['date_min'], train_summary['date_max']
+    memory_before = train_summary['memory_before'] + test_summary['memory_before']
+    memory_after = train_summary['memory_after'] + test_summary['memory_after']
+
+    print(f"Cleaned train: {train_rows:,} -> {train_clean_rows:,} rows")
+    print(f"Cleaned test: {test_summary['rows_in']:,} -> {test_clean_rows:,} rows")
+else:
+    # ============================================
+    # LOAD DATA
+    # ============================================
+    with step('read_csv') as timing:
+        train = pd.read_csv(TRAIN_RAW)
+        test = pd.read_csv(TEST_RAW)
+        timing.rows = len(train) + len(test)
+
+    print(f"Loaded train: {len(train):,} rows")
+    print(f"Loaded test: {len(test):,} rows")
+
+    # ============================================
+    # CLEAN BOTH DATASETS
+    # ============================================
+    if train_stats is None:
+        with step('cleaning_stats', rows=len(train)):
+            train_stats = compute_cleaning_stats([train])
+
+    with step('clean_train', rows=len(train)):
+        train_clean = clean_delivery_data(train, is_train=True, stats=train_stats)
+    # Test is imputed with the train statistics, like any new order would be
+    with step('clean_test', rows=len(test)):
+        test_clean = clean_delivery_data(test, is_train=False, stats=train_stats)
+
+    # ============================================
+    # COMPACT DTYPES
+    # ============================================
+    with step('compact_dtypes', rows=len(train_clean) + len(test_clean)):
+        train_compact = compact_dtypes(train_clean)
+        test_compact = compact_dtypes(test_clean)
+    memory_before = memory_bytes(train_clean) + memory_bytes(test_clean)
+    memory_after = memory_bytes(train_compact) + memory_bytes(test_compact)
+
+    converted = memory_report(train_clean, train_compact)
+    converted = converted[converted['dtype_before'] != converted['dtype_after']]
+    print(f"\n[Compact dtypes: {len(converted)} train columns converted]")
+    for col, row in converted.iterrows():
+        print(f"   {col:<24}{row['dtype_before']:>10} -> {row['dtype_after']:<10}"
+              f"{row['mb_before']:8.2f} MB -> {row['mb_after']:6.2f} MB")
+    train_clean, test_clean = train_compact, test_compact
+
+    # ============================================
+    # SAVE CLEANED DATA
+    # ============================================
+    print(f"\n[Saving cleaned datasets...]")
+    with step('save_cleaned', rows=len(train_clean) + len(test_clean)):
+        save_cleaned(train_clean, 'train', formats)
+        save_cleaned(test_clean, 'test', formats)
+
+    target = {
+        'min': train_clean['Time_taken(min)'].min(),
+        'max': train_clean['Time_taken(min)'].max(),
+        'mean': train_clean['Time_taken(min)'].mean(),
+        'median': train_clean['Time_taken(min)'].median(),
     }
-    if 'Road_traffic_density' in df.columns:
-        df['traffic_level'] = df['Road_traffic_density'].map(traffic_mapping).fillna(2)
-    
-    # 5. HANDLE OUTLIERS (only for train set with target)
-    if is_train and 'Time_taken(min)' in df.columns:
-        print("\n[Step 5: Handling Outliers in Target Variable...]")
-        
-        # Clean Time_taken - remove "(min)" text if present
-        if df['Time_taken(min)'].dtype == 'object':
-            df['Time_taken(min)'] = df['Time_taken(min)'].str.extract(r'(\d+)').astype(float)
-        
-        # Only process if we have valid Time_taken values
-        if df['Time_taken(min)'].notna().sum() > 0:
-            Q1 = df['Time_taken(min)'].quantile(0.25)
-            Q3 = df['Time_taken(min)'].quantile(0.75)
-            IQR = Q3 - Q1
-            
-            # Only remove extreme outliers at 99th percentile
-            outliers = df[(df['Time_taken(min)'] > df['Time_taken(min)'].quantile(0.99))]
-            print(f"   Extreme outliers detected: {len(outliers):,} ({100*len(outliers)/len(df):.2f}%)")
-            df = df[df['Time_taken(min)'] <= df['Time_taken(min)'].quantile(0.99)]
-            print(f"   After removing extremes: {len(df):,} rows")
-        else:
-            print("   No valid Time_taken values to process for outliers")
-        
-        # Delivery speed category
-        def categorize_speed(minutes):
-            if minutes <= 20:
-                return 'Very Fast'
-            elif minutes <= 30:
-                return 'Fast'
-            elif minutes <= 40:
-                return 'Normal'
-            elif minutes <= 50:
-                return 'Slow'
-            else:
-                return 'Very Slow'
-        
-        df['delivery_speed'] = df['Time_taken(min)'].apply(categorize_speed)
-    
-    print(f"\n[CLEANING COMPLETE: {len(df):,} rows × {len(df.columns)} columns]")
-    
-    return df
+    train_rows, train_clean_rows, test_clean_rows = len(train), len(train_clean), len(test_clean)
+    train_columns = len(train_clean.columns)
+    unique_counts = {col: train_clean[col].nunique() for col in
+                     ['City', 'Weatherconditions', 'Road_traffic_density', 'Type_of_order', 'Type_of_vehicle']}
+    train_missing, test_missing = train_clean.isnull().sum().sum(), test_clean.isnull().sum().sum()
+    date_min, date_max = train_clean['Order_Date'].min(), train_clean['Order_Date'].max()
 
-# ============================================
-# CLEAN BOTH DATASETS
-# ============================================
-
-train_clean = clean_delivery_data(train, is_train=True)
-test_clean = clean_delivery_data(test, is_train=False)
-
-# ============================================
-# SAVE CLEANED DATA
-# ============================================
+save_cleaning_stats(train_stats, STATS_PATH)
 
-print(f"\n[Saving cleaned datasets...]")
-train_clean.to_csv('data/cleaned data/train_clean.csv', index=False)
-test_clean.to_csv('data/cleaned data/test_clean.csv', index=False)
+print(f"\nMemory of the cleaned frames: {memory_before / 2**20:,.1f} MB -> {memory_after / 2**20:,.1f} MB "
+      f"({memory_before / max(memory_after, 1):.1f}x smaller)")
 
 print(f"\n[Files saved:]")
-print(f"   - data/cleaned data/train_clean.csv ({len(train_clean):,} rows)")
-print(f"   - data/cleaned data/test_clean.csv ({len(test_clean):,} rows)")
+for fmt in formats:
+    print(f"   - {cleaned_path('train', fmt)} ({train_clean_rows:,} rows)")
+    print(f"   - {cleaned_path('test', fmt)} ({test_clean_rows:,} rows)")
+print(f"   - {STATS_PATH}")
 
 # ============================================
 # CREATE DATA SUMMARY REPORT
@@ -281,15 +154,15 @@ DATA CLEANING & FEATURE ENGINEERING REPORT
 
 TRAIN DATASET:
 --------------
-Original rows: {len(train):,}
-Cleaned rows: {len(train_clean):,}
-Columns: {len(train_clean.columns)}
+Original rows: {train_rows:,}
+Cleaned rows: {train_clean_rows:,}
+Columns: {train_columns}
 
 Target Variable (Time_taken):
-  Min: {train_clean['Time_taken(min)'].min():.2f} minutes
-  Max: {train_clean['Time_taken(min)'].max():.2f} minutes
-  Mean: {train_clean['Time_taken(min)'].mean():.2f} minutes
-  Median: {train_clean['Time_taken(min)'].median():.2f} minutes
+  Min: {target['min']:.2f} minutes
+  Max: {target['max']:.2f} minutes
+  Mean: {target['mean']:.2f} minutes
+  Median: {target['median']:.2f} minutes
 
 NEW FEATURES CREATED:
 ---------------------
@@ -302,18 +175,23 @@ Severity Scores: weather_severity, traffic_level
 
 CATEGORICAL DISTRIBUTIONS:
 --------------------------
-Cities: {train_clean['City'].nunique()}
-Weather conditions: {train_clean['Weatherconditions'].nunique()}
-Traffic densities: {train_clean['Road_traffic_density'].nunique()}
-Order types: {train_clean['Type_of_order'].nunique()}
-Vehicle types: {train_clean['Type_of_vehicle'].nunique()}
+Cities: {unique_counts['City']}
+Weather conditions: {unique_counts['Weatherconditions']}
+Traffic densities: {unique_counts['Road_traffic_density']}
+Order types: {unique_counts['Type_of_order']}
+Vehicle types: {unique_counts['Type_of_vehicle']}
 
 MISSING VALUES:
 ---------------
-Train: {train_clean.isnull().sum().sum()} missing values
-Test: {test_clean.isnull().sum().sum()} missing values
+Train: {train_missing} missing values
+Test: {test_missing} missing values
+
+MEMORY (train + test, compact dtypes):
+--------------------------------------
+Before: {memory_before / 2**20:,.1f} MB
+After: {memory_after / 2**20:,.1f} MB
 
-Date Range: {train_clean['Order_Date'].min()} to {train_clean['Order_Date'].max()}
+Date Range: {date_min} to {date_max}
 
 {'='*60}
 """
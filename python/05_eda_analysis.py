@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -6,20 +5,22 @@ from scipy import stats
 import warnings
 warnings.filterwarnings('ignore')
 
+from delivery.instrument import step
+from delivery.storage import load_cleaned
+
 print("="*70)
 print("EXPLORATORY DATA ANALYSIS - DELIVERY TIME PREDICTION")
 print("="*70)
 
 # Load cleaned data
-train = pd.read_csv('data/cleaned data/train_clean.csv')
-test = pd.read_csv('data/cleaned data/test_clean.csv')
+with step('read_cleaned') as timing:
+    train = load_cleaned('train')
+    test = load_cleaned('test', columns=['ID'])
+    timing.rows = len(train) + len(test)
 
 print(f"\nDataset Shapes:")
 print(f"  Training: {train.shape}")
-print(f"  Test: {test.shape}")
-
-# Convert Order_Date to datetime if not already
-train['Order_Date'] = pd.to_datetime(train['Order_Date'], errors='coerce')
+print(f"  Test: {len(test):,} rows")
 
 # ============================================
 # 1. TARGET VARIABLE ANALYSIS
@@ -49,7 +50,8 @@ axes[1].boxplot(target)
 axes[1].set_title('Boxplot of Delivery Time')
 axes[1].set_ylabel('Time (minutes)')
 plt.tight_layout()
-plt.savefig('docs/reports/01_target_distribution.png', dpi=100, bbox_inches='tight')
+with step('save_target_distribution'):
+    plt.savefig('docs/reports/01_target_distribution.png', dpi=100, bbox_inches='tight')
 plt.close()
 print(f"\n[Saved: docs/reports/01_target_distribution.png]")
 
@@ -103,7 +105,8 @@ sns.heatmap(correlation_matrix, cmap='coolwarm', center=0, ax=ax,
             square=True, linewidths=0.5, cbar_kws={"shrink": 0.8})
 plt.title('Correlation Matrix of Numerical Features')
 plt.tight_layout()
-plt.savefig('docs/reports/02_correlation_heatmap.png', dpi=100, bbox_inches='tight')
+with step('save_correlation_heatmap'):
+    plt.savefig('docs/reports/02_correlation_heatmap.png', dpi=100, bbox_inches='tight')
 plt.close()
 print(f"\n[Saved: docs/reports/02_correlation_heatmap.png]")
 
@@ -120,7 +123,7 @@ axes = axes.ravel()
 plot_idx = 0
 for col in categorical_features[:6]:
     if col in train.columns and train[col].nunique() > 0:
-        train.groupby(col)['Time_taken(min)'].mean().sort_values(ascending=False).plot(
+        train.groupby(col, observed=True)['Time_taken(min)'].mean().sort_values(ascending=False).plot(
             kind='bar', ax=axes[plot_idx], color='steelblue')
         axes[plot_idx].set_title(f'Average Delivery Time by {col}')
         axes[plot_idx].set_xlabel(col)
@@ -129,7 +132,8 @@ for col in categorical_features[:6]:
         plot_idx += 1
 
 plt.tight_layout()
-plt.savefig('docs/reports/03_categorical_impact.png', dpi=100, bbox_inches='tight')
+with step('save_categorical_impact'):
+    plt.savefig('docs/reports/03_categorical_impact.png', dpi=100, bbox_inches='tight')
 plt.close()
 print(f"\n[Saved: docs/reports/03_categorical_impact.png]")
 
@@ -185,7 +189,8 @@ ax.set_ylabel('Avg Delivery Time (minutes)')
 ax.grid(True, alpha=0.3)
 ax.legend()
 plt.tight_layout()
-plt.savefig('docs/reports/04_time_series_trend.png', dpi=100, bbox_inches='tight')
+with step('save_time_series_trend'):
+    plt.savefig('docs/reports/04_time_series_trend.png', dpi=100, bbox_inches='tight')
 plt.close()
 print(f"\n[Saved: docs/reports/04_time_series_trend.png]")
 
@@ -1,25 +1,55 @@
+import argparse
+import os
 import pandas as pd
-import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
 from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-import pickle
 import warnings
 warnings.filterwarnings('ignore')
 
+from delivery.bundle import save_bundle
+from delivery.cleaning import STATS_PATH, load_cleaning_stats
+from delivery.instrument import step
+from delivery.model_selection import (CV_RESULTS_PATH, DEFAULT_FOLDS, DEFAULT_WORKERS, VALIDATION_PREDICTIONS_PATH,
+                                      run_tournament, save_validation_predictions, summarize_folds)
+from delivery.preprocessing import DeliveryPreprocessor
+from delivery.storage import load_cleaned
+from delivery.tuning import (DEFAULT_CANDIDATES, SEARCH_SPACES, TUNED_PARAMS_PATH, TUNING_STATE_PATH,
+                             load_tuned_params, save_tuned_params, successive_halving)
+
+parser = argparse.ArgumentParser(description="Train and select the delivery time model.")
+parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS,
+                    help="Cross-validation folds the best-model decision is based on")
+parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                    help="Worker processes running (model, fold) fits at the same time")
+parser.add_argument('--tune', nargs='*', default=None, metavar='MODEL',
+                    help="Tune these models (default: all tunable ones) by successive halving first")
+parser.add_argument('--tune-candidates', type=int, default=DEFAULT_CANDIDATES,
+                    help="Configurations sampled per model; the budget is a few full fits either way")
+parser.add_argument('--tune-fresh', action='store_true',
+                    help=f"Restart the search instead of resuming from {TUNING_STATE_PATH}")
+parser.add_argument('--no-tuned', action='store_true',
+                    help=f"Train with the default parameters, ignoring {TUNED_PARAMS_PATH}")
+args = parser.parse_args()
+
+# Results, tuning state and validation predictions are all written here
+os.makedirs('ml_models/saved_models', exist_ok=True)
+
 print("="*70)
 print("ML MODEL TRAINING - DELIVERY TIME PREDICTION")
 print("="*70)
 
 # Load cleaned data
-train_data = pd.read_csv('data/cleaned data/train_clean.csv')
-test_data = pd.read_csv('data/cleaned data/test_clean.csv')
+with step('read_cleaned') as timing:
+    train_data = load_cleaned('train')
+    test_data = load_cleaned('test', columns=['ID'])
+    timing.rows = len(train_data) + len(test_data)
 
 print(f"\nData Loaded:")
 print(f"  Training: {train_data.shape}")
-print(f"  Test: {test_data.shape}")
+print(f"  Test: {len(test_data):,} rows")
 
 # ============================================
 # 1. DATA PREPARATION
@@ -32,30 +62,18 @@ print("="*70)
 train_data = train_data.dropna(subset=['Time_taken(min)']).reset_index(drop=True)
 print(f"\nTraining data after removing missing targets: {len(train_data):,} rows")
 
-# Separate features and target
-X_train = train_data.drop(['Time_taken(min)', 'ID'], axis=1)
-y_train = train_data['Time_taken(min)']
-
-# Handle categorical variables
-categorical_cols = X_train.select_dtypes(include=['object']).columns.tolist()
-print(f"\nCategorical features to encode: {len(categorical_cols)}")
-
-# Label encode categorical features
-label_encoders = {}
-X_train_encoded = X_train.copy()
+# Fit the shared preprocessing (encoding, column drops, NaN filling) on train
+cleaning_stats = load_cleaning_stats(STATS_PATH) if os.path.exists(STATS_PATH) else None
+with step('fit_preprocessor', rows=len(train_data)):
+    preprocessor = DeliveryPreprocessor(cleaning_stats).fit(train_data)
 
-for col in categorical_cols:
-    le = LabelEncoder()
-    X_train_encoded[col] = le.fit_transform(X_train[col].astype(str))
-    label_encoders[col] = le
+print(f"\nCategorical features to encode: {len(preprocessor.categorical_cols)}")
+for col, le in preprocessor.label_encoders.items():
     print(f"  Encoded {col}: {len(le.classes_)} unique values")
 
-# Drop date and time features that are already encoded or have all NaN values
-cols_to_drop = ['Order_Date', 'Time_Orderd', 'Time_Order_picked', 'Festival', 'order_hour']
-X_train_encoded = X_train_encoded.drop([col for col in cols_to_drop if col in X_train_encoded.columns], axis=1)
-
-# Handle remaining NaN values by filling with median
-X_train_encoded = X_train_encoded.fillna(X_train_encoded.median())
+with step('encode', rows=len(train_data)):
+    X_train_encoded = preprocessor.transform(train_data)
+y_train = train_data['Time_taken(min)']
 
 print(f"\nFinal feature count: {X_train_encoded.shape[1]}")
 print(f"Features: {list(X_train_encoded.columns)}")
@@ -66,10 +84,10 @@ print(f"\nTrain/Validation split:")
 print(f"  Training: {X_tr.shape[0]:,} samples")
 print(f"  Validation: {X_val.shape[0]:,} samples")
 
-# Scale features
+# Scaler for the linear model, saved for prediction; the tournament
+# fits the same scaling inside every split
 scaler = StandardScaler()
-X_tr_scaled = scaler.fit_transform(X_tr)
-X_val_scaled = scaler.transform(X_val)
+scaler.fit(X_tr)
 
 # ============================================
 # 2. MODEL TRAINING
@@ -81,39 +99,71 @@ print("="*70)
 models = {
     'Linear Regression': LinearRegression(),
     'Random Forest': RandomForestRegressor(n_estimators=50, max_depth=12, random_state=42, n_jobs=-1),
-    'Gradient Boosting': GradientBoostingRegressor(n_estimators=50, learning_rate=0.1, max_depth=4, random_state=42)
+    'Gradient Boosting': GradientBoostingRegressor(n_estimators=50, learning_rate=0.1, max_depth=4, random_state=42),
+    # Binned boosting; low-cardinality categoricals are split natively instead of as label codes
+    'Hist Gradient Boosting': HistGradientBoostingRegressor(
+        max_iter=200, learning_rate=0.1, random_state=42,
+        categorical_features=preprocessor.categorical_mask())
 }
 
-results = {}
-
-for model_name, model in models.items():
-    print(f"\nTraining {model_name}...")
-    
-    # Train
-    if model_name == 'Linear Regression':
-        model.fit(X_tr_scaled, y_tr)
-        y_val_pred = model.predict(X_val_scaled)
-    else:
-        model.fit(X_tr, y_tr)
-        y_val_pred = model.predict(X_val)
-    
-    # Evaluate
-    mse = mean_squared_error(y_val, y_val_pred)
-    rmse = np.sqrt(mse)
-    mae = mean_absolute_error(y_val, y_val_pred)
-    r2 = r2_score(y_val, y_val_pred)
-    
-    results[model_name] = {
-        'model': model,
-        'rmse': rmse,
-        'mae': mae,
-        'r2': r2,
-        'mse': mse
-    }
-    
-    print(f"  RMSE: {rmse:.4f} minutes")
-    print(f"  MAE: {mae:.4f} minutes")
-    print(f"  R² Score: {r2:.4f}")
+native_categoricals = [col for col, native in zip(preprocessor.feature_columns, preprocessor.categorical_mask())
+                       if native]
+print(f"\nNative categorical features for Hist Gradient Boosting: {len(native_categoricals)}")
+print(f"  {native_categoricals}")
+
+scaled_models = ['Linear Regression']
+
+# Budget-aware search; winners are kept and reused by later runs
+tuned_params = {} if args.no_tuned else load_tuned_params()
+if args.tune is not None:
+    tune_names = args.tune or list(SEARCH_SPACES)
+    unknown = [name for name in tune_names if name not in SEARCH_SPACES]
+    if unknown:
+        parser.error(f"cannot tune {unknown}; tunable models: {list(SEARCH_SPACES)}")
+    print(f"\nTuning {len(tune_names)} model(s) by successive halving "
+          f"({args.tune_candidates} configurations each, {args.workers} worker process(es))...")
+    with step('tune', rows=len(X_train_encoded), models=len(tune_names)) as timing:
+        for name in tune_names:
+            tuned_params[name] = successive_halving(
+                name, models[name], X_train_encoded, y_train, n_candidates=args.tune_candidates,
+                workers=args.workers, fresh=args.tune_fresh)
+            save_tuned_params(tuned_params)
+    print(f"Tuning wall-clock: {timing.wall_s:.1f}s")
+    print(f"[Saved tuned parameters: {TUNED_PARAMS_PATH}]")
+
+for name, params in tuned_params.items():
+    if name in models:
+        models[name].set_params(**params)
+        print(f"\nTuned parameters for {name}: {params}")
+
+# Every model is fit on each cross-validation fold and on the holdout
+# split at the same time, on a pool of worker processes
+print(f"\nCross-validating {len(models)} models ({args.folds} folds + holdout) "
+      f"on {args.workers} worker process(es)...")
+with step('tournament', rows=len(X_train_encoded), models=len(models), folds=args.folds) as timing:
+    results, fold_results, validation_predictions = run_tournament(
+        {name: (model, name in scaled_models) for name, model in models.items()},
+        X_train_encoded, y_train, folds=args.folds, workers=args.workers)
+wall_seconds = timing.wall_s
+cv_summary = summarize_folds(fold_results)
+
+for model_name in models:
+    result = results[model_name]
+    cv = cv_summary.loc[model_name]
+    print(f"\n{model_name}:")
+    print(f"  RMSE: {result['rmse']:.4f} minutes")
+    print(f"  MAE: {result['mae']:.4f} minutes")
+    print(f"  R² Score: {result['r2']:.4f}")
+    print(f"  CV R² Score: {cv['cv_r2_mean']:.4f} ± {cv['cv_r2_std']:.4f} ({args.folds} folds)")
+
+print(f"\nFit time per fold (seconds):")
+fit_times = fold_results.pivot(index='model', columns='fold', values='fit_seconds').loc[list(models)]
+fit_times['holdout'] = [results[m]['fit_seconds'] for m in models]
+print(fit_times.round(2).to_string())
+
+task_seconds = fold_results['fit_seconds'].sum() + fold_results['predict_seconds'].sum() \
+    + sum(results[m]['fit_seconds'] + results[m]['predict_seconds'] for m in models)
+print(f"\nTotal fit + predict time: {task_seconds:.1f}s, wall-clock: {wall_seconds:.1f}s")
 
 # ============================================
 # 3. MODEL COMPARISON
@@ -123,22 +173,29 @@ print("[3. MODEL COMPARISON]")
 print("="*70)
 
 results_df = pd.DataFrame({
-    'Model': list(results.keys()),
-    'RMSE': [results[m]['rmse'] for m in results.keys()],
-    'MAE': [results[m]['mae'] for m in results.keys()],
-    'R² Score': [results[m]['r2'] for m in results.keys()]
+    'Model': list(models),
+    'RMSE': [results[m]['rmse'] for m in models],
+    'MAE': [results[m]['mae'] for m in models],
+    'R² Score': [results[m]['r2'] for m in models],
+    'CV R² Mean': [cv_summary.loc[m, 'cv_r2_mean'] for m in models],
+    'CV R² Std': [cv_summary.loc[m, 'cv_r2_std'] for m in models],
+    'CV RMSE Mean': [cv_summary.loc[m, 'cv_rmse_mean'] for m in models],
+    'Fit Seconds': [results[m]['fit_seconds'] for m in models],
+    'CV Fit Seconds': [cv_summary.loc[m, 'cv_fit_seconds'] for m in models],
 })
 
 print("\n" + results_df.to_string(index=False))
 
-# Select best model
-best_model_name = results_df.loc[results_df['R² Score'].idxmax(), 'Model']
+# Select best model on the cross-validated score, not a single split
+best_model_name = results_df.loc[results_df['CV R² Mean'].idxmax(), 'Model']
 best_model = results[best_model_name]['model']
 
 print(f"\n[BEST MODEL: {best_model_name}]")
+print(f"  CV R² Score: {cv_summary.loc[best_model_name, 'cv_r2_mean']:.4f}")
 print(f"  R² Score: {results[best_model_name]['r2']:.4f}")
 print(f"  RMSE: {results[best_model_name]['rmse']:.4f} minutes")
 print(f"  MAE: {results[best_model_name]['mae']:.4f} minutes")
+print(f"  Parameters: {'tuned' if best_model_name in tuned_params else 'default'}")
 
 # ============================================
 # 4. FEATURE IMPORTANCE
@@ -147,14 +204,29 @@ print("\n" + "="*70)
 print("[4. FEATURE IMPORTANCE]")
 print("="*70)
 
+importance_path = 'ml_models/saved_models/feature_importance.csv'
 if hasattr(best_model, 'feature_importances_'):
-    feature_importance = pd.DataFrame({
-        'Feature': X_train_encoded.columns,
-        'Importance': best_model.feature_importances_
-    }).sort_values('Importance', ascending=False)
-    
-    print(f"\nTop 15 Most Important Features:")
-    print(feature_importance.head(15).to_string(index=False))
+    importances = best_model.feature_importances_
+    print(f"\nImportance: {best_model_name} feature_importances_")
+else:
+    # Models without built-in importances (e.g. Hist Gradient Boosting) are
+    # scored by how much the holdout R² drops when each feature is shuffled
+    X_importance = scaler.transform(X_val) if best_model_name in scaled_models else X_val
+    with step('permutation_importance', rows=len(X_val), features=X_val.shape[1]):
+        permutation = permutation_importance(best_model, X_importance, y_val, n_repeats=5,
+                                             random_state=42, n_jobs=args.workers)
+    importances = permutation.importances_mean
+    print(f"\nImportance: mean holdout R² drop over 5 permutations ({len(X_val):,} rows)")
+
+feature_importance = pd.DataFrame({
+    'Feature': X_train_encoded.columns,
+    'Importance': importances
+}).sort_values('Importance', ascending=False)
+
+print(f"\nTop 15 Most Important Features:")
+print(feature_importance.head(15).to_string(index=False))
+feature_importance.to_csv(importance_path, index=False)
+print(f"[Saved feature importance: {importance_path}]")
 
 # ============================================
 # 5. SAVE MODELS
@@ -163,35 +235,30 @@ print("\n" + "="*70)
 print("[5. SAVING MODELS]")
 print("="*70)
 
-# Save best model
-model_path = 'ml_models/saved_models/best_model.pkl'
-with open(model_path, 'wb') as f:
-    pickle.dump(best_model, f)
-print(f"[Saved best model: {model_path}]")
-
-# Save scaler
-scaler_path = 'ml_models/saved_models/scaler.pkl'
-with open(scaler_path, 'wb') as f:
-    pickle.dump(scaler, f)
-print(f"[Saved scaler: {scaler_path}]")
-
-# Save label encoders
-encoders_path = 'ml_models/saved_models/label_encoders.pkl'
-with open(encoders_path, 'wb') as f:
-    pickle.dump(label_encoders, f)
-print(f"[Saved label encoders: {encoders_path}]")
-
-# Save feature columns
-features_path = 'ml_models/saved_models/feature_columns.pkl'
-with open(features_path, 'wb') as f:
-    pickle.dump(X_train_encoded.columns.tolist(), f)
-print(f"[Saved feature columns: {features_path}]")
+# Best model, scaler and fitted preprocessing as one versioned bundle
+bundle_metrics = {key: results[best_model_name][key] for key in ['rmse', 'mae', 'r2']}
+bundle_metrics.update(cv_summary.loc[best_model_name].to_dict())
+with step('save_bundle'):
+    bundle_path = save_bundle(best_model, scaler, preprocessor, best_model_name,
+                              scaled=best_model_name in scaled_models,
+                              tuned=best_model_name in tuned_params, metrics=bundle_metrics)
+print(f"[Saved model bundle: {bundle_path}]")
 
 # Save results
 results_path = 'ml_models/saved_models/model_results.csv'
 results_df.to_csv(results_path, index=False)
 print(f"[Saved model results: {results_path}]")
 
+# Save per-fold metrics and timings
+fold_results.to_csv(CV_RESULTS_PATH, index=False)
+print(f"[Saved cross-validation results: {CV_RESULTS_PATH}]")
+
+# Out-of-fold and holdout predictions, so evaluation needs no model or re-scoring
+validation_predictions.insert(0, 'ID', train_data['ID'].to_numpy()[validation_predictions.pop('row')])
+with step('save_validation_predictions', rows=len(validation_predictions)):
+    save_validation_predictions(validation_predictions)
+print(f"[Saved validation predictions: {VALIDATION_PREDICTIONS_PATH} ({len(validation_predictions):,} rows)]")
+
 print("\n" + "="*70)
 print("[MODEL TRAINING COMPLETE!]")
 print("="*70)
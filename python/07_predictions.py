@@ -1,127 +1,98 @@
+import argparse
 import pandas as pd
-import numpy as np
-import pickle
-from sklearn.preprocessing import LabelEncoder
 import warnings
 warnings.filterwarnings('ignore')
 
+from delivery.bundle import ENGINES, ModelBundle
+from delivery.instrument import step
+from delivery.model_selection import DEFAULT_WORKERS
+from delivery.scoring import (DEFAULT_BATCH_SIZE, PREDICTION_COL, SUBMISSION_PATH, ShardedScorer,
+                              StreamingScorer, summarize_predictions)
+from delivery.storage import latest_cleaned_path
+
+parser = argparse.ArgumentParser(description="Score cleaned orders with the current model bundle.")
+parser.add_argument('--input', default=None,
+                    help="Cleaned file to score (.parquet, .feather or .csv; default: the cleaned test data)")
+parser.add_argument('--output', default=SUBMISSION_PATH,
+                    help="Predictions file; a .parquet name writes Parquet")
+parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                    help="Rows read, encoded and scored at a time")
+parser.add_argument('--workers', type=int, default=1,
+                    help=f"Score contiguous row shards on this many processes (e.g. {DEFAULT_WORKERS}, one per CPU)")
+parser.add_argument('--engine', choices=ENGINES, default='sklearn',
+                    help="'flat' scores tree ensembles with vectorized NumPy traversal of their node arrays")
+parser.add_argument('--resume', action='store_true',
+                    help="Continue an interrupted run from its progress file instead of starting over")
+args = parser.parse_args()
+
 print("="*70)
 print("GENERATING PREDICTIONS - DELIVERY TIME")
 print("="*70)
 
-# Load test data
-test_data = pd.read_csv('data/cleaned data/test_clean.csv')
-print(f"\nTest data loaded: {test_data.shape}")
+input_path = args.input or latest_cleaned_path('test')
+print(f"\nInput: {input_path}")
 
 # Load saved model and preprocessing objects
 print("\n[Loading saved models and preprocessors...]")
 
-with open('ml_models/saved_models/best_model.pkl', 'rb') as f:
-    best_model = pickle.load(f)
-
-with open('ml_models/saved_models/scaler.pkl', 'rb') as f:
-    scaler = pickle.load(f)
-
-with open('ml_models/saved_models/label_encoders.pkl', 'rb') as f:
-    label_encoders = pickle.load(f)
-
-with open('ml_models/saved_models/feature_columns.pkl', 'rb') as f:
-    feature_columns = pickle.load(f)
-
-print(f"Model type: {type(best_model).__name__}")
+with step('load_bundle', engine=args.engine):
+    # Only the manifest is read here; the model is memory-mapped on first use
+    bundle = ModelBundle(engine=args.engine)
+    if args.engine == 'flat':
+        flat_model = bundle.flat_model
+feature_columns = bundle.feature_columns
+
+print(f"Model bundle: {bundle.version} ({bundle.name})")
+print(f"Model type: {bundle.name}")
+if args.engine == 'flat':
+    print(f"Inference engine: flat ({flat_model.n_trees} trees, {flat_model.n_nodes:,} nodes, "
+          f"depth {flat_model.depth})")
 print(f"Feature count: {len(feature_columns)}")
 print(f"Features: {feature_columns}")
 
 # ============================================
-# 1. PREPARE TEST DATA
+# 1-3. SCORE IN BATCHES
 # ============================================
 print("\n" + "="*70)
-print("[1. PREPARING TEST DATA]")
+print("[1-3. ENCODING, PREDICTING AND WRITING IN BATCHES]")
 print("="*70)
 
-# Keep ID for later
-test_ids = test_data['ID'].copy()
-
-# Prepare features
-X_test = test_data.drop(['ID'], axis=1)
-
-# Handle categorical variables
-categorical_cols = X_test.select_dtypes(include=['object']).columns.tolist()
-X_test_encoded = X_test.copy()
-
-print(f"\nEncoding categorical features:")
-for col in categorical_cols:
-    if col in label_encoders:
-        try:
-            X_test_encoded[col] = label_encoders[col].transform(X_test[col].astype(str))
-            print(f"  {col}: Encoded successfully")
-        except Exception as e:
-            print(f"  {col}: Using default for unseen values")
-            X_test_encoded[col] = 0
-
-# Drop date and time features
-cols_to_drop = ['Order_Date', 'Time_Orderd', 'Time_Order_picked', 'Festival', 'order_hour']
-X_test_encoded = X_test_encoded.drop([col for col in cols_to_drop if col in X_test_encoded.columns], axis=1)
-
-# Handle missing columns from training data
-for col in feature_columns:
-    if col not in X_test_encoded.columns:
-        X_test_encoded[col] = 0  # Use default value for missing columns
-        print(f"  Adding missing column: {col}")
-
-# Handle NaN values
-X_test_encoded = X_test_encoded.fillna(0)
-
-# Ensure columns match training data and in correct order
-X_test_encoded = X_test_encoded[feature_columns]
-
-print(f"\nTest data prepared: {X_test_encoded.shape}")
-
-# ============================================
-# 2. MAKE PREDICTIONS
-# ============================================
-print("\n" + "="*70)
-print("[2. MAKING PREDICTIONS]")
-print("="*70)
-
-# Check if model needs scaling
-model_type = type(best_model).__name__
-if 'Linear' in model_type:
-    X_test_scaled = scaler.transform(X_test_encoded)
-    predictions = best_model.predict(X_test_scaled)
+# Each batch is encoded exactly as in training, scored (the bundle checks
+# the feature schema and scales if the model needs it) and appended to
+# the output before the next one is read
+print(f"\nBatch size: {args.batch_size:,} rows")
+print(f"Encoding categorical features (first batch):")
+if args.workers > 1:
+    print(f"Sharded across {args.workers} worker processes")
+    scorer = ShardedScorer(bundle, input_path, args.output, batch_size=args.batch_size,
+                           workers=args.workers, resume=args.resume)
 else:
-    predictions = best_model.predict(X_test_encoded)
-
-print(f"\nPredictions generated: {len(predictions):,}")
+    scorer = StreamingScorer(bundle, input_path, args.output, batch_size=args.batch_size, resume=args.resume)
+with step('score', engine=args.engine, workers=args.workers) as timing:
+    run = scorer.run(verbose=True)
+    timing.rows = run['rows_scored']
+    timing.extra.update({f'{stage}_s': round(seconds, 4) for stage, seconds in run['timings'].items()})
+prediction_stats = summarize_predictions(run['counts'])
+counts = run['counts']
+
+print(f"\nPredictions generated: {run['rows']:,} in {run['batches']} batch(es)")
 print(f"Prediction statistics:")
-print(f"  Min: {predictions.min():.2f} minutes")
-print(f"  Max: {predictions.max():.2f} minutes")
-print(f"  Mean: {predictions.mean():.2f} minutes")
-print(f"  Median: {np.median(predictions):.2f} minutes")
-print(f"  Std Dev: {predictions.std():.2f} minutes")
-
-# ============================================
-# 3. CREATE SUBMISSION FILE
-# ============================================
-print("\n" + "="*70)
-print("[3. CREATING SUBMISSION FILE]")
-print("="*70)
-
-submission = pd.DataFrame({
-    'ID': test_ids,
-    'Time_taken_min': predictions
-})
-
-# Round predictions to 2 decimal places
-submission['Time_taken_min'] = submission['Time_taken_min'].round(2)
-
-# Save submission
-submission_path = 'ml_models/predictions/submission.csv'
-submission.to_csv(submission_path, index=False)
-print(f"\n[Saved submission: {submission_path}]")
-print(f"Submission shape: {submission.shape}")
-print(f"\nSample predictions:")
-print(submission.head(10).to_string(index=False))
+print(f"  Min: {prediction_stats['min']:.2f} minutes")
+print(f"  Max: {prediction_stats['max']:.2f} minutes")
+print(f"  Mean: {prediction_stats['mean']:.2f} minutes")
+print(f"  Median: {prediction_stats['median']:.2f} minutes")
+print(f"  Std Dev: {prediction_stats['std']:.2f} minutes")
+
+print(f"\nThroughput: {run['rows_per_second']:,.0f} rows/s "
+      f"({run['rows_scored']:,} rows in {run['seconds']:.2f}s)")
+for stage, seconds in run['timings'].items():
+    print(f"  {stage:<8} {seconds:8.3f}s")
+
+print(f"\n[Saved submission: {args.output}]")
+print(f"Submission shape: ({run['rows']}, 2)")
+if run['head'] is not None:
+    print(f"\nSample predictions:")
+    print(run['head'].to_string(index=False))
 
 # ============================================
 # 4. GENERATE PREDICTION REPORT
@@ -130,35 +101,52 @@ print("\n" + "="*70)
 print("[4. PREDICTION REPORT]")
 print("="*70)
 
+total = run['rows']
+minutes = counts.index.to_numpy()
+categories = {
+    'Very Fast (10-15 min)': int(counts[minutes <= 15].sum()),
+    'Fast (15-25 min)': int(counts[(minutes > 15) & (minutes <= 25)].sum()),
+    'Normal (25-35 min)': int(counts[(minutes > 25) & (minutes <= 35)].sum()),
+    'Slow (35+ min)': int(counts[minutes > 35].sum()),
+}
+category_lines = "\n".join(f"  {label}: {n:,} deliveries ({100*n/total if total else 0:.2f}%)"
+                           for label, n in categories.items())
+output_format = 'Parquet' if args.output.endswith('.parquet') else 'CSV'
+
 report = f"""
 DELIVERY TIME PREDICTION REPORT
 {'='*70}
 
 DATASET INFO:
-  Total predictions: {len(submission):,}
+  Total predictions: {total:,}
   Date: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 PREDICTION STATISTICS:
-  Minimum delivery time: {submission['Time_taken_min'].min():.2f} minutes
-  Maximum delivery time: {submission['Time_taken_min'].max():.2f} minutes
-  Average delivery time: {submission['Time_taken_min'].mean():.2f} minutes
-  Median delivery time: {submission['Time_taken_min'].median():.2f} minutes
-  Standard deviation: {submission['Time_taken_min'].std():.2f} minutes
+  Minimum delivery time: {prediction_stats['min']:.2f} minutes
+  Maximum delivery time: {prediction_stats['max']:.2f} minutes
+  Average delivery time: {prediction_stats['mean']:.2f} minutes
+  Median delivery time: {prediction_stats['median']:.2f} minutes
+  Standard deviation: {prediction_stats['std']:.2f} minutes
 
 DELIVERY TIME CATEGORIES:
-  Very Fast (10-15 min): {(submission['Time_taken_min'] <= 15).sum():,} deliveries ({100*(submission['Time_taken_min'] <= 15).sum()/len(submission):.2f}%)
-  Fast (15-25 min): {((submission['Time_taken_min'] > 15) & (submission['Time_taken_min'] <= 25)).sum():,} deliveries ({100*((submission['Time_taken_min'] > 15) & (submission['Time_taken_min'] <= 25)).sum()/len(submission):.2f}%)
-  Normal (25-35 min): {((submission['Time_taken_min'] > 25) & (submission['Time_taken_min'] <= 35)).sum():,} deliveries ({100*((submission['Time_taken_min'] > 25) & (submission['Time_taken_min'] <= 35)).sum()/len(submission):.2f}%)
-  Slow (35+ min): {(submission['Time_taken_min'] > 35).sum():,} deliveries ({100*(submission['Time_taken_min'] > 35).sum()/len(submission):.2f}%)
+{category_lines}
 
 MODEL INFO:
-  Model type: {model_type}
+  Model type: {bundle.name}
+  Model bundle: {bundle.version}
   Total features: {len(feature_columns)}
-  
+
+THROUGHPUT:
+  Batch size: {args.batch_size:,} rows ({run['batches']} batches, {run['resumed_batches']} resumed)
+  Worker processes: {args.workers}
+  Inference engine: {args.engine}
+  Rows scored: {run['rows_scored']:,} in {run['seconds']:.2f}s ({run['rows_per_second']:,.0f} rows/s)
+  Read / encode / predict / write: {' / '.join(f"{run['timings'][stage]:.2f}s" for stage in run['timings'])}
+
 SUBMISSION FILE:
-  Location: ml_models/predictions/submission.csv
-  Columns: ID, Time_taken_min
-  Format: CSV
+  Location: {args.output}
+  Columns: ID, {PREDICTION_COL}
+  Format: {output_format}
 
 NEXT STEPS:
   1. Review predictions for anomalies
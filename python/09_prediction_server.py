@@ -0,0 +1,54 @@
+import argparse
+import json
+import time
+import warnings
+warnings.filterwarnings('ignore')
+
+from delivery.bundle import ENGINES, ModelBundle
+from delivery.serving import (DEFAULT_HOST, DEFAULT_MAX_BATCH, DEFAULT_MAX_WAIT_MS, DEFAULT_PORT, EXAMPLE_ORDER,
+                              OrderPredictor, PredictionServer)
+
+parser = argparse.ArgumentParser(description="Serve delivery time predictions for single raw orders over HTTP.")
+parser.add_argument('--host', default=DEFAULT_HOST)
+parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                    help="Most concurrent orders scored in one predict call")
+parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                    help="Longest a request waits for others to join its batch")
+parser.add_argument('--engine', choices=ENGINES, default='sklearn',
+                    help="'flat' scores tree ensembles with vectorized NumPy traversal of their node arrays")
+parser.add_argument('--verbose', action='store_true', help="Log every request")
+args = parser.parse_args()
+
+print("="*70)
+print("DELIVERY TIME PREDICTION SERVER")
+print("="*70)
+
+start_time = time.perf_counter()
+predictor = OrderPredictor(ModelBundle(engine=args.engine))
+print(f"\nModel bundle: {predictor.bundle.version} ({predictor.bundle.name}, {args.engine} engine)")
+print(f"Warm in {time.perf_counter() - start_time:.2f}s")
+
+server = PredictionServer(predictor, args.host, args.port, max_batch=args.max_batch,
+                          max_wait_ms=args.max_wait_ms, verbose=args.verbose)
+host, port = server.server_address[:2]
+print(f"Micro-batching up to {args.max_batch} orders, waiting at most {args.max_wait_ms:g} ms")
+print(f"\nListening on http://{host}:{port}")
+print(f"  POST /predict   one raw order, or {{\"orders\": [...]}}")
+print(f"  GET  /health")
+print(f"  GET  /stats     latency percentiles and batch sizes")
+print(f"\nExample:")
+print(f"  curl -s http://{host}:{port}/predict -d '{json.dumps(EXAMPLE_ORDER)}'")
+
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
+finally:
+    server.server_close()
+
+stats = server.stats()
+print(f"\n[Served {stats['requests']:,} requests ({stats['errors']:,} errors) "
+      f"in {stats['batches']:,} batches, mean batch {stats['mean_batch']:.1f}]")
+if 'p50_ms' in stats:
+    print(f"[Latency p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms, max {stats['max_ms']:.1f} ms]")
@@ -0,0 +1,6 @@
+"""Shared building blocks for the food delivery pipeline scripts.
+
+The numbered scripts in ``python/`` are run from the repository root
+(``python python/02_data_cleaning.py``), which puts this package on the
+import path.
+"""
@@ -0,0 +1,177 @@
+"""Concurrent execution of the SQL analytics suite.
+
+The numbered queries in ``sql/02..04_*.sql`` are independent reads of
+``deliveries``, so ``run_queries`` runs them on a thread pool. Each
+worker thread opens its own read-only SQLite connection; sqlite3
+releases the GIL while a statement runs, so queries overlap and the
+suite takes about as long as its slowest query. Every query writes its
+own export file and results come back in query order, so the exports
+and the printed report are the same as a sequential run.
+
+Queries that have a counterpart in ``sql/05_cube_queries.sql`` are
+answered from the ``delivery_cube`` aggregate table when it exists. With
+a ``QueryCache``, results of unchanged queries on unchanged data are
+served from disk and their exports are only rewritten if they changed.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from delivery.cube import CUBE_TABLE
+from delivery.database import DB_PATH, data_version, table_exists
+from delivery.sqlscript import read_script
+
+SQL_FILES = [
+    'sql/02_core_metrics.sql',
+    'sql/03_delivery_person_analysis.sql',
+    'sql/04_advanced_queries.sql',
+]
+CUBE_SQL_FILE = 'sql/05_cube_queries.sql'
+EXPORTS_DIR = 'data/exports'
+
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def cube_available(path=DB_PATH):
+    """True when the database has a filled aggregate cube to answer queries from."""
+    if not os.path.exists(path):
+        return False
+    conn = connect_readonly(path)
+    try:
+        return (table_exists(conn, CUBE_TABLE)
+                and conn.execute(f"SELECT 1 FROM {CUBE_TABLE} LIMIT 1").fetchone() is not None)
+    finally:
+        conn.close()
+
+
+def use_cube(statements, cube_sql_file=CUBE_SQL_FILE):
+    """Swap in the cube version of each query that has one (matched by query number).
+
+    Returns the new statement list and the set of query numbers now
+    answered from the cube.
+    """
+    cube_sql = {statement.number: statement.sql for statement in read_script(cube_sql_file)
+                if statement.number is not None}
+    swapped = [statement._replace(sql=cube_sql.get(statement.number, statement.sql))
+               for statement in statements]
+    return swapped, {statement.number for statement in statements if statement.number in cube_sql}
+
+
+def export_path(query_name, exports_dir=EXPORTS_DIR):
+    safe_name = query_name.replace(' ', '_').replace(':', '').replace('/', '_').lower()
+    return f"{exports_dir}/{safe_name}.csv"
+
+
+def _export_stamp(path):
+    stat = os.stat(path)
+    return {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def connect_readonly(path=DB_PATH):
+    """Read-only connection that worker threads can share the file through."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+class QueryRunner:
+    """Run queries on a pool of threads, one read-only connection per thread."""
+
+    def __init__(self, path=DB_PATH, workers=DEFAULT_WORKERS, exports_dir=EXPORTS_DIR):
+        self.path = path
+        self.workers = max(1, workers)
+        self.exports_dir = exports_dir
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect_readonly(self.path)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def run_one(self, query_name, sql_query):
+        """Execute one query and write its export; returns a result dict."""
+        start = time.perf_counter()
+        result = {'name': query_name, 'df': None, 'output': None, 'error': None, 'cached': False}
+        try:
+            df = pd.read_sql_query(sql_query, self._connection())
+            result['query_seconds'] = time.perf_counter() - start
+            output_file = export_path(query_name, self.exports_dir)
+            df.to_csv(output_file, index=False)
+            result.update(df=df, output=output_file)
+        except Exception as e:
+            result['error'] = str(e)
+            result.setdefault('query_seconds', time.perf_counter() - start)
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    def serve_cached(self, query_name, entry):
+        """Result from a cache entry; the export is rewritten only if it changed on disk."""
+        start = time.perf_counter()
+        output_file = export_path(query_name, self.exports_dir)
+        stamp = entry.get('export')
+        if stamp is None or stamp['path'] != output_file or not os.path.exists(output_file) \
+                or _export_stamp(output_file) != stamp:
+            entry['df'].to_csv(output_file, index=False)
+            entry['export'] = _export_stamp(output_file)
+        seconds = time.perf_counter() - start
+        return {'name': query_name, 'df': entry['df'], 'output': output_file, 'error': None,
+                'cached': True, 'query_seconds': 0.0, 'seconds': seconds}
+
+    def run(self, queries, cache=None):
+        """Results for ``queries`` ((name, sql) pairs) in the order given.
+
+        With a ``cache``, hits for the current data version skip the
+        database and new results are added to it.
+        """
+        os.makedirs(self.exports_dir, exist_ok=True)
+        version = None
+        if cache is not None:
+            conn = connect_readonly(self.path)
+            try:
+                version = data_version(conn)
+            finally:
+                conn.close()
+
+        results = [None] * len(queries)
+        keys = {}
+        if version is not None:
+            for i, (name, sql) in enumerate(queries):
+                keys[i] = cache.key(sql, version)
+                entry = cache.get(keys[i])
+                if entry is not None:
+                    results[i] = self.serve_cached(name, entry)
+                    cache.entries[keys[i]]['export'] = entry['export']
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {i: pool.submit(self.run_one, *queries[i]) for i in pending}
+                for i, future in futures.items():
+                    results[i] = future.result()
+        finally:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+        if version is not None:
+            for i in pending:
+                result = results[i]
+                if result['error'] is None:
+                    cache.put(keys[i], result['name'], result['df'], _export_stamp(result['output']))
+            cache.save()
+        return results
+
+
+def run_queries(queries, path=DB_PATH, workers=DEFAULT_WORKERS, exports_dir=EXPORTS_DIR, cache=None):
+    return QueryRunner(path, workers, exports_dir).run(queries, cache)
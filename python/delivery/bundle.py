@@ -0,0 +1,249 @@
+"""Versioned model bundle: the trained model and its preprocessing in one directory.
+
+A bundle is ``ml_models/bundles/<version>/`` holding the model, scaler
+and preprocessor as uncompressed joblib files plus ``manifest.json``.
+The manifest records the model name, class and parameters, its metrics,
+the feature schema the model was trained on, library versions and the
+SHA-256 and size of every file. ``ml_models/bundles/CURRENT`` names the
+bundle the scripts load; ``save_bundle`` keeps the last ``keep`` versions.
+
+Uncompressed joblib keeps numpy arrays as raw blocks, so they are loaded
+with ``mmap_mode='r'``: the arrays of a model (e.g. the node arrays of
+HistGradientBoostingRegressor's trees) are read-only views of the file,
+shared through the page cache by every process that loads the bundle.
+``ModelBundle`` reads only the manifest up front; each component is
+verified and loaded the first time it is used. With ``engine='flat'``,
+tree ensembles are scored by ``delivery.flat_forest.FlatForest`` instead
+of their own ``predict``.
+"""
+import hashlib
+import json
+import os
+import shutil
+import warnings
+from datetime import datetime, timezone
+from functools import cached_property
+
+import joblib
+import numpy as np
+import sklearn
+
+from delivery.flat_forest import FlatForest
+
+BUNDLES_DIR = 'ml_models/bundles'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+BUNDLE_FORMAT = 1
+DEFAULT_KEEP = 5
+
+COMPONENTS = ('model', 'scaler', 'preprocessor')
+ENGINES = ('sklearn', 'flat')
+
+
+class BundleError(Exception):
+    """A bundle is missing, incomplete or does not match its manifest."""
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _json_safe(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (str, int, float, bool, list, dict)) or value is None:
+        return value
+    return repr(value)
+
+
+def feature_schema(preprocessor):
+    """Columns, dtype and categorical encodings the model expects."""
+    mask = preprocessor.categorical_mask()
+    return {
+        'columns': list(preprocessor.feature_columns),
+        'dtype': 'float64',
+        'encoded': {col: len(le.classes_) for col, le in preprocessor.label_encoders.items()
+                    if col in preprocessor.feature_columns},
+        'native_categorical': [col for col, native in zip(preprocessor.feature_columns, mask) if native],
+    }
+
+
+def save_bundle(model, scaler, preprocessor, name, scaled=False, tuned=False, metrics=None,
+                directory=BUNDLES_DIR, keep=DEFAULT_KEEP):
+    """Write a new bundle version and make it CURRENT; returns its path.
+
+    The version is written to a temporary directory and renamed into
+    place, so readers never see a partial bundle. Older versions beyond
+    the newest ``keep`` are then removed (``keep=None`` keeps them all).
+    """
+    created = datetime.now(timezone.utc)
+    os.makedirs(directory, exist_ok=True)
+    staging = os.path.join(directory, f".staging-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    files = {}
+    for component, obj in zip(COMPONENTS, (model, scaler, preprocessor)):
+        filename = f"{component}.joblib"
+        path = os.path.join(staging, filename)
+        # No compression: compressed files cannot be memory-mapped
+        joblib.dump(obj, path, compress=0)
+        files[component] = {'path': filename, 'sha256': file_sha256(path), 'bytes': os.path.getsize(path)}
+
+    version = f"{created:%Y%m%dT%H%M%S}-{files['model']['sha256'][:8]}"
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'created': created.isoformat(timespec='seconds'),
+        'model': {
+            'name': name,
+            'class': f"{type(model).__module__}.{type(model).__name__}",
+            'scaled': scaled,
+            'tuned': tuned,
+            'params': {key: _json_safe(value) for key, value in model.get_params().items()},
+        },
+        'metrics': {key: _json_safe(value) for key, value in (metrics or {}).items()},
+        'features': feature_schema(preprocessor),
+        'libraries': {'scikit-learn': sklearn.__version__, 'numpy': np.__version__,
+                      'joblib': joblib.__version__},
+        'files': files,
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    path = os.path.join(directory, version)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+
+    tmp_current = os.path.join(directory, CURRENT_FILE + '.tmp')
+    with open(tmp_current, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_current, os.path.join(directory, CURRENT_FILE))
+    if keep is not None:
+        prune_bundles(directory, keep)
+    return path
+
+
+def prune_bundles(directory=BUNDLES_DIR, keep=DEFAULT_KEEP):
+    """Remove all but the newest ``keep`` versions; never the CURRENT one. Returns the removed paths."""
+    current = os.path.basename(current_bundle_path(directory))
+    # Versions start with a UTC timestamp, so name order is age order
+    versions = sorted(entry.name for entry in os.scandir(directory)
+                      if entry.is_dir() and not entry.name.startswith('.')
+                      and os.path.exists(os.path.join(entry.path, MANIFEST_FILE)))
+    removed = []
+    for version in versions[:max(len(versions) - keep, 0)]:
+        if version != current:
+            path = os.path.join(directory, version)
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+    return removed
+
+
+def current_bundle_path(directory=BUNDLES_DIR):
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), 'r') as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        raise BundleError(f"No model bundle in {directory}; run 06_ml_model_training.py first") from None
+    return os.path.join(directory, version)
+
+
+class ModelBundle:
+    """Lazily loaded model bundle (the CURRENT one by default).
+
+    ``model``, ``scaler`` and ``preprocessor`` are loaded on first access,
+    after checking the file against the manifest checksum when ``verify``
+    is set. ``mmap_mode=None`` loads arrays into memory instead.
+    ``engine`` picks how ``predict`` scores: the model's own ``predict``
+    (``'sklearn'``) or its ``FlatForest`` export (``'flat'``).
+    """
+
+    def __init__(self, path=None, mmap_mode='r', verify=True, engine='sklearn'):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+        self.path = path if path is not None else current_bundle_path()
+        self.mmap_mode = mmap_mode
+        self.verify = verify
+        self.engine = engine
+        try:
+            with open(os.path.join(self.path, MANIFEST_FILE), 'r') as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            raise BundleError(f"No {MANIFEST_FILE} in {self.path}") from None
+        if self.manifest.get('format') != BUNDLE_FORMAT:
+            raise BundleError(f"Unsupported bundle format {self.manifest.get('format')} in {self.path}")
+        built_with = self.manifest['libraries']['scikit-learn']
+        if built_with != sklearn.__version__:
+            warnings.warn(f"Bundle {self.version} was built with scikit-learn {built_with}, "
+                          f"running {sklearn.__version__}")
+
+    @property
+    def version(self):
+        return self.manifest['version']
+
+    @property
+    def name(self):
+        return self.manifest['model']['name']
+
+    @property
+    def scaled(self):
+        """Whether the model expects features transformed by ``scaler``."""
+        return self.manifest['model']['scaled']
+
+    @property
+    def feature_columns(self):
+        return self.manifest['features']['columns']
+
+    def _load(self, component):
+        entry = self.manifest['files'][component]
+        path = os.path.join(self.path, entry['path'])
+        if self.verify and file_sha256(path) != entry['sha256']:
+            raise BundleError(f"Checksum mismatch for {path}")
+        return joblib.load(path, mmap_mode=self.mmap_mode)
+
+    @cached_property
+    def model(self):
+        return self._load('model')
+
+    @cached_property
+    def flat_model(self):
+        """The model exported to flat node arrays (tree ensembles only)."""
+        try:
+            return FlatForest.from_model(self.model)
+        except TypeError as e:
+            raise BundleError(f"Bundle {self.version} ({self.name}) cannot use the flat engine: {e}") from None
+
+    @cached_property
+    def scaler(self):
+        return self._load('scaler')
+
+    @cached_property
+    def preprocessor(self):
+        preprocessor = self._load('preprocessor')
+        if list(preprocessor.feature_columns) != self.feature_columns:
+            raise BundleError(f"Preprocessor in {self.path} does not match the manifest feature schema")
+        return preprocessor
+
+    def check_features(self, X):
+        """Raise BundleError unless ``X`` has the schema's columns in order."""
+        columns = list(X.columns)
+        if columns != self.feature_columns:
+            missing = [col for col in self.feature_columns if col not in columns]
+            extra = [col for col in columns if col not in self.feature_columns]
+            raise BundleError(f"Feature columns do not match bundle {self.version}: "
+                              f"missing {missing}, unexpected {extra}")
+
+    def predict(self, X):
+        """Predictions for an encoded feature frame ``X`` (scaled if the model needs it)."""
+        self.check_features(X)
+        if self.scaled:
+            X = self.scaler.transform(X)
+        model = self.flat_model if self.engine == 'flat' else self.model
+        return model.predict(X)
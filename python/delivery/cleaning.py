@@ -0,0 +1,405 @@
+"""Cleaning and feature engineering for the raw delivery CSVs.
+
+``clean_delivery_data`` works on an in-memory frame. ``stream_clean_csv``
+runs the same cleaning chunk by chunk so memory stays flat as the raw
+dumps grow. Both paths impute and trim outliers from the same global
+statistics (see ``compute_cleaning_stats``), which can be saved to and
+loaded from a JSON file.
+"""
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from delivery import features
+from delivery.dtypes import compact_dtypes, memory_bytes
+
+DEFAULT_CHUNKSIZE = 100_000
+STATS_PATH = 'data/cleaned data/cleaning_stats.json'
+
+CATEGORICAL_FILL_COLS = ['Weatherconditions', 'Road_traffic_density', 'Type_of_order',
+                         'Type_of_vehicle', 'City', 'Festival']
+
+# Raw columns the global statistics are computed from
+STATS_COLUMNS = ['Delivery_person_Age', 'Delivery_person_Ratings', 'Time_taken(min)'] + CATEGORICAL_FILL_COLS
+
+WEATHER_SEVERITY = {
+    'Sunny': 1,
+    'Cloudy': 1,
+    'Fog': 2,
+    'Windy': 2,
+    'Sandstorms': 3,
+    'Stormy': 3
+}
+
+TRAFFIC_LEVELS = {
+    'Low': 1,
+    'Medium': 2,
+    'High': 3,
+    'Jam': 4
+}
+
+# Binned column -> (source column, bin edges, labels); stored as ordered categoricals
+BINNED_COLUMNS = {
+    'distance_category': ('delivery_distance_km', [0, 2, 5, 10, 100],
+                          ['Very Close (<2km)', 'Close (2-5km)', 'Medium (5-10km)', 'Far (>10km)']),
+    'age_group': ('Delivery_person_Age', [0, 25, 35, 45, 100],
+                  ['Young (18-25)', 'Mid (26-35)', 'Senior (36-45)', 'Veteran (45+)']),
+    'rating_category': ('Delivery_person_Ratings', [0, 3.5, 4.0, 4.5, 5.0],
+                        ['Low (<3.5)', 'Average (3.5-4.0)', 'Good (4.0-4.5)', 'Excellent (4.5+)']),
+}
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+# ============================================
+# GLOBAL STATISTICS
+# ============================================
+
+def _convert_raw_numeric(df):
+    """Step 0: turn the numeric text columns of a raw frame into numbers (in place)."""
+    # Convert Age to numeric (always float so chunks without NaN match the full frame)
+    if 'Delivery_person_Age' in df.columns:
+        df['Delivery_person_Age'] = features.to_numeric(df['Delivery_person_Age']).astype(float)
+
+    # Convert Ratings to numeric
+    if 'Delivery_person_Ratings' in df.columns:
+        df['Delivery_person_Ratings'] = features.to_numeric(df['Delivery_person_Ratings'])
+
+    # Convert Time_taken to numeric - extract numbers first (e.g., "(min) 24" -> 24)
+    if 'Time_taken(min)' in df.columns:
+        df['Time_taken(min)'] = features.extract_minutes(df['Time_taken(min)'])
+
+    return df
+
+
+def _add_counts(total, values):
+    counts = values.value_counts(dropna=True)
+    if total is None:
+        return counts
+    return total.add(counts, fill_value=0)
+
+
+def _accumulate_counts(counts, df):
+    """Fold the value counts needed for the global statistics of one converted chunk."""
+    counts['rows'] += len(df)
+    for key, col in [('age', 'Delivery_person_Age'),
+                     ('ratings', 'Delivery_person_Ratings'),
+                     ('target', 'Time_taken(min)')]:
+        if col in df.columns:
+            counts[key] = _add_counts(counts[key], df[col])
+    for col in CATEGORICAL_FILL_COLS:
+        if col in df.columns:
+            counts['modes'][col] = _add_counts(counts['modes'].get(col), df[col])
+    return counts
+
+
+def _quantile_from_counts(counts, q):
+    """Exact linear-interpolation quantile (same as ``Series.quantile``) from value counts."""
+    if counts is None or counts.sum() == 0:
+        return None
+    counts = counts[counts > 0].sort_index()
+    values = counts.index.to_numpy(dtype=float)
+    cumulative = counts.to_numpy().cumsum()
+    position = q * (cumulative[-1] - 1)
+    lower = math.floor(position)
+    upper = min(lower + 1, cumulative[-1] - 1)
+    a = values[np.searchsorted(cumulative, lower, side='right')]
+    b = values[np.searchsorted(cumulative, upper, side='right')]
+    t = position - lower
+    # Mirror numpy's lerp so the result is bit-identical to the in-memory quantile
+    return float(b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t)
+
+
+def _mean_from_counts(counts):
+    if counts is None or counts.sum() == 0:
+        return None
+    return float(math.fsum(value * count for value, count in counts.items()) / counts.sum())
+
+
+def _mode_from_counts(counts):
+    if counts is None or len(counts) == 0:
+        return None
+    # Series.mode()[0] returns the smallest of the most frequent values
+    top = counts[counts == counts.max()]
+    return sorted(top.index)[0]
+
+
+def _finalize_stats(counts):
+    return {
+        'rows': int(counts['rows']),
+        'age_median': _quantile_from_counts(counts['age'], 0.5),
+        'ratings_mean': _mean_from_counts(counts['ratings']),
+        'modes': {col: _mode_from_counts(c) for col, c in counts['modes'].items()},
+        'target_p99': _quantile_from_counts(counts['target'], 0.99),
+    }
+
+
+def _empty_counts():
+    return {'rows': 0, 'age': None, 'ratings': None, 'target': None, 'modes': {}}
+
+
+def compute_cleaning_stats(chunks):
+    """First pass: global imputation values and the target cutoff over raw chunks.
+
+    ``chunks`` is any iterable of raw frames, e.g. ``pd.read_csv(path, chunksize=n)``.
+    Returns a JSON-serializable dict with the median age, mean rating,
+    categorical modes and the 99th percentile of ``Time_taken(min)``.
+    """
+    counts = _empty_counts()
+    for chunk in chunks:
+        chunk = chunk[[col for col in STATS_COLUMNS if col in chunk.columns]].copy()
+        _accumulate_counts(counts, _convert_raw_numeric(chunk))
+    return _finalize_stats(counts)
+
+
+def save_cleaning_stats(stats, path=STATS_PATH):
+    with open(path, 'w') as f:
+        json.dump(stats, f, indent=2)
+
+
+def load_cleaning_stats(path=STATS_PATH):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+# ============================================
+# CLEANING
+# ============================================
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Calculate distance between two points on Earth in km"""
+    R = 6371  # Earth's radius in km
+
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    distance = R * c
+
+    return distance
+
+
+def clean_delivery_data(df, is_train=True, stats=None, verbose=True):
+    """Clean one raw frame and add the engineered features.
+
+    ``stats`` comes from ``compute_cleaning_stats``; when omitted it is
+    computed from ``df`` itself. Pass ``verbose=False`` to silence the
+    step-by-step log (used when cleaning chunk by chunk).
+    """
+    log = print if verbose else _quiet
+    df = df.copy()
+
+    log(f"\n{'='*60}")
+    log(f"CLEANING {'TRAIN' if is_train else 'TEST'} DATASET")
+    log(f"{'='*60}")
+
+    # 0. CONVERT STRING COLUMNS TO NUMERIC
+    log("\n[Step 0: Converting Data Types...]")
+    _convert_raw_numeric(df)
+
+    if stats is None:
+        stats = _finalize_stats(_accumulate_counts(_empty_counts(), df))
+
+    # 1. HANDLE MISSING VALUES
+    log("\n[Step 1: Handling Missing Values...]")
+    if verbose:
+        log(f"Missing values before: {df.isnull().sum().sum()}")
+
+    # Fill missing ages with median
+    if 'Delivery_person_Age' in df.columns and stats['age_median'] is not None:
+        df['Delivery_person_Age'] = df['Delivery_person_Age'].fillna(stats['age_median'])
+
+    # Fill missing ratings with mean
+    if 'Delivery_person_Ratings' in df.columns and stats['ratings_mean'] is not None:
+        df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].fillna(stats['ratings_mean'])
+
+    # Fill categorical with mode
+    for col in CATEGORICAL_FILL_COLS:
+        mode = stats['modes'].get(col)
+        if col in df.columns and mode is not None and df[col].isnull().sum() > 0:
+            df[col] = df[col].fillna(mode)
+
+    if verbose:
+        log(f"Missing values after: {df.isnull().sum().sum()}")
+
+    # 2. CLEAN TEXT FIELDS
+    # Each distinct value is cleaned once and mapped back to the rows
+    log("\n[Step 2: Cleaning Text Fields...]")
+
+    # Remove 'conditions ' prefix from weather if present
+    if 'Weatherconditions' in df.columns:
+        df['Weatherconditions'] = features.clean_text(df['Weatherconditions'], prefix='conditions ')
+
+    # Clean traffic density
+    if 'Road_traffic_density' in df.columns:
+        df['Road_traffic_density'] = features.clean_text(df['Road_traffic_density'])
+
+    # Clean vehicle condition
+    if 'Vehicle_condition' in df.columns:
+        df['Vehicle_condition'] = features.strip_text(df['Vehicle_condition'])
+
+    # Clean city names
+    if 'City' in df.columns:
+        df['City'] = features.clean_text(df['City'])
+
+    # 3. FIX DATA TYPES
+    log("\n[Step 3: Converting Data Types...]")
+
+    # Convert Order_Date
+    df['Order_Date'] = features.parse_dates(df['Order_Date'], format='%d-%m-%Y')
+
+    # Convert Time columns (they might be in format "11:50" or similar)
+    ordered_hours = None
+    if 'Time_Orderd' in df.columns:
+        ordered_hours, ordered_minutes = features.parse_hhmm(df['Time_Orderd'])
+        df['Time_Orderd'] = features.to_time_objects(ordered_hours, ordered_minutes, index=df.index)
+
+    if 'Time_Order_picked' in df.columns:
+        picked_hours, picked_minutes = features.parse_hhmm(df['Time_Order_picked'])
+        df['Time_Order_picked'] = features.to_time_objects(picked_hours, picked_minutes, index=df.index)
+
+    # Convert Festival to boolean
+    if 'Festival' in df.columns:
+        df['Festival'] = df['Festival'].map({'Yes': 1, 'No': 0})
+
+    # Convert multiple_deliveries to int
+    if 'multiple_deliveries' in df.columns:
+        df['multiple_deliveries'] = features.to_numeric(df['multiple_deliveries']).fillna(0).astype(int)
+
+    # 4. FEATURE ENGINEERING
+    log("\n[Step 4: Creating New Features...]")
+
+    # Extract date/time features (year, month, day, day of week, ISO week, day name)
+    for col, values in features.date_parts(df['Order_Date']).items():
+        df[col] = values
+
+    # Weekend flag
+    df['is_weekend'] = df['order_dayofweek'].isin([5, 6]).astype(int)
+
+    # Extract hour from Time_Orderd
+    if ordered_hours is not None:
+        df['order_hour'] = features.order_hour(ordered_hours, index=df.index)
+
+        # Time period
+        df['time_period'] = features.time_period(ordered_hours)
+
+        # Peak hours (lunch: 12-2pm, dinner: 7-9pm)
+        df['is_peak_hour'] = features.is_peak_hour(ordered_hours)
+
+    log("   Calculating delivery distances...")
+    df['delivery_distance_km'] = haversine_distance(
+        df['Restaurant_latitude'],
+        df['Restaurant_longitude'],
+        df['Delivery_location_latitude'],
+        df['Delivery_location_longitude']
+    )
+
+    # Distance categories, age groups and rating categories
+    for col, (source, bins, labels) in BINNED_COLUMNS.items():
+        if source in df.columns:
+            df[col] = pd.cut(df[source], bins=bins, labels=labels)
+
+    # Weather severity
+    if 'Weatherconditions' in df.columns:
+        df['weather_severity'] = df['Weatherconditions'].map(WEATHER_SEVERITY).fillna(1)
+
+    # Traffic density mapping
+    if 'Road_traffic_density' in df.columns:
+        df['traffic_level'] = df['Road_traffic_density'].map(TRAFFIC_LEVELS).fillna(2)
+
+    # 5. HANDLE OUTLIERS (only for train set with target)
+    if is_train and 'Time_taken(min)' in df.columns:
+        log("\n[Step 5: Handling Outliers in Target Variable...]")
+
+        # Only remove extreme outliers at the (global) 99th percentile
+        if stats['target_p99'] is not None:
+            cutoff = stats['target_p99']
+            outliers = int((df['Time_taken(min)'] > cutoff).sum())
+            if len(df):
+                log(f"   Extreme outliers detected: {outliers:,} ({100*outliers/len(df):.2f}%)")
+            df = df[df['Time_taken(min)'] <= cutoff]
+            log(f"   After removing extremes: {len(df):,} rows")
+        else:
+            log("   No valid Time_taken values to process for outliers")
+
+        # Delivery speed category
+        df['delivery_speed'] = features.delivery_speed(df['Time_taken(min)'])
+
+    log(f"\n[CLEANING COMPLETE: {len(df):,} rows × {len(df.columns)} columns]")
+
+    return df
+
+
+# ============================================
+# STREAMING MODE
+# ============================================
+
+def stream_clean_csv(src, writer, is_train=True, stats=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Clean ``src`` chunk by chunk and append each cleaned chunk to ``writer``.
+
+    ``writer`` is a ``delivery.storage.CleanedWriter`` (anything with a
+    ``write(df)`` method works). Chunks are written in the compact layout
+    of ``delivery.dtypes.compact_dtypes``.
+
+    Without ``stats`` a first pass over ``src`` computes them, so the
+    output matches ``clean_delivery_data`` on the whole file. Returns a
+    summary dict with the statistics used and the figures the cleaning
+    report needs.
+    """
+    if stats is None:
+        stats = compute_cleaning_stats(pd.read_csv(src, chunksize=chunksize))
+
+    summary = {
+        'stats': stats,
+        'rows_in': 0,
+        'rows_out': 0,
+        'columns': 0,
+        'missing': 0,
+        'target_counts': None,
+        'uniques': {},
+        'date_min': None,
+        'date_max': None,
+        'memory_before': 0,
+        'memory_after': 0,
+    }
+
+    for chunk in pd.read_csv(src, chunksize=chunksize):
+        summary['rows_in'] += len(chunk)
+        cleaned = clean_delivery_data(chunk, is_train=is_train, stats=stats, verbose=False)
+        summary['memory_before'] += memory_bytes(cleaned)
+        cleaned = compact_dtypes(cleaned)
+        summary['memory_after'] += memory_bytes(cleaned)
+        writer.write(cleaned)
+
+        summary['rows_out'] += len(cleaned)
+        summary['columns'] = len(cleaned.columns)
+        summary['missing'] += int(cleaned.isnull().sum().sum())
+        if 'Time_taken(min)' in cleaned.columns:
+            summary['target_counts'] = _add_counts(summary['target_counts'], cleaned['Time_taken(min)'])
+        for col in ['City', 'Weatherconditions', 'Road_traffic_density', 'Type_of_order', 'Type_of_vehicle']:
+            seen = summary['uniques'].setdefault(col, set())
+            seen.update(cleaned[col].dropna().unique())
+        dates = cleaned['Order_Date'].dropna()
+        if len(dates):
+            low, high = dates.min(), dates.max()
+            summary['date_min'] = low if summary['date_min'] is None else min(summary['date_min'], low)
+            summary['date_max'] = high if summary['date_max'] is None else max(summary['date_max'], high)
+
+    return summary
+
+
+def summarize_target_counts(counts):
+    """Min/max/mean/median of the target from the value counts gathered while streaming."""
+    counts = counts[counts > 0].sort_index()
+    return {
+        'min': float(counts.index.min()),
+        'max': float(counts.index.max()),
+        'mean': _mean_from_counts(counts),
+        'median': _quantile_from_counts(counts, 0.5),
+    }
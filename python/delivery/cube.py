@@ -0,0 +1,102 @@
+"""Materialized aggregate cube over the deliveries table.
+
+``delivery_cube`` holds COUNT, SUM, sum-of-squares, MIN and MAX measures
+of delivered orders (known ``Time_taken_min``) for a handful of grouping
+sets, each at ``Order_Date`` grain. ``sql/05_cube_queries.sql`` answers
+the GROUP BY metrics queries by rolling these rows up, so they read a
+few thousand rows instead of scanning every delivery. Because every
+grouping set is keyed by date, a load only has to rebuild the dates it
+touched.
+"""
+
+CUBE_TABLE = 'delivery_cube'
+SOURCE_TABLE = 'deliveries'
+
+# Functions of Order_Date, stored on every cube row
+DATE_COLUMNS = ['Order_Date', 'order_year', 'order_month', 'order_dayofweek', 'day_name', 'is_weekend']
+
+# grouping_set -> dimension columns (besides the date columns)
+GROUPING_SETS = {
+    'date': [],
+    'city': ['City'],
+    'hour': ['order_hour', 'time_period', 'is_peak_hour'],
+    'weather_traffic': ['Weatherconditions', 'weather_severity', 'Road_traffic_density', 'traffic_level'],
+    'vehicle': ['Vehicle_condition', 'Type_of_vehicle'],
+    'distance': ['distance_category'],
+    'speed': ['delivery_speed'],
+    'festival': ['Festival'],
+}
+
+DIMENSIONS = [col for cols in GROUPING_SETS.values() for col in cols]
+
+# Measure column -> (aggregate over the delivered rows, aggregate that
+# rolls those partial results up). The row expressions match the ones the
+# base-table queries average, so the rollups agree with them.
+MEASURES = {
+    'deliveries': ('COUNT(*)', 'SUM'),
+    'time_sum': ('SUM(Time_taken_min)', 'SUM'),
+    'time_sumsq': ('SUM(Time_taken_min * Time_taken_min)', 'SUM'),
+    'time_min': ('MIN(Time_taken_min)', 'MIN'),
+    'time_max': ('MAX(Time_taken_min)', 'MAX'),
+    'distance_count': ('COUNT(delivery_distance_km)', 'SUM'),
+    'distance_sum': ('SUM(delivery_distance_km)', 'SUM'),
+    'rating_count': ('COUNT(Delivery_person_Ratings)', 'SUM'),
+    'rating_sum': ('SUM(Delivery_person_Ratings)', 'SUM'),
+    'time_per_km_count': ('COUNT(Time_taken_min / delivery_distance_km)', 'SUM'),
+    'time_per_km_sum': ('SUM(Time_taken_min / delivery_distance_km)', 'SUM'),
+}
+
+# Finest grain (every dimension at once), built with one scan of the
+# source rows; each grouping set is then rolled up from it
+BASE_TABLE = 'delivery_cube_base'
+
+
+def _base_statement(dates_filter):
+    columns = DATE_COLUMNS + DIMENSIONS
+    measures = ', '.join(f"{expr} AS {name}" for name, (expr, _) in MEASURES.items())
+    return (
+        f"CREATE TEMP TABLE {BASE_TABLE} AS SELECT {', '.join(columns)}, {measures} "
+        f"FROM {SOURCE_TABLE} WHERE Time_taken_min IS NOT NULL{dates_filter} "
+        f"GROUP BY {', '.join(columns)}"
+    )
+
+
+def _rollup_statement(grouping_set):
+    dims = DATE_COLUMNS + GROUPING_SETS[grouping_set]
+    selected = [col if col in dims else 'NULL' for col in DATE_COLUMNS + DIMENSIONS]
+    rollups = ', '.join(f"{rollup}({name})" for name, (_, rollup) in MEASURES.items())
+    return (
+        f"INSERT INTO {CUBE_TABLE} (grouping_set, {', '.join(DATE_COLUMNS + DIMENSIONS)}, {', '.join(MEASURES)}) "
+        f"SELECT '{grouping_set}', {', '.join(selected)}, {rollups} "
+        f"FROM temp.{BASE_TABLE} GROUP BY {', '.join(dims)}"
+    )
+
+
+def _dates_condition(dates_table):
+    # IN never matches NULL, so orders without a date are refreshed explicitly
+    return (f"(Order_Date IN (SELECT Order_Date FROM {dates_table}) OR (Order_Date IS NULL "
+            f"AND EXISTS (SELECT 1 FROM {dates_table} WHERE Order_Date IS NULL)))")
+
+
+def refresh_cube(conn, dates_table=None):
+    """Rebuild the cube rows, all of them or only the dates in ``dates_table``.
+
+    ``dates_table`` is a table with an ``Order_Date`` column listing the
+    dates a load touched. Runs on the caller's transaction; returns the
+    number of cube rows written.
+    """
+    if dates_table is None:
+        conn.execute(f"DELETE FROM {CUBE_TABLE}")
+        dates_filter = ''
+    else:
+        condition = _dates_condition(dates_table)
+        conn.execute(f"DELETE FROM {CUBE_TABLE} WHERE {condition}")
+        dates_filter = f" AND {condition}"
+
+    conn.execute(f"DROP TABLE IF EXISTS temp.{BASE_TABLE}")
+    conn.execute(_base_statement(dates_filter))
+    written = 0
+    for grouping_set in GROUPING_SETS:
+        written += conn.execute(_rollup_statement(grouping_set)).rowcount
+    conn.execute(f"DROP TABLE temp.{BASE_TABLE}")
+    return written
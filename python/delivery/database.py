@@ -0,0 +1,349 @@
+"""Bulk and incremental loading of the cleaned data into SQLite.
+
+``bulk_load`` rebuilds the table: it applies ``sql/01_schema.sql``
+(typed columns, ``ID`` primary key), inserts rows with ``executemany``
+in large transactions under write-tuned PRAGMAs, and builds the schema's
+indexes only once the data is in. ``upsert`` loads a delta into the
+existing table keyed on ``ID``. Every load appends a row to
+``load_watermarks`` and refreshes ``delivery_cube`` (see
+``delivery.cube``) in the same transaction.
+"""
+import datetime
+import re
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from delivery.cube import CUBE_TABLE, refresh_cube
+
+DB_PATH = 'data/food_delivery.db'
+SCHEMA_PATH = 'sql/01_schema.sql'
+TABLE = 'deliveries'
+WATERMARK_TABLE = 'load_watermarks'
+STAGING_TABLE = 'delivery_staging'
+LOAD_DATES_TABLE = 'load_dates'
+
+DEFAULT_BATCH_SIZE = 100_000
+
+# Per-connection settings for a bulk rebuild: the table is recreated from
+# the cleaned files, so durability during the load is not needed
+BULK_PRAGMAS = {
+    'journal_mode': 'MEMORY',
+    'synchronous': 'OFF',
+    'cache_size': -262144,  # 256 MB (negative = KiB)
+    'temp_store': 'MEMORY',
+}
+
+# Incremental loads write into the live database, so keep the journal
+INCREMENTAL_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'cache_size': -262144,
+    'temp_store': 'MEMORY',
+}
+
+# A delta never erases a known target: test rows arrive without one
+KEEP_KNOWN_COLUMNS = ['Time_taken_min', 'delivery_speed']
+
+_CREATE_INDEX = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\b[^;]*;', re.IGNORECASE)
+_CREATE_IF_NOT_EXISTS = re.compile(r'CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\b[^;]*;', re.IGNORECASE)
+
+# Cleaned-frame column names that differ from the SQL column names
+SQL_COLUMN_NAMES = {'Time_taken(min)': 'Time_taken_min'}
+
+
+def connect(path=DB_PATH):
+    return sqlite3.connect(path)
+
+
+def apply_pragmas(conn, pragmas=BULK_PRAGMAS):
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def split_schema(schema_sql):
+    """Split the schema script into (table DDL script, list of CREATE INDEX statements)."""
+    indexes = [match.group(0) for match in _CREATE_INDEX.finditer(schema_sql)]
+    return _CREATE_INDEX.sub('', schema_sql), indexes
+
+
+def read_schema(path=SCHEMA_PATH):
+    with open(path, 'r') as f:
+        return split_schema(f.read())
+
+
+def table_columns(conn, table=TABLE):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def table_exists(conn, table=TABLE):
+    query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    return conn.execute(query, (table,)).fetchone() is not None
+
+
+def ensure_tables(conn, schema_path=SCHEMA_PATH):
+    """Create the schema's ``IF NOT EXISTS`` tables (e.g. load_watermarks) without touching data."""
+    with open(schema_path, 'r') as f:
+        for match in _CREATE_IF_NOT_EXISTS.finditer(f.read()):
+            conn.execute(_strip_comments(match.group(0)))
+
+
+def _strip_comments(sql):
+    return re.sub(r'--[^\n]*', '', sql)
+
+
+def _is_time_column(series):
+    sample = series.dropna()
+    return series.dtype == object and len(sample) > 0 and isinstance(sample.iloc[0], datetime.time)
+
+
+def _sql_values(series):
+    """Column values as Python objects sqlite3 can bind (None for missing)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # Same text layout DataFrame.to_sql used, so existing exports stay identical.
+        # Orders share a handful of dates, so format each distinct date once.
+        codes, uniques = pd.factorize(series)
+        formatted = np.append(uniques.strftime('%Y-%m-%d %H:%M:%S.%f').to_numpy(dtype=object), None)
+        values = formatted[codes]
+    elif _is_time_column(series):
+        values = series.map(lambda value: value.isoformat() if isinstance(value, datetime.time) else value)
+        values = values.to_numpy(dtype=object)
+    else:
+        values = series.to_numpy(dtype=object)
+    values[pd.isna(series).to_numpy()] = None
+    return values
+
+
+def prepare_frame(df, columns):
+    """Columns of a cleaned frame converted for the table (missing ones as NULL)."""
+    df = df.rename(columns=SQL_COLUMN_NAMES)
+    return {col: (_sql_values(df[col]) if col in df.columns else np.full(len(df), None, dtype=object))
+            for col in columns}
+
+
+def unknown_columns(df, columns):
+    return [col for col in df.rename(columns=SQL_COLUMN_NAMES).columns if col not in columns]
+
+
+def insert_rows(conn, frame, columns, batch_size=DEFAULT_BATCH_SIZE, table=TABLE, verb='INSERT'):
+    """executemany in one transaction per ``batch_size`` rows; returns rows written."""
+    placeholders = ', '.join('?' for _ in columns)
+    sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    written = 0
+    for start in range(0, len(frame), batch_size):
+        values = prepare_frame(frame.iloc[start:start + batch_size], columns)
+        with conn:
+            conn.executemany(sql, zip(*(values[col] for col in columns)))
+        written += min(batch_size, len(frame) - start)
+    return written
+
+
+# ============================================
+# WATERMARKS
+# ============================================
+
+def latest_watermark(conn):
+    """Most recent load_watermarks row as a dict, or None."""
+    if not table_exists(conn, WATERMARK_TABLE):
+        return None
+    cursor = conn.execute(f"SELECT * FROM {WATERMARK_TABLE} ORDER BY load_id DESC LIMIT 1")
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip([col[0] for col in cursor.description], row))
+
+
+def record_watermark(conn, mode, rows_in, inserted, updated, table_rows):
+    max_order_date = conn.execute(f"SELECT MAX(Order_Date) FROM {TABLE}").fetchone()[0]
+    conn.execute(
+        f"INSERT INTO {WATERMARK_TABLE} (loaded_at, mode, rows_in, rows_inserted, rows_updated, "
+        f"max_order_date, table_rows) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (datetime.datetime.now().isoformat(timespec='seconds'), mode, rows_in, inserted, updated,
+         max_order_date, table_rows))
+
+
+def data_version(conn):
+    """Version stamp of the deliveries data, or None when loads are not tracked.
+
+    Built from the last load that changed rows and the current row
+    count, so a no-op incremental load keeps the version.
+    """
+    if not table_exists(conn, WATERMARK_TABLE) or not table_exists(conn):
+        return None
+    row = conn.execute(
+        f"SELECT load_id, loaded_at FROM {WATERMARK_TABLE} "
+        f"WHERE mode = 'full' OR rows_inserted > 0 OR rows_updated > 0 "
+        f"ORDER BY load_id DESC LIMIT 1").fetchone()
+    if row is None:
+        return None
+    rows = conn.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+    return f"{row[0]}:{row[1]}:{rows}"
+
+
+# ============================================
+# FULL REBUILD
+# ============================================
+
+def bulk_load(frames, path=DB_PATH, schema_path=SCHEMA_PATH, batch_size=DEFAULT_BATCH_SIZE):
+    """Rebuild the deliveries table from ``frames``; returns load timings.
+
+    Applies the schema without its indexes, inserts every frame, then
+    builds the indexes, fills the aggregate cube and refreshes the
+    planner statistics.
+    """
+    table_sql, indexes = read_schema(schema_path)
+    conn = connect(path)
+    try:
+        apply_pragmas(conn)
+        conn.executescript(table_sql)
+        columns = table_columns(conn)
+
+        start = time.perf_counter()
+        rows = 0
+        for frame in frames:
+            extra = unknown_columns(frame, columns)
+            if extra:
+                print(f"   [Skipping columns not in schema: {extra}]")
+            rows += insert_rows(conn, frame, columns, batch_size)
+        insert_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with conn:
+            for statement in indexes:
+                conn.execute(statement)
+            cube_rows = refresh_cube(conn)
+            conn.execute("ANALYZE")
+            record_watermark(conn, 'full', rows, rows, 0, rows)
+        index_seconds = time.perf_counter() - start
+    finally:
+        conn.close()
+
+    return {
+        'rows': rows,
+        'insert_seconds': insert_seconds,
+        'index_seconds': index_seconds,
+        'indexes': len(indexes),
+        'cube_rows': cube_rows,
+    }
+
+
+def register_load(rows, path=DB_PATH, schema_path=SCHEMA_PATH):
+    """Refill the aggregate cube and record a 'full' watermark after a load
+    that bypassed the loaders here (e.g. ``DataFrame.to_sql``)."""
+    conn = connect(path)
+    try:
+        ensure_tables(conn, schema_path)
+        with conn:
+            cube_rows = refresh_cube(conn)
+            record_watermark(conn, 'full', rows, rows, 0, rows)
+        return cube_rows
+    finally:
+        conn.close()
+
+
+# ============================================
+# INCREMENTAL (UPSERT) LOAD
+# ============================================
+
+def _upsert_statements(columns):
+    """UPDATE for changed existing rows and INSERT for new ones, both driven by the staging table."""
+    value_columns = [col for col in columns if col != 'ID']
+
+    def staged(col):
+        if col in KEEP_KNOWN_COLUMNS:
+            return f"COALESCE(s.{col}, {TABLE}.{col})"
+        return f"s.{col}"
+
+    changed = ' OR '.join(f"{TABLE}.{col} IS NOT {staged(col)}" for col in value_columns)
+    update = (
+        f"UPDATE {TABLE} SET ({', '.join(value_columns)}) = "
+        f"(SELECT {', '.join(staged(col) for col in value_columns)} "
+        f"FROM {STAGING_TABLE} s WHERE s.ID = {TABLE}.ID) "
+        f"WHERE ID IN (SELECT ID FROM {STAGING_TABLE}) "
+        f"AND EXISTS (SELECT 1 FROM {STAGING_TABLE} s WHERE s.ID = {TABLE}.ID AND ({changed}))"
+    )
+    insert = (
+        f"INSERT INTO {TABLE} ({', '.join(columns)}) "
+        f"SELECT {', '.join(columns)} FROM {STAGING_TABLE} s "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {TABLE} d WHERE d.ID = s.ID)"
+    )
+    return update, insert
+
+
+def upsert(frames, path=DB_PATH, schema_path=SCHEMA_PATH, batch_size=DEFAULT_BATCH_SIZE):
+    """Load a delta into the existing table, keyed on ``ID``; returns load counts.
+
+    New IDs are inserted, existing rows are updated only when a value
+    changed (a missing target never overwrites a known one), and the
+    load is recorded in ``load_watermarks``. Work is proportional to the
+    delta: rows are staged in a temp table and matched through the
+    primary key index, and only the cube dates the delta touches are
+    rebuilt.
+    """
+    conn = connect(path)
+    try:
+        apply_pragmas(conn, INCREMENTAL_PRAGMAS)
+        if not table_exists(conn):
+            # First load into an empty database: create the table and its indexes
+            table_sql, indexes = read_schema(schema_path)
+            conn.executescript(table_sql)
+            with conn:
+                for statement in indexes:
+                    conn.execute(statement)
+        cube_existed = table_exists(conn, CUBE_TABLE)
+        ensure_tables(conn, schema_path)
+        columns = table_columns(conn)
+        previous = latest_watermark(conn)
+
+        start = time.perf_counter()
+        conn.execute(f"DROP TABLE IF EXISTS temp.{STAGING_TABLE}")
+        conn.execute(f"CREATE TEMP TABLE {STAGING_TABLE} AS SELECT * FROM {TABLE} WHERE 0")
+        rows_in = 0
+        for frame in frames:
+            rows_in += insert_rows(conn, frame, columns, batch_size, table=f"temp.{STAGING_TABLE}")
+        stage_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        update, insert = _upsert_statements(columns)
+        with conn:
+            # Last occurrence of an ID in the delta wins
+            conn.execute(f"DELETE FROM {STAGING_TABLE} WHERE rowid NOT IN "
+                         f"(SELECT MAX(rowid) FROM {STAGING_TABLE} GROUP BY ID)")
+            conn.execute(f"CREATE INDEX temp.idx_staging_id ON {STAGING_TABLE}(ID)")
+            staged = conn.execute(f"SELECT COUNT(*) FROM {STAGING_TABLE}").fetchone()[0]
+            # Dates whose cube rows can change: the delta's dates and the current dates of its IDs
+            conn.execute(f"DROP TABLE IF EXISTS temp.{LOAD_DATES_TABLE}")
+            conn.execute(f"CREATE TEMP TABLE {LOAD_DATES_TABLE} AS "
+                         f"SELECT Order_Date FROM {STAGING_TABLE} UNION "
+                         f"SELECT Order_Date FROM {TABLE} WHERE ID IN (SELECT ID FROM {STAGING_TABLE})")
+            updated = conn.execute(update).rowcount
+            inserted = conn.execute(insert).rowcount
+            cube_rows = 0
+            if not cube_existed:
+                cube_rows = refresh_cube(conn)
+            elif updated or inserted:
+                cube_rows = refresh_cube(conn, f"temp.{LOAD_DATES_TABLE}")
+            if previous is not None and previous['table_rows'] is not None:
+                table_rows = previous['table_rows'] + inserted
+            else:
+                table_rows = conn.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+            record_watermark(conn, 'incremental', rows_in, inserted, updated, table_rows)
+        merge_seconds = time.perf_counter() - start
+        conn.execute(f"DROP TABLE temp.{STAGING_TABLE}")
+        conn.execute(f"DROP TABLE temp.{LOAD_DATES_TABLE}")
+    finally:
+        conn.close()
+
+    return {
+        'rows': rows_in,
+        'inserted': inserted,
+        'updated': updated,
+        'unchanged': staged - inserted - updated,
+        'table_rows': table_rows,
+        'cube_rows': cube_rows,
+        'stage_seconds': stage_seconds,
+        'merge_seconds': merge_seconds,
+    }
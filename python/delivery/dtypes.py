@@ -0,0 +1,104 @@
+"""Compact in-memory layout of the cleaned datasets.
+
+``clean_delivery_data`` leaves text columns as Python-object strings and
+flags and small counts as int64. ``compact_dtypes`` converts them with
+``CLEANED_DTYPES``: low-cardinality text to ``category``, flags and
+small integers to ``int8``/``int16``. A column is converted only when
+every value survives the cast (no missing values for the NumPy integer
+types, whole numbers within range), so the values downstream scripts see
+are unchanged. Coordinates, age and ratings stay float64 so the features
+the models are trained on are the same bits.
+
+Parquet and Feather keep the layout, so readers of the cleaned files get
+it without converting again (see ``delivery.storage``).
+"""
+import numpy as np
+import pandas as pd
+
+CLEANED_DTYPES = {
+    # Low-cardinality text
+    'Delivery_person_ID': 'category',
+    'Weatherconditions': 'category',
+    'Road_traffic_density': 'category',
+    'Vehicle_condition': 'category',
+    'Type_of_order': 'category',
+    'Type_of_vehicle': 'category',
+    'City': 'category',
+    'day_name': 'category',
+    'time_period': 'category',
+    'delivery_speed': 'category',
+    # Flags
+    'is_weekend': 'int8',
+    'is_peak_hour': 'int8',
+    # Small integers
+    'multiple_deliveries': 'int8',
+    'weather_severity': 'int8',
+    'traffic_level': 'int8',
+    'order_month': 'int8',
+    'order_day': 'int8',
+    'order_dayofweek': 'int8',
+    'order_week': 'UInt8',
+    'order_year': 'int16',
+    'Time_taken(min)': 'int16',
+}
+
+
+def _fits(series, dtype):
+    """Whether ``series`` converts to ``dtype`` without changing a value."""
+    if dtype == 'category':
+        return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+    if not pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        return False
+    target = pd.api.types.pandas_dtype(dtype)
+    nullable = isinstance(target, pd.api.extensions.ExtensionDtype)
+    values = series.dropna()
+    if len(values) < len(series) and not nullable:
+        return False
+    if len(values) == 0:
+        return True
+    values = values.to_numpy(dtype=np.float64)
+    info = np.iinfo(target.numpy_dtype if nullable else target)
+    return bool(np.all(values == np.floor(values)) and values.min() >= info.min and values.max() <= info.max)
+
+
+def compact_dtypes(df, dtypes=CLEANED_DTYPES):
+    """``df`` with the columns in ``dtypes`` converted where the cast is lossless.
+
+    Columns that are missing, already converted or would lose values
+    (e.g. a count with missing values headed for int8) are left as they are.
+    """
+    casts = {col: dtype for col, dtype in dtypes.items()
+             if col in df.columns and df[col].dtype != dtype and _fits(df[col], dtype)}
+    return df.astype(casts) if casts else df
+
+
+def sort_categories(df):
+    """Sort the categories of unordered categorical columns in place.
+
+    Arrow unifies dictionaries chunk by chunk on read, so a file written
+    in chunks can come back with categories in first-seen order.
+    """
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and not dtype.ordered:
+            categories = dtype.categories
+            if not categories.is_monotonic_increasing:
+                df[col] = df[col].cat.reorder_categories(categories.sort_values())
+    return df
+
+
+def memory_bytes(df):
+    """Deep memory usage of ``df``'s columns in bytes."""
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def memory_report(before, after):
+    """Per-column dtypes and MB of ``before`` and ``after``, largest saving first."""
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.astype(str),
+        'mb_before': before.memory_usage(deep=True, index=False) / 2**20,
+        'mb_after': after.memory_usage(deep=True, index=False) / 2**20,
+    })
+    report['saved_mb'] = report['mb_before'] - report['mb_after']
+    return report.sort_values('saved_mb', ascending=False)
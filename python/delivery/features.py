@@ -0,0 +1,180 @@
+"""Vectorized derived columns used by ``clean_delivery_data``.
+
+These replace per-row ``Series.apply`` calls with ``np.select`` binning,
+and do string, number and date parsing once per distinct value: a
+column is factorized, its few dozen uniques are cleaned or parsed, and
+the results are broadcast back through the codes, so the cost depends
+on cardinality rather than row count. Outputs are identical to the
+row-wise versions they replace.
+"""
+import datetime
+import re
+
+import numpy as np
+import pandas as pd
+
+PEAK_HOURS = [12, 13, 19, 20]
+
+# Labels are picked by integer bin code, so the outputs are plain object arrays
+TIME_PERIODS = np.array(['Unknown', 'Morning', 'Afternoon', 'Evening', 'Night'], dtype=object)
+SPEED_BANDS = np.array(['Very Fast', 'Fast', 'Normal', 'Slow', 'Very Slow'], dtype=object)
+
+_HHMM = re.compile(r'(\d{1,2}):(\d{1,2})')
+
+
+def _parse_hhmm_value(value):
+    # Same inputs pd.to_datetime(..., format='%H:%M') accepts
+    match = _HHMM.fullmatch(value) if isinstance(value, str) else None
+    if match is None:
+        return np.nan, np.nan
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        return np.nan, np.nan
+    return hour, minute
+
+
+def parse_hhmm(values):
+    """Parse ``HH:MM`` strings into float hour and minute arrays (NaN when invalid).
+
+    Each distinct string is parsed once and the results are broadcast
+    back through the factorized codes.
+    """
+    codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+    parsed = np.array([_parse_hhmm_value(value) for value in uniques], dtype=float).reshape(-1, 2)
+    # Sentinel -1 (missing input) picks the trailing NaN row
+    parsed = np.vstack([parsed, [np.nan, np.nan]])
+    return parsed[codes, 0], parsed[codes, 1]
+
+
+def distinct_values(values):
+    """``(codes, distinct)`` for computing a Series once per distinct value.
+
+    ``distinct`` holds the unique values with the Series' dtype; when any
+    value is missing, one missing entry is appended and the missing rows'
+    codes point at it. Compute on ``distinct`` and ``.take(codes)``.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    distinct = pd.Series(uniques, dtype=values.dtype)
+    missing = codes < 0
+    if missing.any():
+        codes = np.where(missing, len(distinct), codes)
+        distinct = pd.concat([distinct, pd.Series([None], dtype=values.dtype)], ignore_index=True)
+    return codes, distinct
+
+
+def map_distinct(values, func, missing=None):
+    """``func`` applied once per distinct non-missing value of a Series, as an object Series.
+
+    Missing values are passed through unchanged, as ``.str`` methods do,
+    or through ``missing`` row by row when given.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    mapped = np.empty(len(uniques), dtype=object)
+    mapped[:] = [func(value) for value in uniques]
+    valid = codes >= 0
+    if valid.all():
+        out = mapped[codes]
+    else:
+        out = values.to_numpy(dtype=object, copy=True)
+        out[valid] = mapped[codes[valid]]
+        if missing is not None:
+            out[~valid] = [missing(value) for value in out[~valid]]
+    return pd.Series(out, index=values.index, dtype=object)
+
+
+def clean_text(values, prefix=None):
+    """``.str.replace(prefix, '').str.strip().str.title()`` in one pass over the distinct values."""
+    def clean(value):
+        if not isinstance(value, str):
+            return np.nan
+        if prefix:
+            value = value.replace(prefix, '')
+        return value.strip().title()
+    return map_distinct(values, clean)
+
+
+def strip_text(values):
+    """``.astype(str).str.strip()`` over the distinct values."""
+    def strip(value):
+        return str(value).strip()
+    return map_distinct(values, strip, missing=strip)
+
+
+def to_numeric(values):
+    """``pd.to_numeric(values, errors='coerce')`` parsed once per distinct value."""
+    codes, distinct = distinct_values(values)
+    return pd.to_numeric(distinct, errors='coerce').take(codes).set_axis(values.index)
+
+
+def extract_minutes(values):
+    """``pd.to_numeric(values.astype(str).str.extract(r'(\\d+)')[0])`` per distinct value ("(min) 24" -> 24)."""
+    codes, distinct = distinct_values(values)
+    digits = distinct.astype(str).str.extract(r'(\d+)')[0]
+    return pd.to_numeric(digits, errors='coerce').take(codes).set_axis(values.index)
+
+
+def parse_dates(values, format):
+    """``pd.to_datetime(values, format=format, errors='coerce')`` parsed once per distinct value."""
+    codes, distinct = distinct_values(values)
+    return pd.to_datetime(distinct, format=format, errors='coerce').take(codes).set_axis(values.index)
+
+
+def date_parts(dates):
+    """Year, month, day, day of week, ISO week and day name of a datetime Series, per distinct date.
+
+    Returns ``{column: Series}`` with the dtypes the ``.dt`` accessors give
+    on the full column.
+    """
+    codes, distinct = distinct_values(dates)
+    parts = {
+        'order_year': distinct.dt.year,
+        'order_month': distinct.dt.month,
+        'order_day': distinct.dt.day,
+        'order_dayofweek': distinct.dt.dayofweek,
+        'order_week': distinct.dt.isocalendar().week,
+        'day_name': distinct.dt.day_name(),
+    }
+    return {name: part.take(codes).set_axis(dates.index) for name, part in parts.items()}
+
+
+def to_time_objects(hours, minutes, index=None):
+    """Build the ``datetime.time`` column the cleaned frames have always stored."""
+    valid = ~(np.isnan(hours) | np.isnan(minutes))
+    keys = np.where(valid, np.nan_to_num(hours) * 60 + np.nan_to_num(minutes), -1).astype(int)
+    # One time object per distinct minute of the day
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    objects = np.empty(len(unique_keys), dtype=object)
+    objects[:] = [pd.NaT if key < 0 else datetime.time(key // 60, key % 60) for key in unique_keys]
+    return pd.Series(objects[inverse], index=index, dtype=object)
+
+
+def order_hour(hours, index=None):
+    """Hour column with the dtype ``.dt.hour`` gives: int32, or float64 when any is missing."""
+    hour = pd.Series(hours, index=index, dtype=float)
+    if len(hour) and hour.notna().all():
+        return hour.astype('int32')
+    return hour
+
+
+def time_period(hours):
+    """Morning/Afternoon/Evening/Night bins of the order hour ('Unknown' when missing)."""
+    hours = np.asarray(hours, dtype=float)
+    conditions = [
+        np.isnan(hours),
+        (hours >= 6) & (hours < 12),
+        (hours >= 12) & (hours < 17),
+        (hours >= 17) & (hours < 21),
+    ]
+    return TIME_PERIODS[np.select(conditions, [0, 1, 2, 3], default=4)]
+
+
+def is_peak_hour(hours):
+    """1 for lunch (12-2pm) and dinner (7-9pm) hours, else 0."""
+    return np.isin(np.asarray(hours, dtype=float), PEAK_HOURS).astype(int)
+
+
+def delivery_speed(minutes):
+    """Speed bands of the delivery time; anything above 50 minutes (or missing) is 'Very Slow'."""
+    minutes = np.asarray(minutes, dtype=float)
+    conditions = [minutes <= 20, minutes <= 30, minutes <= 40, minutes <= 50]
+    return SPEED_BANDS[np.select(conditions, [0, 1, 2, 3], default=4)]
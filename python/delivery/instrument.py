@@ -0,0 +1,246 @@
+"""Per-step timing and memory records, written as JSON lines.
+
+``step`` is a context manager (``timed`` the decorator form) that
+measures a named step of a script: wall time, CPU time of this process
+and of child processes it waited for (e.g. a process pool), resident
+memory at the end and the peak resident memory during the step, plus an
+optional row count. Each finished step appends one JSON object to
+``data/pipeline/steps.jsonl``:
+
+    {"ts": "...", "run_id": "...", "script": "06_ml_model_training.py",
+     "step": "tournament", "parent": null, "depth": 0, "wall_s": 131.2,
+     "cpu_s": 0.9, "children_cpu_s": 128.4, "rss_mb": 412.0,
+     "peak_rss_mb": 455.1, "rows": 45157, "status": "ok", "pid": 1234}
+
+``substep`` records only inside an enclosing step, so library code
+(e.g. the fit and collect phases of ``run_tournament``) is broken down
+when a script times it but writes nothing when called on its own.
+
+Environment variables:
+
+    DELIVERY_STEPS_FILE   where records go ('' turns recording off)
+    DELIVERY_RUN_ID       groups the records of one pipeline run
+    DELIVERY_PROFILE      'cprofile' and/or 'tracemalloc' (comma separated)
+
+With ``cprofile``, every outermost step is profiled and its stats saved
+to ``data/pipeline/profiles/<script>.<step>.<run_id>.prof`` (open with
+``pstats`` or snakeviz). With ``tracemalloc``, every step records the
+peak of Python allocations, and outermost steps also record their top
+allocation sites.
+"""
+import cProfile
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+STEPS_FILE = 'data/pipeline/steps.jsonl'
+PROFILES_DIR = 'data/pipeline/profiles'
+TOP_ALLOCATIONS = 5
+
+_RUN_ID = os.environ.get('DELIVERY_RUN_ID') or f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+_PROFILE = {mode.strip() for mode in os.environ.get('DELIVERY_PROFILE', '').lower().split(',') if mode.strip()}
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def steps_file():
+    return os.environ.get('DELIVERY_STEPS_FILE', STEPS_FILE)
+
+
+def run_id():
+    return _RUN_ID
+
+
+def _script():
+    return os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python'
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return None
+
+
+def _peak_rss_bytes():
+    """High-water mark of resident memory since the last reset (process peak elsewhere)."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets VmHWM to the current RSS
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _mb(value):
+    return None if value is None else round(value / 2**20, 1)
+
+
+class Step:
+    """A running step; set ``rows`` (or add ``extra`` fields) before it ends."""
+
+    def __init__(self, name, rows=None, **extra):
+        self.name = name
+        self.rows = rows
+        self.extra = extra
+        self.wall_s = None
+        self._peak = 0
+        self._py_peak = 0
+
+    def _start(self, parent):
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        if parent is not None:
+            # The reset below would lose the parent's peak so far
+            parent._peak = max(parent._peak, _peak_rss_bytes() or 0)
+            if tracemalloc.is_tracing():
+                parent._py_peak = max(parent._py_peak, tracemalloc.get_traced_memory()[1])
+        _reset_peak_rss()
+
+        self._profiler = None
+        self._snapshot = None
+        if 'tracemalloc' in _PROFILE:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            if parent is None:
+                self._snapshot = tracemalloc.take_snapshot()
+        if 'cprofile' in _PROFILE and parent is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._children_cpu = _children_cpu()
+
+    def _finish(self, status):
+        self.wall_s = time.perf_counter() - self._wall
+        self.cpu_s = time.process_time() - self._cpu
+        children_cpu = _children_cpu() - self._children_cpu
+        if self._profiler is not None:
+            self._profiler.disable()
+        self._peak = max(self._peak, _peak_rss_bytes() or 0)
+
+        record = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'run_id': _RUN_ID,
+            'script': _script(),
+            'step': self.name,
+            'parent': None if self.parent is None else self.parent.name,
+            'depth': self.depth,
+            'wall_s': round(self.wall_s, 4),
+            'cpu_s': round(self.cpu_s, 4),
+            'children_cpu_s': round(children_cpu, 4),
+            'rss_mb': _mb(_rss_bytes()),
+            'peak_rss_mb': _mb(self._peak),
+            'rows': None if self.rows is None else int(self.rows),
+            'status': status,
+            'pid': os.getpid(),
+            **self.extra,
+        }
+        if tracemalloc.is_tracing():
+            self._py_peak = max(self._py_peak, tracemalloc.get_traced_memory()[1])
+            record['py_peak_mb'] = _mb(self._py_peak)
+            if self._snapshot is not None:
+                stats = tracemalloc.take_snapshot().compare_to(self._snapshot, 'lineno')[:TOP_ALLOCATIONS]
+                record['top_allocations'] = [{'where': str(stat.traceback), 'mb': _mb(stat.size_diff)}
+                                             for stat in stats]
+        if self._profiler is not None:
+            os.makedirs(PROFILES_DIR, exist_ok=True)
+            profile_path = os.path.join(
+                PROFILES_DIR, f"{os.path.splitext(record['script'])[0]}.{self.name}.{_RUN_ID}.prof")
+            self._profiler.dump_stats(profile_path)
+            record['profile'] = profile_path
+
+        if self.parent is not None:
+            self.parent._peak = max(self.parent._peak, self._peak)
+            self.parent._py_peak = max(self.parent._py_peak, self._py_peak)
+        _write(record)
+
+
+def _write(record):
+    path = steps_file()
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    line = json.dumps(record, default=str) + '\n'
+    with _write_lock, open(path, 'a') as f:
+        f.write(line)
+
+
+@contextmanager
+def step(name, rows=None, **extra):
+    """Time and record the enclosed block as step ``name``; yields the ``Step``."""
+    stack = _stack()
+    current = Step(name, rows, **extra)
+    current._start(stack[-1] if stack else None)
+    stack.append(current)
+    status = 'ok'
+    try:
+        yield current
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        stack.pop()
+        current._finish(status)
+
+
+@contextmanager
+def substep(name, rows=None, **extra):
+    """Like ``step``, but records only when called inside another step."""
+    if not _stack():
+        yield Step(name, rows, **extra)
+        return
+    with step(name, rows, **extra) as current:
+        yield current
+
+
+def timed(name=None):
+    """Decorator form of ``step`` (named after the function by default)."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with step(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def read_steps(path=None):
+    """All recorded steps as a DataFrame (one row per JSON line)."""
+    import pandas as pd
+
+    return pd.read_json(path or steps_file(), lines=True)
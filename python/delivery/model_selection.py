@@ -0,0 +1,240 @@
+"""Cross-validated model tournament on a process pool.
+
+``run_tournament`` fits every candidate on k cross-validation folds and
+on the 80/20 holdout split at the same time, one (model, fold) task per
+worker process. The encoded feature matrix is written once to ``.npy``
+files that workers open with ``mmap_mode='r'``, so it is shared through
+the page cache instead of being pickled to every task. Each task
+records its fit and predict time and returns its validation
+predictions, which are saved as a Parquet file so evaluation can score
+the out-of-fold predictions without loading a model.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold, train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+
+from delivery.instrument import substep
+
+RANDOM_STATE = 42
+DEFAULT_FOLDS = 5
+HOLDOUT_SIZE = 0.2
+HOLDOUT = 'holdout'
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+CV_RESULTS_PATH = 'ml_models/saved_models/cv_results.csv'
+VALIDATION_PREDICTIONS_PATH = 'ml_models/saved_models/validation_predictions.parquet'
+
+
+def regression_metrics(y_true, y_pred):
+    mse = mean_squared_error(y_true, y_pred)
+    return {
+        'rmse': np.sqrt(mse),
+        'mae': mean_absolute_error(y_true, y_pred),
+        'r2': r2_score(y_true, y_pred),
+        'mse': mse,
+    }
+
+
+class SharedMatrix:
+    """Feature matrix and target saved as .npy files for memory-mapped reads.
+
+    Used as a context manager; the temporary directory is removed on exit.
+    """
+
+    def __init__(self, X, y):
+        self.directory = tempfile.mkdtemp(prefix='delivery_cv_')
+        self.columns = list(X.columns)
+        self.x_path = os.path.join(self.directory, 'X.npy')
+        self.y_path = os.path.join(self.directory, 'y.npy')
+        np.save(self.x_path, X.to_numpy(dtype=np.float64))
+        np.save(self.y_path, np.asarray(y, dtype=np.float64))
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Memory maps opened by this process, so each worker maps the files once
+_MAPPED = {}
+
+
+def _mapped(path):
+    if path not in _MAPPED:
+        _MAPPED[path] = np.load(path, mmap_mode='r')
+    return _MAPPED[path]
+
+
+def _fit_fold(name, estimator, scaled, x_path, y_path, columns, train_idx, val_idx, fold, threads=None):
+    """Fit one candidate on one split; returns metrics, timings, the validation
+    predictions and (for the holdout) the model.
+
+    ``threads`` caps the OpenMP/BLAS threads of estimators without an
+    ``n_jobs`` parameter (e.g. HistGradientBoostingRegressor).
+    """
+    X = _mapped(x_path)
+    y = _mapped(y_path)
+    # Fancy indexing copies only this split's rows out of the shared map
+    X_fit = pd.DataFrame(X[train_idx], columns=columns)
+    X_val = pd.DataFrame(X[val_idx], columns=columns)
+
+    model = clone(estimator)
+    if scaled:
+        model = make_pipeline(StandardScaler(), model)
+
+    with threadpool_limits(limits=threads):
+        start = time.perf_counter()
+        model.fit(X_fit, y[train_idx])
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        y_pred = model.predict(X_val)
+        predict_seconds = time.perf_counter() - start
+
+    result = {'model': name, 'fold': fold, **regression_metrics(y[val_idx], y_pred),
+              'fit_seconds': fit_seconds, 'predict_seconds': predict_seconds,
+              'train_rows': len(train_idx), 'val_rows': len(val_idx), 'predictions': y_pred}
+    if fold == HOLDOUT:
+        # Scaled models are saved bare; the bundle applies its scaler itself
+        result['fitted'] = model[-1] if scaled else model
+    return result
+
+
+def _pool_context():
+    # Scripts in python/ have no __main__ guard, so workers must fork
+    # rather than re-import the calling script
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def pool_context(workers):
+    """Multiprocessing context for ``workers`` > 1, or None to run tasks in-process."""
+    return _pool_context() if workers > 1 else None
+
+
+def single_threaded(estimator):
+    if 'n_jobs' in estimator.get_params():
+        return clone(estimator).set_params(n_jobs=1)
+    return estimator
+
+
+def iter_fit_results(tasks, context, workers):
+    """Run ``_fit_fold`` argument tuples; yields (task index, result) as they finish."""
+    if context is None:
+        for i, task in enumerate(tasks):
+            yield i, _fit_fold(*task)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context) as pool:
+        futures = {pool.submit(_fit_fold, *task): i for i, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def holdout_split(n_rows):
+    """The 80/20 train/validation split of row positions used for the holdout fit."""
+    return train_test_split(np.arange(n_rows), test_size=HOLDOUT_SIZE, random_state=RANDOM_STATE)
+
+
+def run_tournament(candidates, X, y, folds=DEFAULT_FOLDS, workers=DEFAULT_WORKERS):
+    """Cross-validate and holdout-fit every candidate concurrently.
+
+    ``candidates`` maps a model name to ``(estimator, scaled)``; scaled
+    candidates get a StandardScaler fit inside each split. Returns
+    ``(holdout, fold_results, predictions)``: per-model holdout metrics
+    with the fitted model under 'model' (with the candidate's own
+    ``n_jobs``), one DataFrame row per (model, fold), and one row per
+    (model, fold, validation row) with the row position, actual and
+    predicted value. Across the k folds every row
+    is predicted once by a model that did not see it. The holdout split
+    is the same ``train_test_split(test_size=0.2, random_state=42)`` the
+    training script has always used.
+    """
+    rows = np.arange(len(X))
+    splits = [(str(i + 1), train_idx, val_idx) for i, (train_idx, val_idx)
+              in enumerate(KFold(folds, shuffle=True, random_state=RANDOM_STATE).split(rows))]
+    holdout_train, holdout_val = holdout_split(len(X))
+    splits.insert(0, (HOLDOUT, holdout_train, holdout_val))
+
+    context = pool_context(workers)
+    threads = 1 if context is not None else None
+    with SharedMatrix(X, y) as shared:
+        tasks, task_rows = [], []
+        for name, (estimator, scaled) in candidates.items():
+            if context is not None:
+                # Parallelism comes from the pool; one thread per task avoids oversubscription
+                estimator = single_threaded(estimator)
+            for fold, train_idx, val_idx in splits:
+                tasks.append((name, estimator, scaled, shared.x_path, shared.y_path, shared.columns,
+                              train_idx, val_idx, fold, threads))
+                task_rows.append(val_idx)
+
+        results = [None] * len(tasks)
+        with substep('fit_folds', tasks=len(tasks)):
+            for i, result in iter_fit_results(tasks, context, workers):
+                results[i] = result
+
+    actual = np.asarray(y, dtype=np.float64)
+    with substep('collect_predictions') as timing:
+        predictions = pd.concat([
+            pd.DataFrame({'model': result['model'], 'fold': result['fold'], 'row': rows,
+                          'actual': actual[rows], 'predicted': result.pop('predictions')})
+            for result, rows in zip(results, task_rows)
+        ], ignore_index=True)
+        timing.rows = len(predictions)
+
+    holdout = {}
+    for result in results:
+        if result['fold'] == HOLDOUT:
+            fitted = result.pop('fitted')
+            original = candidates[result['model']][0].get_params()
+            if 'n_jobs' in original:
+                # The saved model keeps its own parallelism, not the pool's single thread
+                fitted.set_params(n_jobs=original['n_jobs'])
+            holdout[result['model']] = {**result, 'model': fitted}
+    fold_results = pd.DataFrame([result for result in results if result['fold'] != HOLDOUT])
+    return holdout, fold_results, predictions
+
+
+def save_validation_predictions(predictions, path=VALIDATION_PREDICTIONS_PATH):
+    """Write (ID, model, fold, actual, predicted) rows as Parquet; model and fold are dictionary-encoded."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    predictions.astype({'model': 'category', 'fold': 'category'}).to_parquet(path, index=False)
+
+
+def load_validation_predictions(model=None, path=VALIDATION_PREDICTIONS_PATH):
+    """Validation predictions saved by training, only ``model``'s rows when given."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No validation predictions at {path}; run 06_ml_model_training.py first")
+    filters = [('model', '==', model)] if model is not None else None
+    predictions = pd.read_parquet(path, filters=filters)
+    predictions['fold'] = predictions['fold'].astype(str)
+    return predictions
+
+
+def summarize_folds(fold_results):
+    """Mean and spread of the cross-validation metrics per model."""
+    summary = fold_results.groupby('model', sort=False).agg(
+        cv_r2_mean=('r2', 'mean'),
+        cv_r2_std=('r2', 'std'),
+        cv_rmse_mean=('rmse', 'mean'),
+        cv_mae_mean=('mae', 'mean'),
+        cv_fit_seconds=('fit_seconds', 'mean'),
+    )
+    return summary
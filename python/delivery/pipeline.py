@@ -0,0 +1,331 @@
+"""Incremental runner for the numbered pipeline scripts.
+
+Each ``Stage`` names a script with the files it reads and writes. A stage
+depends on every stage that writes one of its inputs, which gives the
+DAG:
+
+    explore
+    clean -> load_sql -> sql_analytics
+          -> eda
+          -> train -> predict
+                   -> evaluate
+
+A stage's fingerprint is the SHA-256 of its inputs, of its script and of
+the ``delivery`` modules the script imports (followed transitively).
+``PipelineRunner`` runs a stage only when that fingerprint differs from
+the last successful run, or when one of its outputs is missing or was
+changed since (``Stage.shared_outputs`` only when missing). An upstream stage that reruns but writes byte-identical
+outputs leaves its dependents skipped. Scripts run as subprocesses on a
+thread pool, so independent branches (SQL analytics and EDA next to
+model training) run at the same time; each stage's output goes to its
+own log file, and all stages record their timed steps (see
+``delivery.instrument``) under the runner's run id.
+
+File hashes are cached by size and modification time in the state file,
+so a rerun with nothing changed only stats the files.
+"""
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from delivery.bundle import BUNDLES_DIR, CURRENT_FILE
+from delivery.cleaning import STATS_PATH
+from delivery.database import DB_PATH, SCHEMA_PATH
+from delivery.instrument import run_id
+from delivery.analytics import CUBE_SQL_FILE, EXPORTS_DIR, SQL_FILES
+from delivery.model_selection import CV_RESULTS_PATH, VALIDATION_PREDICTIONS_PATH
+from delivery.scoring import SUBMISSION_PATH
+from delivery.storage import cleaned_path
+from delivery.tuning import TUNED_PARAMS_PATH
+
+PIPELINE_DIR = 'data/pipeline'
+STATE_FILE = 'state.json'
+LOGS_DIR = 'logs'
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_JOBS = max(2, os.cpu_count() or 1)
+
+RAW_TRAIN = 'data/raw data/train.csv'
+RAW_TEST = 'data/raw data/test.csv'
+CLEANED = [cleaned_path('train'), cleaned_path('test')]
+CURRENT_BUNDLE = os.path.join(BUNDLES_DIR, CURRENT_FILE)
+MODEL_RESULTS = 'ml_models/saved_models/model_results.csv'
+FEATURE_IMPORTANCE = 'ml_models/saved_models/feature_importance.csv'
+
+
+class Stage:
+    """A script with the files it reads (``inputs``) and writes (``outputs``).
+
+    Paths may be files or directories. Inputs that do not exist are
+    fingerprinted as missing, so optional files (e.g. tuned parameters)
+    trigger a rerun when they appear or go away; an output a run did not
+    write is recorded the same way. ``shared_outputs`` are
+    outputs other tools update in place, such as the database after
+    ``03_load_to_sql.py --incremental``: the stage reruns when one goes
+    missing but not when it changed, which would throw those updates away.
+    """
+
+    def __init__(self, name, script, inputs, outputs, args=(), shared_outputs=()):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.args = list(args)
+        self.shared_outputs = list(shared_outputs)
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, {self.script!r})"
+
+
+STAGES = [
+    Stage('explore', 'python/01_explore_data.py',
+          [RAW_TRAIN, RAW_TEST, 'data/raw data/Sample_Submission.csv'], []),
+    Stage('clean', 'python/02_data_cleaning.py',
+          [RAW_TRAIN, RAW_TEST],
+          CLEANED + [STATS_PATH, 'docs/reports/cleaning_report.txt']),
+    Stage('load_sql', 'python/03_load_to_sql.py',
+          CLEANED + [SCHEMA_PATH], [DB_PATH], shared_outputs=[DB_PATH]),
+    Stage('sql_analytics', 'python/outputs/04_run_sql_analytics.py',
+          [DB_PATH, CUBE_SQL_FILE] + SQL_FILES, [EXPORTS_DIR]),
+    Stage('eda', 'python/05_eda_analysis.py',
+          CLEANED,
+          ['docs/reports/01_target_distribution.png', 'docs/reports/02_correlation_heatmap.png',
+           'docs/reports/03_categorical_impact.png', 'docs/reports/04_time_series_trend.png']),
+    Stage('train', 'python/06_ml_model_training.py',
+          CLEANED + [STATS_PATH, TUNED_PARAMS_PATH],
+          [CURRENT_BUNDLE, MODEL_RESULTS, CV_RESULTS_PATH, VALIDATION_PREDICTIONS_PATH, FEATURE_IMPORTANCE]),
+    Stage('predict', 'python/07_predictions.py',
+          [cleaned_path('test'), CURRENT_BUNDLE],
+          [SUBMISSION_PATH, 'docs/reports/prediction_report.txt']),
+    Stage('evaluate', 'python/08_model_evaluation.py',
+          [cleaned_path('test'), CURRENT_BUNDLE, MODEL_RESULTS, VALIDATION_PREDICTIONS_PATH, FEATURE_IMPORTANCE],
+          ['docs/reports/08_model_evaluation.png', 'docs/reports/09_feature_importance.png',
+           'docs/reports/model_evaluation_report.txt']),
+]
+
+
+def module_dependencies(script, package_dir=PACKAGE_DIR):
+    """Paths of the ``delivery`` modules ``script`` imports, directly or through each other."""
+    found = set()
+    pending = [script]
+    while pending:
+        with open(pending.pop(), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module == 'delivery':
+                # from delivery import features
+                names = [f"delivery.{alias.name}" for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                names = [node.module]
+            elif isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            else:
+                continue
+            for name in names:
+                parts = name.split('.')
+                if parts[0] != 'delivery' or len(parts) < 2:
+                    continue
+                path = os.path.join(package_dir, parts[1] + '.py')
+                if path not in found and os.path.exists(path):
+                    found.add(path)
+                    pending.append(path)
+    return sorted(found)
+
+
+def upstream(stages):
+    """Map each stage name to the names of the stages that write its inputs."""
+    writers = {}
+    for stage in stages:
+        for path in stage.outputs:
+            writers[os.path.normpath(path)] = stage.name
+    return {stage.name: sorted({writers[os.path.normpath(path)] for path in stage.inputs
+                                if os.path.normpath(path) in writers} - {stage.name})
+            for stage in stages}
+
+
+class Fingerprints:
+    """SHA-256 of files and directories, reusing hashes of files whose size and mtime are unchanged."""
+
+    def __init__(self, cache=None):
+        self.cache = dict(cache or {})
+
+    def file(self, path):
+        stat = os.stat(path)
+        key = os.path.relpath(path)
+        cached = self.cache.get(key)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        self.cache[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def path(self, path):
+        """Hash of a file, of a directory's files (hidden entries skipped), or None if missing."""
+        if os.path.isfile(path):
+            return self.file(path)
+        if not os.path.isdir(path):
+            return None
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in sorted(f for f in files if not f.startswith('.')):
+                full = os.path.join(root, name)
+                digest.update(f"{os.path.relpath(full, path)}\0{self.file(full)}\0".encode())
+        return digest.hexdigest()
+
+    def stage(self, stage):
+        """Fingerprint of everything a stage reads: script, imported modules, inputs and arguments."""
+        digest = hashlib.sha256()
+        for path in [stage.script] + module_dependencies(stage.script) + stage.inputs:
+            digest.update(f"{os.path.relpath(path)}\0{self.path(path)}\0".encode())
+        digest.update(json.dumps(stage.args).encode())
+        return digest.hexdigest()
+
+
+class PipelineRunner:
+    """Run the stages whose fingerprints changed, independent ones concurrently.
+
+    ``force`` names stages to rerun regardless; ``targets`` limits the run
+    to those stages and everything upstream of them. Progress goes to
+    ``log``; each stage's stdout and stderr go to
+    ``<directory>/logs/<stage>.log``.
+    """
+
+    def __init__(self, stages=STAGES, directory=PIPELINE_DIR, jobs=DEFAULT_JOBS, force=(), targets=None,
+                 log=print):
+        self.stages = {stage.name: stage for stage in stages}
+        self.depends_on = upstream(stages)
+        self.directory = directory
+        self.jobs = jobs
+        self.force = set(force)
+        self.log = log
+        unknown = (self.force | set(targets or ())) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stage(s) {sorted(unknown)}; stages: {list(self.stages)}")
+        self.selected = self._with_upstream(targets) if targets else list(self.stages)
+        self.state = self._load_state()
+        self.fingerprints = Fingerprints(self.state.get('files'))
+
+    def _with_upstream(self, targets):
+        selected, pending = set(), list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.depends_on[name])
+        return [name for name in self.stages if name in selected]
+
+    def _state_path(self):
+        return os.path.join(self.directory, STATE_FILE)
+
+    def _load_state(self):
+        try:
+            with open(self._state_path(), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'stages': {}, 'files': {}}
+
+    def _save_state(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.state['files'] = self.fingerprints.cache
+        tmp_path = self._state_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self._state_path())
+
+    def reason(self, name):
+        """Why stage ``name`` must run now, or None when it is up to date."""
+        stage = self.stages[name]
+        record = self.state['stages'].get(name)
+        if name in self.force:
+            return 'forced'
+        if record is None:
+            return 'never run'
+        if self.fingerprints.stage(stage) != record['fingerprint']:
+            return 'inputs changed'
+        for path in stage.outputs:
+            current = self.fingerprints.path(path)
+            recorded = record['outputs'].get(path)
+            # Outputs the last run did not write (e.g. feature importances of a
+            # model without them) are not expected to exist
+            if current is None and (recorded is not None or path not in record['outputs']):
+                return f"missing {path}"
+            if current != recorded and path not in stage.shared_outputs:
+                return f"{path} changed"
+        return None
+
+    def plan(self):
+        """(stage, reason) for every selected stage, assuming changes propagate downstream."""
+        pending = {}
+        for name in self.selected:
+            reason = self.reason(name)
+            stale_upstream = [dep for dep in self.depends_on[name] if pending.get(dep)]
+            if reason is None and stale_upstream:
+                reason = f"after {', '.join(stale_upstream)}"
+            pending[name] = reason
+        return list(pending.items())
+
+    def _execute(self, stage):
+        os.makedirs(os.path.join(self.directory, LOGS_DIR), exist_ok=True)
+        log_path = os.path.join(self.directory, LOGS_DIR, f"{stage.name}.log")
+        start = time.perf_counter()
+        with open(log_path, 'w') as log_file:
+            # One run id across stages groups their records in the steps file
+            process = subprocess.run([sys.executable, stage.script, *stage.args],
+                                     stdout=log_file, stderr=subprocess.STDOUT,
+                                     env={**os.environ, 'DELIVERY_RUN_ID': run_id()})
+        return process.returncode, time.perf_counter() - start, log_path
+
+    def run(self):
+        """Run the pipeline; returns {stage: 'ran' | 'skipped' | 'failed' | 'blocked'}."""
+        status = {}
+        waiting = list(self.selected)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while waiting or running:
+                for name in list(waiting):
+                    deps = self.depends_on[name]
+                    if any(status.get(dep) in ('failed', 'blocked') for dep in deps):
+                        status[name] = 'blocked'
+                        waiting.remove(name)
+                        self.log(f"  {name:<14} blocked (an upstream stage failed)")
+                    elif all(dep in status or dep not in self.selected for dep in deps):
+                        waiting.remove(name)
+                        # Decided only now: upstream outputs are final
+                        reason = self.reason(name)
+                        if reason is None:
+                            status[name] = 'skipped'
+                            self.log(f"  {name:<14} up to date")
+                        else:
+                            self.log(f"  {name:<14} running ({reason})")
+                            fingerprint = self.fingerprints.stage(self.stages[name])
+                            running[pool.submit(self._execute, self.stages[name])] = (name, fingerprint)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, fingerprint = running.pop(future)
+                    returncode, seconds, log_path = future.result()
+                    if returncode != 0:
+                        status[name] = 'failed'
+                        self.log(f"  {name:<14} FAILED after {seconds:.1f}s (exit {returncode}; see {log_path})")
+                        continue
+                    status[name] = 'ran'
+                    stage = self.stages[name]
+                    self.state['stages'][name] = {
+                        'fingerprint': fingerprint,
+                        'outputs': {path: self.fingerprints.path(path) for path in stage.outputs},
+                        'seconds': round(seconds, 2),
+                        'finished': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    }
+                    self._save_state()
+                    self.log(f"  {name:<14} done in {seconds:.1f}s")
+        self._save_state()
+        return status
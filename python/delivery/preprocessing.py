@@ -0,0 +1,141 @@
+"""Fitted preprocessing shared by training, prediction and evaluation.
+
+``DeliveryPreprocessor`` is fit once on the cleaned training frame and
+saved in the model bundle (``delivery.bundle``). It holds everything
+the model needs to turn a cleaned frame (or a single cleaned order)
+into a feature matrix: the cleaning statistics from train, the category
+encoders, the dropped columns, the NaN fill values and the final column
+order.
+"""
+import pickle
+
+import numpy as np
+import pandas as pd
+
+PREPROCESSOR_PATH = 'ml_models/saved_models/preprocessor.pkl'
+
+TARGET_COL = 'Time_taken(min)'
+ID_COL = 'ID'
+
+# Date and time features that are already encoded elsewhere or are all NaN
+COLS_TO_DROP = ['Order_Date', 'Time_Orderd', 'Time_Order_picked', 'Festival', 'order_hour']
+
+# Code for values not in the training vocabulary; HistGradientBoostingRegressor
+# treats negative categories as missing
+UNKNOWN_CODE = -1
+
+
+class CategoryEncoder:
+    """Training vocabulary -> integer codes, with an unknown bucket for unseen values.
+
+    Known values get the code ``LabelEncoder`` would give them (their
+    position among the sorted string classes); unseen values get
+    ``UNKNOWN_CODE``, so only the rows holding them lose information.
+    ``transform`` hashes each distinct value once and looks its code up
+    in a ``pd.Index`` of the classes, so it is linear in the rows.
+    """
+
+    def __init__(self, classes=()):
+        self.classes_ = np.asarray(classes, dtype=object)
+        self._index = pd.Index(self.classes_)
+
+    def fit(self, values):
+        self.classes_ = np.array(sorted(pd.unique(pd.Series(values).astype(str))), dtype=object)
+        self._index = pd.Index(self.classes_)
+        return self
+
+    def transform(self, values):
+        """int64 codes for ``values`` (compared as strings, NaN as 'nan')."""
+        codes, uniques = pd.factorize(pd.Series(values))
+        lookup = self._index.get_indexer(pd.Series(np.asarray(uniques, dtype=object)).astype(str))
+        # factorize marks NaN with -1, which picks the last entry: the code of 'nan'
+        lookup = np.append(lookup, self._index.get_indexer(['nan'])).astype(np.int64)
+        return lookup[codes]
+
+    def fit_transform(self, values):
+        return self.fit(values).transform(values)
+
+
+class DeliveryPreprocessor:
+    """Category encoding, column drops and NaN filling fit on the training data."""
+
+    def __init__(self, cleaning_stats=None):
+        # Statistics clean_delivery_data used on train; reused to clean new raw orders
+        self.cleaning_stats = cleaning_stats
+        self.categorical_cols = []
+        self.label_encoders = {}
+        self.fill_values = None
+        self.feature_columns = []
+
+    def _features(self, df):
+        return df.drop(columns=[col for col in [TARGET_COL, ID_COL] if col in df.columns])
+
+    def fit(self, df):
+        X = self._features(df)
+        self.categorical_cols = [col for col in X.select_dtypes(include=['object', 'category']).columns
+                                 if col not in COLS_TO_DROP]
+
+        self.label_encoders = {col: CategoryEncoder().fit(X[col]) for col in self.categorical_cols}
+
+        encoded = self._encode(X)
+        encoded = encoded.drop(columns=[col for col in COLS_TO_DROP if col in encoded.columns])
+        self.fill_values = encoded.median()
+        self.feature_columns = encoded.columns.tolist()
+        return self
+
+    def _encode(self, X, verbose=False):
+        encoded = X.copy()
+        for col, le in self.label_encoders.items():
+            if col not in encoded.columns:
+                continue
+            encoded[col] = le.transform(encoded[col])
+            if verbose:
+                unseen = int((encoded[col] == UNKNOWN_CODE).sum())
+                if unseen:
+                    print(f"  {col}: {unseen:,} unseen value(s) -> unknown bucket")
+                else:
+                    print(f"  {col}: Encoded successfully")
+        return encoded
+
+    def transform(self, df, verbose=False):
+        """Feature matrix for ``df`` in training column order."""
+        encoded = self._encode(self._features(df), verbose=verbose)
+        encoded = encoded.drop(columns=[col for col in COLS_TO_DROP if col in encoded.columns])
+
+        # Columns seen in training but missing here (e.g. delivery_speed on test)
+        for col in self.feature_columns:
+            if col not in encoded.columns:
+                encoded[col] = 0
+                if verbose:
+                    print(f"  Adding missing column: {col}")
+
+        encoded = encoded[self.feature_columns]
+        # Train medians first; 0 for columns that were entirely NaN in train
+        return encoded.fillna(self.fill_values).fillna(0)
+
+    def categorical_mask(self, max_categories=255):
+        """Boolean mask over ``feature_columns`` of label-encoded columns with
+        at most ``max_categories`` values, for estimators that split
+        categorical features natively (e.g. HistGradientBoostingRegressor).
+        Wider columns such as Delivery_person_ID stay numeric codes.
+        """
+        return np.array([col in self.label_encoders and len(self.label_encoders[col].classes_) <= max_categories
+                         for col in self.feature_columns])
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def __setstate__(self, state):
+        # Preprocessors saved before CategoryEncoder hold fitted LabelEncoders
+        state['label_encoders'] = {col: le if isinstance(le, CategoryEncoder) else CategoryEncoder(le.classes_)
+                                   for col, le in state.get('label_encoders', {}).items()}
+        self.__dict__.update(state)
+
+    def save(self, path=PREPROCESSOR_PATH):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path=PREPROCESSOR_PATH):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
@@ -0,0 +1,125 @@
+"""On-disk cache of analytics query results.
+
+Entries are keyed on the normalized query text plus the data version of
+``deliveries`` (``delivery.database.data_version``), so any load that
+changes rows invalidates every entry while a no-op load keeps them.
+Results are stored as Parquet files in ``data/exports/.cache`` with a
+JSON index; once the files exceed the size limit the least recently
+used entries are evicted.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+
+import pandas as pd
+
+from delivery.storage import pa
+
+CACHE_DIR = 'data/exports/.cache'
+INDEX_FILE = 'index.json'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_sql(sql):
+    """Whitespace-insensitive form of a query, used in the cache key."""
+    return re.sub(r'\s+', ' ', sql).strip().rstrip(';').strip()
+
+
+class QueryCache:
+    """LRU cache of query results on disk (requires pyarrow)."""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        if pa is None:
+            raise ImportError("The query cache stores Parquet files and requires pyarrow")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.entries = self._read_index()
+
+    def _index_path(self):
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def _read_index(self):
+        try:
+            with open(self._index_path(), 'r') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        # Drop entries whose result file has gone
+        return {key: entry for key, entry in entries.items() if os.path.exists(self._path(key))}
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    @staticmethod
+    def key(sql, version):
+        return hashlib.sha256(f"{version}\n{normalize_sql(sql)}".encode()).hexdigest()[:32]
+
+    def get(self, key):
+        """Cached entry for ``key`` (with its DataFrame under 'df'), or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        try:
+            df = pd.read_parquet(self._path(key))
+        except (OSError, ValueError):
+            del self.entries[key]
+            self.misses += 1
+            return None
+        entry['last_used'] = time.time()
+        self.hits += 1
+        return dict(entry, df=df)
+
+    def put(self, key, name, df, export=None):
+        """Store a result; returns False when it cannot be written as Parquet."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        try:
+            df.to_parquet(path, index=False)
+        except (pa.ArrowException, ValueError, TypeError):
+            # e.g. an object column mixing numbers and text
+            return False
+        self.entries[key] = {
+            'name': name,
+            'bytes': os.path.getsize(path),
+            'last_used': time.time(),
+            'export': export,
+        }
+        return True
+
+    def total_bytes(self):
+        return sum(entry['bytes'] for entry in self.entries.values())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits; returns how many."""
+        evicted = 0
+        total = self.total_bytes()
+        for key in sorted(self.entries, key=lambda k: self.entries[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= self.entries.pop(key)['bytes']
+            if os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+            evicted += 1
+        return evicted
+
+    def save(self):
+        """Evict down to the size limit and write the index."""
+        evicted = self.evict()
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._index_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp_path, self._index_path())
+        return evicted
+
+    def clear(self):
+        for key in list(self.entries):
+            if os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+        self.entries = {}
+        self.save()
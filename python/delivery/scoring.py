@@ -0,0 +1,455 @@
+"""Streaming batch scoring with restartable output.
+
+``StreamingScorer`` reads a cleaned file in batches, encodes and scores
+each batch with a ``delivery.bundle.ModelBundle`` and appends it to the
+output before reading the next, so memory is bounded by the batch size.
+After every batch the rows done, the output position and the running
+value counts of the predictions are saved to ``<output>.progress.json``.
+A restarted run with ``resume=True`` drops anything written after the
+last saved batch and carries on from there.
+
+CSV output is appended to in place. Parquet output is written as one
+part file per batch and merged into the final file at the end, since a
+Parquet file cannot be reopened for appending.
+
+``ShardedScorer`` splits the input into contiguous row ranges, one per
+worker process. Each worker loads the bundle once (its arrays are
+memory-mapped, so the workers share one copy in the page cache) and
+streams its shard to a shard file. The shard files are concatenated in
+shard order, so the output rows keep the input's ID order.
+"""
+import glob
+import json
+import math
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from delivery.bundle import ModelBundle
+from delivery.cleaning import summarize_target_counts
+from delivery.model_selection import pool_context
+from delivery.storage import count_cleaned_rows, iter_cleaned_file, pa
+
+if pa is not None:
+    import pyarrow.parquet as pq
+
+SUBMISSION_PATH = 'ml_models/predictions/submission.csv'
+PREDICTION_COL = 'Time_taken_min'
+DEFAULT_BATCH_SIZE = 50_000
+STAGES = ['read', 'encode', 'predict', 'write']
+
+
+class CsvSink:
+    """Appends batches to a CSV file; the checkpoint is its size in bytes."""
+
+    def __init__(self, path, checkpoint=None):
+        self.path = path
+        if checkpoint is None:
+            self._file = open(path, 'w', newline='')
+            self._header = True
+        else:
+            self._file = open(path, 'r+', newline='')
+            self._file.truncate(checkpoint)
+            self._file.seek(checkpoint)
+            self._header = checkpoint == 0
+
+    def write(self, df):
+        df.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def checkpoint(self):
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+    def finish(self):
+        self.close()
+
+
+class ParquetSink:
+    """Writes each batch as a part file; the checkpoint is the number of parts."""
+
+    def __init__(self, path, checkpoint=None):
+        if pa is None:
+            raise ImportError("Parquet output requires pyarrow")
+        self.path = path
+        self.parts_dir = path + '.parts'
+        if checkpoint is None:
+            shutil.rmtree(self.parts_dir, ignore_errors=True)
+            checkpoint = 0
+        os.makedirs(self.parts_dir, exist_ok=True)
+        # Parts written after the last checkpoint are incomplete or unrecorded
+        for part in self._parts()[checkpoint:]:
+            os.remove(part)
+        self.parts = checkpoint
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.parts_dir, 'part-*.parquet')))
+
+    def write(self, df):
+        df.to_parquet(os.path.join(self.parts_dir, f"part-{self.parts:06d}.parquet"), index=False)
+        self.parts += 1
+
+    def checkpoint(self):
+        return self.parts
+
+    def close(self):
+        """Leave the parts in place for a resumed run."""
+
+    def finish(self):
+        """Merge the parts into ``path`` one at a time and remove them."""
+        parts = self._parts()
+        if parts:
+            with pq.ParquetWriter(self.path, pq.read_schema(parts[0])) as writer:
+                for part in parts:
+                    writer.write_table(pq.read_table(part))
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+
+
+def open_sink(path, checkpoint=None):
+    if path.endswith('.parquet'):
+        return ParquetSink(path, checkpoint)
+    return CsvSink(path, checkpoint)
+
+
+def progress_path(output_path):
+    return output_path + '.progress.json'
+
+
+def _counts_to_json(counts):
+    return {repr(float(value)): int(count) for value, count in counts.items()}
+
+
+def _counts_from_json(counts):
+    series = pd.Series(counts, dtype='int64')
+    series.index = series.index.astype(float)
+    return series
+
+
+def _add_counts(counts, predictions):
+    return counts.add(predictions.value_counts(), fill_value=0).astype('int64')
+
+
+def _empty_predictions():
+    """No rows, but the output columns, so an empty input still gives a valid file."""
+    return pd.DataFrame({'ID': pd.Series(dtype=object), PREDICTION_COL: pd.Series(dtype=float)})
+
+
+def score_batch(bundle, batch, verbose=False):
+    """(ID, prediction) frame for one cleaned batch, plus the encode and predict seconds."""
+    start = time.perf_counter()
+    X = bundle.preprocessor.transform(batch, verbose=verbose)
+    encoded = time.perf_counter()
+    predictions = bundle.predict(X)
+    predicted = time.perf_counter()
+    scored = pd.DataFrame({'ID': batch['ID'].to_numpy(), PREDICTION_COL: predictions.round(2)})
+    return scored, encoded - start, predicted - encoded
+
+
+def summarize_predictions(counts):
+    """Min/max/mean/median/std of the predictions from their value counts."""
+    counts = counts[counts > 0].sort_index()
+    # An empty input has no mean or median (None); report NaN like min and max
+    summary = {key: float('nan') if value is None else value
+               for key, value in summarize_target_counts(counts).items()}
+    n = counts.sum()
+    squares = math.fsum(count * (value - summary['mean']) ** 2 for value, count in counts.items())
+    summary['std'] = math.sqrt(squares / (n - 1)) if n > 1 else float('nan')
+    summary['count'] = int(n)
+    return summary
+
+
+class StreamingScorer:
+    """Score ``input_path`` in batches of ``batch_size`` rows into ``output_path``.
+
+    Output rows are ``ID`` and ``PREDICTION_COL`` (rounded to 2 decimals).
+    With ``resume`` a matching progress file is continued; the input file,
+    bundle version and batch size must be unchanged.
+    """
+
+    def __init__(self, bundle, input_path, output_path=SUBMISSION_PATH,
+                 batch_size=DEFAULT_BATCH_SIZE, resume=False, log=print):
+        self.bundle = bundle
+        self.input_path = input_path
+        self.output_path = output_path
+        self.batch_size = batch_size
+        self.resume = resume
+        self.log = log
+        self.progress_path = progress_path(output_path)
+
+    def _job(self):
+        stat = os.stat(self.input_path)
+        return {
+            'input': os.path.abspath(self.input_path),
+            'input_bytes': stat.st_size,
+            'input_mtime': stat.st_mtime,
+            'bundle': self.bundle.version,
+            'batch_size': self.batch_size,
+        }
+
+    def _load_progress(self, job):
+        if not self.resume:
+            return None
+        try:
+            with open(self.progress_path, 'r') as f:
+                progress = json.load(f)
+        except FileNotFoundError:
+            return None
+        if progress['job'] != job:
+            raise ValueError(f"{self.progress_path} belongs to a different input, bundle or batch size; "
+                             f"run without resume to start over")
+        return progress
+
+    def _save_progress(self, progress):
+        tmp_path = self.progress_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(progress, f)
+        os.replace(tmp_path, self.progress_path)
+
+    def run(self, verbose=False):
+        """Score the whole input; returns a summary with counts, timings and throughput.
+
+        ``verbose`` prints the per-column encoding messages of the first batch.
+        """
+        job = self._job()
+        progress = self._load_progress(job)
+        if progress is None:
+            progress = {'job': job, 'rows': 0, 'batches': 0, 'checkpoint': None, 'counts': {}}
+        else:
+            self.log(f"Resuming after {progress['rows']:,} rows ({progress['batches']} batches)")
+        skip_batches = progress['batches']
+        counts = _counts_from_json(progress['counts'])
+
+        os.makedirs(os.path.dirname(self.output_path) or '.', exist_ok=True)
+        sink = open_sink(self.output_path, progress['checkpoint'])
+        timings = dict.fromkeys(STAGES, 0.0)
+        rows_scored = 0
+        head = None
+        start = time.perf_counter()
+        try:
+            # Only the rows after the last saved batch are read
+            batches = iter_cleaned_file(self.input_path, self.batch_size, start=progress['rows'])
+            for index, batch in enumerate(batches, start=skip_batches):
+                read_done = time.perf_counter()
+                timings['read'] += read_done - start
+
+                scored, encode_seconds, predict_seconds = score_batch(
+                    self.bundle, batch, verbose=verbose and index == 0)
+                write_start = time.perf_counter()
+                sink.write(scored)
+                counts = _add_counts(counts, scored[PREDICTION_COL])
+                if head is None:
+                    head = scored.head(10)
+
+                progress['rows'] += len(scored)
+                progress['batches'] = index + 1
+                progress['checkpoint'] = sink.checkpoint()
+                progress['counts'] = _counts_to_json(counts)
+                self._save_progress(progress)
+                start = time.perf_counter()
+                timings['encode'] += encode_seconds
+                timings['predict'] += predict_seconds
+                timings['write'] += start - write_start
+                rows_scored += len(scored)
+
+                elapsed = sum(timings.values())
+                self.log(f"  batch {index + 1}: {len(scored):,} rows, {progress['rows']:,} total, "
+                         f"{rows_scored / elapsed:,.0f} rows/s")
+            if progress['batches'] == 0:
+                sink.write(_empty_predictions())
+        except BaseException:
+            sink.close()
+            raise
+        sink.finish()
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+
+        seconds = sum(timings.values())
+        return {
+            'rows': progress['rows'],
+            'rows_scored': rows_scored,
+            'batches': progress['batches'],
+            'resumed_batches': skip_batches,
+            'seconds': seconds,
+            'rows_per_second': rows_scored / seconds if seconds else float('nan'),
+            'timings': timings,
+            'counts': counts.sort_index(),
+            'head': head,
+        }
+
+
+# Bundles loaded by this (worker) process, by path and engine
+_BUNDLES = {}
+
+
+def _worker_bundle(path, engine='sklearn'):
+    if (path, engine) not in _BUNDLES:
+        bundle = ModelBundle(path, engine=engine)
+        if 'n_jobs' in bundle.model.get_params():
+            # Parallelism comes from the shards
+            bundle.model.set_params(n_jobs=1)
+        _BUNDLES[path, engine] = bundle
+    return _BUNDLES[path, engine]
+
+
+def _score_shard(bundle_path, input_path, start, stop, batch_size, shard_path, engine='sklearn',
+                 threads=None, verbose=False):
+    """Score rows ``start:stop`` into ``shard_path``; returns the shard's counts and timings.
+
+    The shard is written under a temporary name and renamed when complete.
+    """
+    begin = time.perf_counter()
+    bundle = _worker_bundle(bundle_path, engine)
+    timings = dict.fromkeys(STAGES, 0.0)
+    counts = pd.Series(dtype='int64')
+    rows = batches = 0
+    head = None
+
+    base, ext = os.path.splitext(shard_path)
+    partial_path = f"{base}.partial{ext}"
+    sink = open_sink(partial_path)
+    try:
+        with threadpool_limits(limits=threads):
+            read_start = time.perf_counter()
+            for batch in iter_cleaned_file(input_path, batch_size, start=start, stop=stop):
+                timings['read'] += time.perf_counter() - read_start
+                scored, encode_seconds, predict_seconds = score_batch(
+                    bundle, batch, verbose=verbose and batches == 0)
+                write_start = time.perf_counter()
+                sink.write(scored)
+                counts = _add_counts(counts, scored[PREDICTION_COL])
+                if head is None:
+                    head = scored.head(10)
+                rows += len(scored)
+                batches += 1
+                read_start = time.perf_counter()
+                timings['encode'] += encode_seconds
+                timings['predict'] += predict_seconds
+                timings['write'] += read_start - write_start
+        if rows == 0:
+            # Keep the header/schema so the shard can be merged
+            sink.write(_empty_predictions())
+    except BaseException:
+        sink.close()
+        raise
+    sink.finish()
+    os.replace(partial_path, shard_path)
+    return {
+        'rows': rows,
+        'batches': batches,
+        'timings': timings,
+        'counts': _counts_to_json(counts),
+        'head': None if head is None else head.to_dict('list'),
+        'seconds': time.perf_counter() - begin,
+    }
+
+
+def shard_ranges(n_rows, shards):
+    """``shards`` contiguous (start, stop) row ranges of near-equal size."""
+    bounds = np.linspace(0, n_rows, shards + 1).round().astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def merge_shards(shard_paths, output_path):
+    """Concatenate shard files in order into ``output_path`` without loading them whole."""
+    if output_path.endswith('.parquet'):
+        with pq.ParquetWriter(output_path, pq.read_schema(shard_paths[0])) as writer:
+            for path in shard_paths:
+                for batch in pq.ParquetFile(path).iter_batches():
+                    writer.write_table(pa.Table.from_batches([batch]))
+        return
+    with open(output_path, 'wb') as out:
+        for i, path in enumerate(shard_paths):
+            with open(path, 'rb') as f:
+                if i > 0:
+                    f.readline()  # header
+                shutil.copyfileobj(f, out)
+
+
+class ShardedScorer(StreamingScorer):
+    """Score ``input_path`` on ``workers`` processes, one contiguous row range each.
+
+    Returns the same summary as ``StreamingScorer.run`` with wall-clock
+    ``seconds``; stage ``timings`` are summed over the workers. With
+    ``resume``, shards finished by an interrupted run are kept.
+    """
+
+    def __init__(self, bundle, input_path, output_path=SUBMISSION_PATH, batch_size=DEFAULT_BATCH_SIZE,
+                 workers=1, resume=False, log=print):
+        super().__init__(bundle, input_path, output_path, batch_size, resume, log)
+        self.workers = workers
+        self.shards_dir = output_path + '.shards'
+
+    def run(self, verbose=False):
+        """Score every shard and merge them; ``verbose`` applies to the first shard's first batch."""
+        start_time = time.perf_counter()
+        n_rows = count_cleaned_rows(self.input_path)
+        ranges = shard_ranges(n_rows, max(min(self.workers, n_rows), 1))
+        job = dict(self._job(), shards=[list(bounds) for bounds in ranges])
+        progress = self._load_progress(job)
+        if progress is None:
+            shutil.rmtree(self.shards_dir, ignore_errors=True)
+            progress = {'job': job, 'shards': {}}
+        else:
+            self.log(f"Resuming with {len(progress['shards'])} of {len(ranges)} shards done")
+        resumed = set(progress['shards'])
+        os.makedirs(self.shards_dir, exist_ok=True)
+
+        ext = '.parquet' if self.output_path.endswith('.parquet') else '.csv'
+        shard_paths = [os.path.join(self.shards_dir, f"shard-{i:05d}{ext}") for i in range(len(ranges))]
+        tasks = {i: (self.bundle.path, self.input_path, start, stop, self.batch_size, shard_paths[i],
+                     self.bundle.engine)
+                 for i, (start, stop) in enumerate(ranges) if str(i) not in resumed}
+
+        def finished(i, result):
+            progress['shards'][str(i)] = result
+            self._save_progress(progress)
+            self.log(f"  shard {i + 1}/{len(ranges)}: rows {ranges[i][0]:,}-{ranges[i][1]:,}, "
+                     f"{result['rows'] / result['seconds']:,.0f} rows/s")
+
+        context = pool_context(self.workers)
+        if context is None:
+            for i, task in tasks.items():
+                finished(i, _score_shard(*task, verbose=verbose and i == 0))
+        elif tasks:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks)), mp_context=context) as pool:
+                futures = {pool.submit(_score_shard, *task, threads=1, verbose=verbose and i == 0): i
+                           for i, task in tasks.items()}
+                for future in as_completed(futures):
+                    finished(futures[future], future.result())
+
+        results = [progress['shards'][str(i)] for i in range(len(ranges))]
+        os.makedirs(os.path.dirname(self.output_path) or '.', exist_ok=True)
+        merge_shards(shard_paths, self.output_path)
+        shutil.rmtree(self.shards_dir, ignore_errors=True)
+        os.remove(self.progress_path)
+
+        counts = pd.Series(dtype='int64')
+        timings = dict.fromkeys(STAGES, 0.0)
+        for result in results:
+            counts = counts.add(_counts_from_json(result['counts']), fill_value=0).astype('int64')
+            for stage in STAGES:
+                timings[stage] += result['timings'][stage]
+        rows_scored = sum(result['rows'] for i, result in enumerate(results) if str(i) not in resumed)
+        seconds = time.perf_counter() - start_time
+        head = next((pd.DataFrame(result['head']) for result in results if result['head']), None)
+        return {
+            'rows': sum(result['rows'] for result in results),
+            'rows_scored': rows_scored,
+            'batches': sum(result['batches'] for result in results),
+            'resumed_batches': sum(results[int(i)]['batches'] for i in resumed),
+            'seconds': seconds,
+            'rows_per_second': rows_scored / seconds if seconds else float('nan'),
+            'timings': timings,
+            'counts': counts.sort_index(),
+            'head': head,
+            'shards': len(ranges),
+        }
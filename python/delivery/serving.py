@@ -0,0 +1,291 @@
+"""Warm, micro-batching prediction service for single raw orders.
+
+``OrderPredictor`` keeps a ``ModelBundle`` loaded and turns raw orders
+(the columns of ``train.csv`` without the target) into ETAs. The orders
+go through ``clean_delivery_data`` with the training cleaning
+statistics saved in the bundle's preprocessor, so they get the same
+imputation, haversine distance, traffic_level, weather_severity and bins
+as the batch pipeline.
+
+``MicroBatcher`` queues requests from many threads. A single worker
+thread drains the queue into one ``predict`` call of up to ``max_batch``
+orders, waiting at most ``max_wait_ms`` for a batch to fill.
+``PredictionServer`` exposes this over HTTP (stdlib ``http.server``):
+
+    POST /predict   {"ID": ..., "Order_Date": "12-02-2022", ...}
+                    or {"orders": [{...}, ...]}
+    GET  /health    model name and bundle version
+    GET  /stats     request count, p50/p99 latency, batch sizes
+"""
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from delivery.bundle import BundleError, ModelBundle
+from delivery.cleaning import clean_delivery_data
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+LATENCY_WINDOW = 100_000
+
+# Columns of a raw order (train.csv without the target)
+RAW_COLUMNS = ['ID', 'Delivery_person_ID', 'Delivery_person_Age', 'Delivery_person_Ratings',
+               'Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude',
+               'Delivery_location_longitude', 'Order_Date', 'Time_Orderd', 'Time_Order_picked',
+               'Weatherconditions', 'Road_traffic_density', 'Vehicle_condition', 'Type_of_order',
+               'Type_of_vehicle', 'multiple_deliveries', 'Festival', 'City']
+TEXT_COLUMNS = ['ID', 'Delivery_person_ID', 'Order_Date', 'Time_Orderd', 'Time_Order_picked',
+                'Weatherconditions', 'Road_traffic_density', 'Type_of_order', 'Type_of_vehicle',
+                'Festival', 'City']
+# Raw text columns the cleaning passes through unchanged; the raw dumps pad them
+# with spaces (e.g. 'Snack '), so requests are matched to the training spelling
+PASSTHROUGH_COLUMNS = ['Delivery_person_ID', 'Type_of_order', 'Type_of_vehicle']
+REQUIRED_COLUMNS = ['Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude',
+                    'Delivery_location_longitude', 'Order_Date']
+
+# A raw test order, used to warm the model up and as the request example
+EXAMPLE_ORDER = {
+    'ID': '0x3474', 'Delivery_person_ID': 'BANGRES15DEL01', 'Delivery_person_Age': 28,
+    'Delivery_person_Ratings': 4.6, 'Restaurant_latitude': 12.975377, 'Restaurant_longitude': 77.696664,
+    'Delivery_location_latitude': 13.085377, 'Delivery_location_longitude': 77.806664,
+    'Order_Date': '29-03-2022', 'Time_Orderd': '20:30:00', 'Time_Order_picked': '20:35:00',
+    'Weatherconditions': 'conditions Windy', 'Road_traffic_density': 'Jam', 'Vehicle_condition': 0,
+    'Type_of_order': 'Snack', 'Type_of_vehicle': 'motorcycle', 'multiple_deliveries': 1,
+    'Festival': 'No', 'City': 'Metropolitian',
+}
+
+
+class OrderError(ValueError):
+    """A raw order cannot be scored (missing or malformed fields)."""
+
+
+class OrderPredictor:
+    """Raw orders -> ETA minutes with the model and encoders kept in memory."""
+
+    def __init__(self, bundle=None):
+        self.bundle = bundle if bundle is not None else ModelBundle()
+        self.preprocessor = self.bundle.preprocessor
+        self.stats = self.preprocessor.cleaning_stats
+        if self.stats is None:
+            raise BundleError(f"Bundle {self.bundle.version} has no cleaning statistics; "
+                              f"retrain after 02_data_cleaning.py has written them")
+        self.spellings = {
+            col: {str(value).strip(): value for value in self.preprocessor.label_encoders[col].classes_}
+            for col in PASSTHROUGH_COLUMNS if col in self.preprocessor.label_encoders
+        }
+        # Load the model and run every code path once before the first request
+        self.predict([EXAMPLE_ORDER])
+
+    @staticmethod
+    def validate(order):
+        if not isinstance(order, dict):
+            raise OrderError("An order must be a JSON object")
+        missing = [col for col in REQUIRED_COLUMNS if order.get(col) in (None, '')]
+        if missing:
+            raise OrderError(f"Order is missing {missing}")
+
+    def raw_frame(self, orders):
+        df = pd.DataFrame([{col: order.get(col) for col in RAW_COLUMNS} for order in orders],
+                          columns=RAW_COLUMNS)
+        # JSON null or absent text fields must stay object columns for the .str cleaning steps
+        df = df.astype({col: object for col in TEXT_COLUMNS})
+        for col, spellings in self.spellings.items():
+            df[col] = [spellings.get(value.strip(), value) if isinstance(value, str) else value
+                       for value in df[col]]
+        return df
+
+    def predict(self, orders):
+        """ETA in minutes (rounded to 2 decimals) for each raw order dict."""
+        for order in orders:
+            self.validate(order)
+        cleaned = clean_delivery_data(self.raw_frame(orders), is_train=False, stats=self.stats, verbose=False)
+        if cleaned['Order_Date'].isna().any():
+            raise OrderError("Order_Date must be DD-MM-YYYY")
+        X = self.preprocessor.transform(cleaned)
+        return self.bundle.predict(X).round(2)
+
+
+class LatencyTracker:
+    """Latencies of the most recent requests, in milliseconds."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, seconds, error=False):
+        with self._lock:
+            self._latencies.append(seconds * 1000)
+            self.requests += 1
+            self.errors += int(error)
+
+    def summary(self):
+        with self._lock:
+            latencies = np.array(self._latencies)
+            requests, errors = self.requests, self.errors
+        summary = {'requests': requests, 'errors': errors}
+        if len(latencies):
+            summary.update({
+                'p50_ms': float(np.percentile(latencies, 50)),
+                'p99_ms': float(np.percentile(latencies, 99)),
+                'max_ms': float(latencies.max()),
+                'mean_ms': float(latencies.mean()),
+            })
+        return summary
+
+
+class MicroBatcher:
+    """Collects concurrent single-order requests into batched ``predict`` calls."""
+
+    def __init__(self, predictor, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.predictor = predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.batched_orders = 0
+        self.largest_batch = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, order):
+        """Future resolving to the order's ETA (or raising OrderError)."""
+        future = Future()
+        self._queue.put((order, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self.batches += 1
+            self.batched_orders += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            try:
+                predictions = self.predictor.predict([order for order, _ in batch])
+            except Exception:
+                # One bad order must not fail the others: score them one by one
+                for order, future in batch:
+                    try:
+                        future.set_result(float(self.predictor.predict([order])[0]))
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(float(prediction))
+
+    def summary(self):
+        return {
+            'batches': self.batches,
+            'mean_batch': self.batched_orders / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            bundle = self.server.predictor.bundle
+            self._send(200, {'status': 'ok', 'model': bundle.name, 'version': bundle.version})
+        elif self.path == '/stats':
+            self._send(200, self.server.stats())
+        else:
+            self._send(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._send(404, {'error': f"Unknown path {self.path}"})
+            return
+        start = time.perf_counter()
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+            orders = payload['orders'] if isinstance(payload, dict) and 'orders' in payload else [payload]
+            futures = [self.server.batcher.submit(order) for order in orders]
+            etas = [future.result() for future in futures]
+        except (ValueError, KeyError, TypeError) as e:
+            self.server.latency.record(time.perf_counter() - start, error=True)
+            self._send(400, {'error': str(e)})
+            return
+        except Exception as e:
+            # Raised while scoring (e.g. a BundleError set by the batcher), not by the payload
+            self.server.latency.record(time.perf_counter() - start, error=True)
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self.server.latency.record(time.perf_counter() - start)
+        version = self.server.predictor.bundle.version
+        if isinstance(payload, dict) and 'orders' in payload:
+            self._send(200, {'eta_minutes': etas, 'version': version})
+        else:
+            self._send(200, {'eta_minutes': etas[0], 'version': version})
+
+
+class PredictionServer(ThreadingHTTPServer):
+    """HTTP front end; one thread per connection, one micro-batcher for all of them."""
+
+    daemon_threads = True
+    # Room for many clients connecting at once (the default backlog is 5)
+    request_queue_size = 128
+
+    def __init__(self, predictor, host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=DEFAULT_MAX_BATCH,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, verbose=False):
+        super().__init__((host, port), _Handler)
+        self.predictor = predictor
+        self.batcher = MicroBatcher(predictor, max_batch, max_wait_ms)
+        self.latency = LatencyTracker()
+        self.verbose = verbose
+
+    def stats(self):
+        return {**self.latency.summary(), **self.batcher.summary()}
+
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
@@ -0,0 +1,173 @@
+"""Tokenizing reader for the SQL scripts in ``sql/``.
+
+``iter_statements`` walks a script line by line and yields one
+``Statement`` per ``;``-terminated statement as soon as it is complete.
+Line (``--``) and block (``/* */``) comments are dropped, string
+literals and quoted identifiers are kept verbatim (a ``;`` or ``--``
+inside them is text), and whitespace outside them is collapsed. A
+``-- QUERY <n>: <name>`` comment names the statement that follows it.
+"""
+import re
+from collections import namedtuple
+
+Statement = namedtuple('Statement', ['number', 'name', 'sql', 'source', 'line'])
+
+_HEADER = re.compile(r'QUERY\s+(\d+)\s*:\s*(.*\S)', re.IGNORECASE)
+# Next character that changes the tokenizer state outside quotes and comments
+_SPECIAL = re.compile(r"--|/\*|['\"`;]")
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _join(parts):
+    """Statement text from (text, is_literal) parts: whitespace collapsed outside literals."""
+    pieces = []
+    code = []
+    for text, literal in parts:
+        if literal:
+            pieces.append(_WHITESPACE.sub(' ', ''.join(code)))
+            pieces.append(text)
+            code = []
+        else:
+            code.append(text)
+    pieces.append(_WHITESPACE.sub(' ', ''.join(code)))
+    return ''.join(pieces).strip()
+
+
+def iter_statements(lines, source=None):
+    """Yield the statements of a script given as an iterable of lines.
+
+    ``lines`` can be an open file, so the script is read only as far as
+    the caller consumes statements.
+    """
+    parts = []         # (text, is_literal) pieces of the statement being read
+    quote = None       # closing quote character while inside a literal
+    in_comment = False
+    header = None      # (number, name) of the last QUERY comment
+    start_line = None
+
+    def flush():
+        nonlocal parts, header, start_line
+        sql = _join(parts)
+        statement = None
+        if sql:
+            number, name = header if header is not None else (None, None)
+            statement = Statement(number, name, sql, source, start_line)
+            header = None
+        parts = []
+        start_line = None
+        return statement
+
+    for lineno, line in enumerate(lines, 1):
+        pos = 0
+        end = len(line)
+        while pos < end:
+            if in_comment:
+                close = line.find('*/', pos)
+                if close < 0:
+                    pos = end
+                    continue
+                in_comment = False
+                parts.append((' ', False))
+                pos = close + 2
+                continue
+
+            if quote is not None:
+                close = line.find(quote, pos)
+                if close < 0:
+                    parts.append((line[pos:], True))
+                    pos = end
+                    continue
+                parts.append((line[pos:close + 1], True))
+                pos = close + 1
+                if line.startswith(quote, pos):
+                    # Doubled quote is an escaped quote inside the literal
+                    parts.append((quote, True))
+                    pos += 1
+                else:
+                    quote = None
+                continue
+
+            match = _SPECIAL.search(line, pos)
+            stop = match.start() if match else end
+            text = line[pos:stop]
+            if text.strip() and start_line is None:
+                start_line = lineno
+            parts.append((text, False))
+            if match is None:
+                pos = end
+                continue
+
+            token = match.group(0)
+            pos = match.end()
+            if token == '--':
+                named = _HEADER.match(line[pos:].strip())
+                if named:
+                    # A new QUERY header also ends an unterminated statement
+                    statement = flush()
+                    if statement is not None:
+                        yield statement
+                    header = (int(named.group(1)), named.group(2).strip())
+                parts.append((' ', False))
+                pos = end
+            elif token == '/*':
+                in_comment = True
+            elif token == ';':
+                statement = flush()
+                if statement is not None:
+                    yield statement
+            else:
+                if start_line is None:
+                    start_line = lineno
+                quote = token
+                parts.append((token, True))
+
+    statement = flush()
+    if statement is not None:
+        yield statement
+
+
+def read_script(path):
+    """Lazily yield the statements of the SQL file at ``path``."""
+    with open(path, 'r') as f:
+        yield from iter_statements(f, source=path)
+
+
+def matches_selector(statement, selector):
+    if isinstance(selector, int):
+        return statement.number == selector
+    return statement.name is not None and statement.name.lower() == selector.lower()
+
+
+def parse_selector(value):
+    """``'5'`` selects query number 5; anything else selects by name."""
+    value = value.strip()
+    return int(value) if value.isdigit() else value
+
+
+def select_statements(statements, selectors=None):
+    """Named statements, optionally only those matching ``selectors``.
+
+    Selectors are query numbers (int) or names (case-insensitive). With
+    selectors, reading stops as soon as each one has been matched.
+    """
+    remaining = None if selectors is None else list(selectors)
+    for statement in statements:
+        if statement.number is None:
+            continue
+        if remaining is None:
+            yield statement
+            continue
+        matched = [selector for selector in remaining if matches_selector(statement, selector)]
+        if matched:
+            yield statement
+            remaining = [selector for selector in remaining if selector not in matched]
+            if not remaining:
+                return
+
+
+def read_queries(paths, selectors=None):
+    """Named statements of several SQL files in order (see ``select_statements``)."""
+    def statements():
+        for path in paths:
+            yield from read_script(path)
+    return select_statements(statements(), selectors)
@@ -0,0 +1,285 @@
+"""Typed columnar storage for the cleaned datasets.
+
+``02_data_cleaning.py`` writes ``data/cleaned data/<name>_clean.parquet``
+(or ``.feather``), which keeps datetimes, categoricals and integer
+widths, so readers skip CSV parsing and dtype inference and can load
+just the columns they need. CSV stays available as an export format and
+as the fallback when no columnar file (or no pyarrow) is present. Every
+reader returns the compact layout of ``delivery.dtypes``, whichever
+format the file is in.
+"""
+import collections
+import csv
+import datetime
+import itertools
+import os
+
+import pandas as pd
+
+from delivery import features
+from delivery.cleaning import BINNED_COLUMNS
+from delivery.dtypes import CLEANED_DTYPES, compact_dtypes, sort_categories
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # CSV-only installs
+    pa = None
+
+CLEANED_DIR = 'data/cleaned data'
+COLUMNAR_FORMATS = ['parquet', 'feather']
+FORMATS = COLUMNAR_FORMATS + ['csv']
+DEFAULT_FORMATS = ['parquet']
+
+TIME_COLUMNS = ['Time_Orderd', 'Time_Order_picked']
+# Parsed straight to categoricals of strings (e.g. Vehicle_condition '0'-'3'),
+# and times as strings even when a column is all missing
+CSV_DTYPES = {**{col: dtype for col, dtype in CLEANED_DTYPES.items() if dtype == 'category'},
+              **{col: object for col in TIME_COLUMNS}}
+
+
+def cleaned_path(name, fmt='parquet'):
+    """Path of the cleaned ``name`` ('train' or 'test') dataset in format ``fmt``."""
+    return os.path.join(CLEANED_DIR, f"{name}_clean.{fmt}")
+
+
+def _require_pyarrow(fmt):
+    if pa is None:
+        raise ImportError(f"Writing {fmt} requires pyarrow; install it or use --formats csv")
+
+
+def _arrow_table(df, schema=None):
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def _stable_schema(table):
+    """Schema for appending chunks: all-missing columns get their real type and
+    categoricals int32 dictionary indices, as later chunks may have more categories."""
+    fields = []
+    for field in table.schema:
+        if pa.types.is_null(field.type):
+            field = field.with_type(pa.time64('us') if field.name in TIME_COLUMNS else pa.string())
+        elif pa.types.is_dictionary(field.type):
+            value_type = pa.string() if pa.types.is_null(field.type.value_type) else field.type.value_type
+            field = field.with_type(pa.dictionary(pa.int32(), value_type, field.type.ordered))
+        fields.append(field)
+    return pa.schema(fields, metadata=table.schema.metadata)
+
+
+def _decoded_schema(schema):
+    """``schema`` with unordered categoricals stored as their values.
+
+    An Arrow IPC (Feather) file allows one dictionary per column, which
+    chunks with different categories cannot share; readers re-compact.
+    Ordered categoricals (the binned features) have fixed categories.
+    """
+    return pa.schema([field.with_type(field.type.value_type)
+                      if pa.types.is_dictionary(field.type) and not field.type.ordered else field
+                      for field in schema], metadata=schema.metadata)
+
+
+class CleanedWriter:
+    """Append cleaned chunks of one dataset to each requested format.
+
+    Used as a context manager by the streaming cleaner; the columnar
+    writers keep one schema for the whole file. Feather stores
+    unordered categoricals as plain values (see ``_decoded_schema``).
+    """
+
+    def __init__(self, name, formats=DEFAULT_FORMATS):
+        self.name = name
+        self.formats = list(formats)
+        self.paths = {fmt: cleaned_path(name, fmt) for fmt in self.formats}
+        self._schema = None
+        self._schemas = {}
+        self._writers = {}
+        self._csv_started = False
+        for fmt in self.formats:
+            if fmt in COLUMNAR_FORMATS:
+                _require_pyarrow(fmt)
+
+    def write(self, df):
+        if 'csv' in self.formats:
+            df.to_csv(self.paths['csv'], mode='a' if self._csv_started else 'w',
+                      header=not self._csv_started, index=False)
+            self._csv_started = True
+
+        columnar = [fmt for fmt in self.formats if fmt in COLUMNAR_FORMATS]
+        if not columnar:
+            return
+        if self._schema is None:
+            self._schema = _stable_schema(_arrow_table(df))
+            for fmt in columnar:
+                if fmt == 'parquet':
+                    self._schemas[fmt] = self._schema
+                    self._writers[fmt] = pq.ParquetWriter(self.paths[fmt], self._schema)
+                else:
+                    self._schemas[fmt] = _decoded_schema(self._schema)
+                    self._writers[fmt] = pa.ipc.new_file(self.paths[fmt], self._schemas[fmt])
+        table = _arrow_table(df, schema=self._schema)
+        for fmt, writer in self._writers.items():
+            schema = self._schemas[fmt]
+            writer.write_table(table if schema is self._schema else table.cast(schema))
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def save_cleaned(df, name, formats=DEFAULT_FORMATS):
+    """Write a whole cleaned frame; returns the paths written."""
+    with CleanedWriter(name, formats) as writer:
+        writer.write(df)
+    return list(writer.paths.values())
+
+
+def _typed(df):
+    """``df`` in the compact layout with sorted categories, whichever file it came from."""
+    return sort_categories(compact_dtypes(df))
+
+
+def _read_csv(path, **kwargs):
+    # round_trip parses every float back to the exact value to_csv wrote
+    return pd.read_csv(path, dtype=CSV_DTYPES, float_precision='round_trip', **kwargs)
+
+
+def _restore_csv_types(df):
+    """Give a frame read from CSV the types the columnar formats store.
+
+    ``Order_Date`` is parsed, the times become ``datetime.time`` objects
+    (None when missing, as Arrow reads them) and the binned columns
+    ordered categoricals with all their labels.
+    """
+    if 'Order_Date' in df.columns:
+        df['Order_Date'] = pd.to_datetime(df['Order_Date'], errors='coerce')
+    for col in TIME_COLUMNS:
+        if col in df.columns:
+            df[col] = features.map_distinct(df[col], datetime.time.fromisoformat, missing=lambda value: None)
+    for col, (_, _, labels) in BINNED_COLUMNS.items():
+        if col in df.columns:
+            df[col] = pd.Categorical(df[col], categories=labels, ordered=True)
+    return df
+
+
+def latest_cleaned_path(name):
+    """Most recently written of the Parquet, Feather and CSV files of ``name``
+    (Parquet first on ties); only CSV without pyarrow."""
+    readable = FORMATS if pa is not None else ['csv']
+    existing = [fmt for fmt in readable if os.path.exists(cleaned_path(name, fmt))]
+    if not existing:
+        raise FileNotFoundError(f"No cleaned {name} data in {CLEANED_DIR}; run 02_data_cleaning.py first")
+    fmt = max(existing, key=lambda f: os.path.getmtime(cleaned_path(name, f)))
+    return cleaned_path(name, fmt)
+
+
+def load_cleaned(name, columns=None):
+    """Load the cleaned ``name`` dataset, optionally only ``columns``.
+
+    Reads the file ``latest_cleaned_path`` picks. CSV reads restore the
+    columnar types (see ``_restore_csv_types``), so callers get the same
+    frame whichever file they read.
+    """
+    path = latest_cleaned_path(name)
+    fmt = path.rsplit('.', 1)[-1]
+
+    if fmt == 'parquet':
+        return _typed(pd.read_parquet(path, columns=columns))
+    if fmt == 'feather':
+        return _typed(feather.read_feather(path, columns=columns))
+
+    if columns is not None:
+        df = _read_csv(path, usecols=lambda col: col in columns)
+        df = df[[col for col in columns if col in df.columns]]
+    else:
+        df = _read_csv(path)
+    return _typed(_restore_csv_types(df))
+
+
+def count_cleaned_rows(path):
+    """Number of rows in one cleaned file, from the metadata where there is any."""
+    if path.endswith('.parquet'):
+        return pq.ParquetFile(path).metadata.num_rows
+    if path.endswith('.feather'):
+        with pa.memory_map(path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    with open(path, 'rb') as f:
+        return max(sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b'')) - 1, 0)
+
+
+def iter_cleaned_file(path, batch_size, columns=None, start=0, stop=None):
+    """Yield rows ``start:stop`` of one cleaned file as frames of at most ``batch_size`` rows.
+
+    Parquet is read batch by batch from the row groups that overlap the
+    range and Feather record batch by record batch through a memory map,
+    so only the current batch is materialized; CSV skips to ``start``
+    line by line and is read in chunks.
+    Batches do not span row groups or record batches.
+    """
+    if path.endswith('.parquet'):
+        parquet_file = pq.ParquetFile(path)
+        metadata = parquet_file.metadata
+        stop = metadata.num_rows if stop is None else min(stop, metadata.num_rows)
+        row_groups = []
+        offset = first_row = 0
+        for i in range(metadata.num_row_groups):
+            rows = metadata.row_group(i).num_rows
+            if offset + rows > start and offset < stop:
+                if not row_groups:
+                    first_row = offset
+                row_groups.append(i)
+            offset += rows
+        if not row_groups:
+            return
+        offset = first_row
+        for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=columns):
+            low, high = max(start - offset, 0), min(stop - offset, batch.num_rows)
+            offset += batch.num_rows
+            if low < high:
+                yield _typed(pa.Table.from_batches([batch.slice(low, high - low)]).to_pandas())
+        return
+    if path.endswith('.feather'):
+        with pa.memory_map(path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            offset = 0
+            for i in range(reader.num_record_batches):
+                if stop is not None and offset >= stop:
+                    break
+                record_batch = reader.get_batch(i)
+                first, offset = offset, offset + record_batch.num_rows
+                if offset <= start:
+                    continue
+                if columns is not None:
+                    record_batch = record_batch.select(columns)
+                high = offset if stop is None else min(stop, offset)
+                for row in range(max(start, first), high, batch_size):
+                    yield _typed(record_batch.slice(row - first, min(batch_size, high - row)).to_pandas())
+        return
+    nrows = None if stop is None else max(stop - start, 0)
+    if nrows == 0:
+        return
+    with open(path, 'r', newline='') as f:
+        header = next(csv.reader([f.readline()]), [])
+        # One line per row (the cleaned fields hold no newlines), so the rows
+        # before ``start`` are skipped without a skiprows set or tokenizing them
+        collections.deque(itertools.islice(f, start), maxlen=0)
+        for chunk in _read_csv(f, header=None, names=header, usecols=columns,
+                               chunksize=batch_size, nrows=nrows):
+            yield _typed(_restore_csv_types(chunk))
+
+
+def read_cleaned_file(path, columns=None):
+    """Read one cleaned file (e.g. a daily delta) by its extension."""
+    if path.endswith('.parquet'):
+        return _typed(pd.read_parquet(path, columns=columns))
+    if path.endswith('.feather'):
+        return _typed(feather.read_feather(path, columns=columns))
+    return _typed(_restore_csv_types(_read_csv(path, usecols=columns)))
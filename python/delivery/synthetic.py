@@ -0,0 +1,177 @@
+"""Synthetic raw orders in the layout of the Kaggle ``train.csv``/``test.csv``.
+
+``generate_orders`` draws orders for 22 Indian cities (restaurants
+scattered around the city centre, the customer 0.01-0.09 degrees away
+in both coordinates, as in the real data) and writes every field the way
+the raw dump does: hex IDs and categoricals with a trailing space,
+``"conditions Fog"`` weather, ``"NaN "`` for missing values and
+``"(min) 24"`` targets. The delivery time is a noisy function of
+distance, traffic, weather, rating, vehicle and multiple deliveries, so
+models trained on it have something to learn.
+
+``write_orders`` writes any number of rows chunk by chunk with flat
+memory. Chunk ``i`` is drawn from ``(seed, i)``, so the same arguments
+always produce the same file.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_ROWS = 500_000
+MISSING = 'NaN '
+
+# Delivery_person_ID prefix -> city centre (median restaurant in the Kaggle data)
+CITY_CENTRES = {
+    'AGR': (27.1617, 78.0430), 'ALH': (25.4516, 81.8345), 'AURG': (19.8759, 75.3460),
+    'BANG': (12.9702, 77.6405), 'BHP': (23.2324, 77.4298), 'CHEN': (13.0447, 80.2424),
+    'COIMB': (11.0104, 76.9765), 'DEH': (30.3425, 78.0612), 'GOA': (15.5444, 73.7667),
+    'HYD': (17.4315, 78.4004), 'INDO': (22.7450, 75.8876), 'JAP': (26.9052, 75.7946),
+    'KNP': (26.4778, 80.3207), 'KOC': (9.9857, 76.2968), 'KOL': (22.5391, 88.3655),
+    'LUDH': (30.8932, 75.8218), 'MUM': (19.1220, 72.8347), 'MYS': (12.3232, 76.6280),
+    'PUNE': (18.5463, 73.8425), 'RANCHI': (23.3592, 85.3254), 'SUR': (21.1711, 72.7893),
+    'VAD': (22.3105, 73.1678),
+}
+# The 12 large cities have about four times the orders of the others
+CITY_WEIGHTS = {code: 4.0 if code in {'BANG', 'CHEN', 'COIMB', 'HYD', 'INDO', 'JAP', 'MUM', 'MYS',
+                                       'PUNE', 'RANCHI', 'SUR', 'VAD'} else 1.0
+                for code in CITY_CENTRES}
+
+# value: (probability, minutes added to the delivery time)
+WEATHER = {'Fog': (0.167, 6.0), 'Stormy': (0.166, 3.0), 'Cloudy': (0.165, 6.0), 'Sandstorms': (0.164, 3.0),
+           'Windy': (0.163, 2.0), 'Sunny': (0.161, 0.0), 'NaN': (0.014, 0.0)}
+TRAFFIC = {'Low': (0.339, 0.0), 'Jam': (0.310, 10.0), 'Medium': (0.240, 5.0), 'High': (0.098, 7.0),
+           'NaN': (0.013, 0.0)}
+VEHICLE_CONDITION = {'0': (0.329, 5.0), '1': (0.330, 2.0), '2': (0.330, 0.0), '3': (0.011, 0.0)}
+ORDER_TYPE = {'Snack': (0.253, 0.0), 'Meal': (0.251, 1.0), 'Drinks': (0.248, 0.0), 'Buffet': (0.248, 1.0)}
+VEHICLE = {'motorcycle': (0.580, 2.0), 'scooter': (0.335, 0.0), 'electric_scooter': (0.084, 0.0),
+           'bicycle': (0.001, 4.0)}
+MULTIPLE_DELIVERIES = {'0': (0.309, 0.0), '1': (0.618, 4.0), '2': (0.044, 12.0), '3': (0.008, 20.0),
+                       'NaN': (0.021, 4.0)}
+FESTIVAL = {'No': (0.975, 0.0), 'Yes': (0.020, 20.0), 'NaN': (0.005, 0.0)}
+CITY_TYPE = {'Metropolitian': (0.748, 3.0), 'Urban': (0.222, 0.0), 'Semi-Urban': (0.004, 12.0),
+             'NaN': (0.026, 3.0)}
+RATINGS = ['4', '4.1', '4.2', '4.3', '4.4', '4.5', '4.6', '4.7', '4.8', '4.9', '5']
+RATING_WEIGHTS = [2.4, 3.1, 3.1, 3.1, 3.0, 7.2, 15.2, 15.7, 15.7, 15.4, 8.8]
+
+ORDER_DATES = pd.date_range('2022-02-11', '2022-04-06')
+# Orders by hour of day: a lunch and a bigger evening peak
+HOUR_WEIGHTS = np.array([3, 0, 0, 0, 0, 0, 0, 0, 2, 2, 3, 3, 3, 3, 2, 2, 3, 6, 8, 9, 9, 9, 9, 8], dtype=float)
+
+COLUMNS = ['ID', 'Delivery_person_ID', 'Delivery_person_Age', 'Delivery_person_Ratings',
+           'Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude',
+           'Delivery_location_longitude', 'Order_Date', 'Time_Orderd', 'Time_Order_picked',
+           'Weatherconditions', 'Road_traffic_density', 'Vehicle_condition', 'Type_of_order',
+           'Type_of_vehicle', 'multiple_deliveries', 'Festival', 'City']
+TARGET = 'Time_taken(min)'
+
+
+def _draw(rng, table, n, fmt='{} '):
+    """(raw strings, minutes added) for ``n`` draws from a value -> (probability, minutes) table."""
+    values = list(table)
+    probability = np.array([table[value][0] for value in values])
+    picked = rng.choice(len(values), size=n, p=probability / probability.sum())
+    labels = np.array([MISSING if value == 'NaN' else fmt.format(value) for value in values], dtype=object)
+    minutes = np.array([table[value][1] for value in values])
+    return labels[picked], minutes[picked]
+
+
+def _clock(minutes_of_day):
+    """'HH:MM:00' strings for minutes since midnight."""
+    table = np.array([f"{m // 60:02d}:{m % 60:02d}:00" for m in range(24 * 60)], dtype=object)
+    return table[minutes_of_day % (24 * 60)]
+
+
+def generate_orders(n_rows, seed=0, start_id=0, target=True):
+    """``n_rows`` raw orders as a string/float DataFrame with the raw CSV's columns.
+
+    IDs are consecutive from ``start_id`` (hex, like the real ones), so
+    frames generated with disjoint ranges can be loaded together.
+    ``target=False`` leaves out ``Time_taken(min)``, as in ``test.csv``.
+    """
+    rng = np.random.default_rng(seed)
+    n = n_rows
+    codes = list(CITY_CENTRES)
+    weights = np.array([CITY_WEIGHTS[code] for code in codes])
+    city = rng.choice(len(codes), size=n, p=weights / weights.sum())
+    centres = np.array([CITY_CENTRES[code] for code in codes])
+
+    restaurant = rng.integers(1, 21, size=n)
+    courier = rng.integers(1, 4, size=n)
+    courier_ids = np.array([f"{code}RES{r:02d}DEL{c:02d} " for code in codes
+                            for r in range(1, 21) for c in range(1, 4)], dtype=object)
+    person_id = courier_ids[(city * 20 + restaurant - 1) * 3 + courier - 1]
+
+    age = rng.integers(20, 40, size=n)
+    age_raw = age.astype(str).astype(object)
+    age_raw[rng.random(n) < 0.04] = MISSING
+    rating_idx = rng.choice(len(RATINGS), size=n, p=np.array(RATING_WEIGHTS) / sum(RATING_WEIGHTS))
+    rating = np.array(RATINGS, dtype=float)[rating_idx]
+    rating_raw = np.array(RATINGS, dtype=object)[rating_idx]
+    rating_raw[rng.random(n) < 0.04] = MISSING
+
+    # Restaurants cluster around the centre; the customer is 0.01-0.09 degrees off in both axes
+    restaurant_lat = np.round(centres[city, 0] + rng.normal(0, 0.05, n), 6)
+    restaurant_lon = np.round(centres[city, 1] + rng.normal(0, 0.05, n), 6)
+    offset = rng.integers(1, 10, size=n) / 100
+    delivery_lat = np.round(restaurant_lat + offset, 6)
+    delivery_lon = np.round(restaurant_lon + offset, 6)
+    distance_km = offset * np.sqrt(2) * 111.0
+
+    dates = np.array(ORDER_DATES.strftime('%d-%m-%Y'), dtype=object)
+    order_date = dates[rng.integers(0, len(dates), size=n)]
+    hour = rng.choice(24, size=n, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    ordered = hour * 60 + 5 * rng.integers(0, 12, size=n)
+    picked = ordered + 5 * rng.integers(1, 4, size=n)
+    time_ordered = _clock(ordered)
+    time_ordered[rng.random(n) < 0.04] = MISSING
+
+    weather, weather_min = _draw(rng, WEATHER, n, fmt='conditions {}')
+    weather[weather == MISSING] = 'conditions NaN'
+    traffic, traffic_min = _draw(rng, TRAFFIC, n)
+    condition, condition_min = _draw(rng, VEHICLE_CONDITION, n, fmt='{}')
+    order_type, order_min = _draw(rng, ORDER_TYPE, n)
+    vehicle, vehicle_min = _draw(rng, VEHICLE, n)
+    multiple, multiple_min = _draw(rng, MULTIPLE_DELIVERIES, n, fmt='{}')
+    festival, festival_min = _draw(rng, FESTIVAL, n)
+    city_type, city_min = _draw(rng, CITY_TYPE, n)
+
+    df = pd.DataFrame({
+        'ID': [f"0x{i:x} " for i in range(start_id, start_id + n)],
+        'Delivery_person_ID': person_id,
+        'Delivery_person_Age': age_raw,
+        'Delivery_person_Ratings': rating_raw,
+        'Restaurant_latitude': restaurant_lat,
+        'Restaurant_longitude': restaurant_lon,
+        'Delivery_location_latitude': delivery_lat,
+        'Delivery_location_longitude': delivery_lon,
+        'Order_Date': order_date,
+        'Time_Orderd': time_ordered,
+        'Time_Order_picked': _clock(picked),
+        'Weatherconditions': weather,
+        'Road_traffic_density': traffic,
+        'Vehicle_condition': condition,
+        'Type_of_order': order_type,
+        'Type_of_vehicle': vehicle,
+        'multiple_deliveries': multiple,
+        'Festival': festival,
+        'City': city_type,
+    })
+    if target:
+        minutes = (1 + 0.45 * distance_km + weather_min + traffic_min + condition_min + order_min
+                   + vehicle_min + multiple_min + festival_min + city_min
+                   + 8 * (5 - rating) + 0.15 * (age - 20) + rng.normal(0, 3, n))
+        minutes = np.clip(np.rint(minutes), 10, 54).astype(int)
+        df[TARGET] = [f"(min) {m}" for m in minutes]
+    return df
+
+
+def write_orders(path, n_rows, seed=0, start_id=0, target=True, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write ``n_rows`` generated orders to the CSV ``path`` ``chunk_rows`` at a time; returns ``n_rows``."""
+    written = 0
+    for chunk in range(-(-n_rows // chunk_rows)):
+        rows = min(chunk_rows, n_rows - written)
+        df = generate_orders(rows, seed=(seed, chunk), start_id=start_id + written, target=target)
+        df.to_csv(path, mode='w' if chunk == 0 else 'a', header=chunk == 0, index=False)
+        written += rows
+    if n_rows == 0:
+        pd.DataFrame(columns=COLUMNS + ([TARGET] if target else [])).to_csv(path, index=False)
+    return written
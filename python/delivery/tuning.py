@@ -0,0 +1,223 @@
+"""Budget-aware hyperparameter search by successive halving.
+
+``successive_halving`` samples a fixed number of configurations from a
+model's grid and scores them all on a small budget: a subsample of the
+tuning rows and few trees (or boosting iterations). The best third is
+promoted to the next rung with three times the budget, and so on until
+one configuration is left, fit on all tuning rows with the full number
+of trees. Weak configurations are stopped after their cheap early rungs,
+so the search costs a few full fits instead of one per configuration.
+
+Configurations are scored on a validation part of the 80/20 holdout
+training rows, so the holdout stays unseen. The fits of a rung run at
+once on the process pool of ``delivery.model_selection``. Every finished
+fit is written to a JSON state file, and a rerun with the same search
+and data resumes where the last one stopped.
+"""
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import ParameterSampler, train_test_split
+
+from delivery.model_selection import (DEFAULT_WORKERS, HOLDOUT_SIZE, RANDOM_STATE, SharedMatrix,
+                                      holdout_split, iter_fit_results, pool_context, single_threaded)
+
+TUNING_STATE_PATH = 'ml_models/saved_models/tuning_state.json'
+TUNED_PARAMS_PATH = 'ml_models/saved_models/tuned_params.json'
+
+DEFAULT_CANDIDATES = 27
+DEFAULT_ETA = 3
+# Fewest rows a configuration is ever scored on
+MIN_ROWS = 500
+
+# Per model: the parameter that grows with the budget, its range, and the grid sampled from
+SEARCH_SPACES = {
+    'Random Forest': {
+        'resource': 'n_estimators',
+        'min_resource': 10,
+        'max_resource': 200,
+        'grid': {
+            'max_depth': [8, 12, 16, 20, None],
+            'min_samples_leaf': [1, 2, 4, 8],
+            'max_features': [1.0, 0.5, 'sqrt'],
+        },
+    },
+    'Gradient Boosting': {
+        'resource': 'n_estimators',
+        'min_resource': 10,
+        'max_resource': 200,
+        'grid': {
+            'learning_rate': [0.05, 0.1, 0.2],
+            'max_depth': [3, 4, 5, 6],
+            'subsample': [0.8, 1.0],
+        },
+    },
+    'Hist Gradient Boosting': {
+        'resource': 'max_iter',
+        'min_resource': 20,
+        'max_resource': 400,
+        'grid': {
+            'learning_rate': [0.05, 0.1, 0.2],
+            'max_leaf_nodes': [15, 31, 63],
+            'min_samples_leaf': [10, 20, 50],
+            'l2_regularization': [0.0, 0.1, 1.0],
+        },
+    },
+}
+
+
+def _plain(value):
+    """JSON-safe form of a parameter value."""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def sample_configs(grid, n_candidates, seed=RANDOM_STATE, first=None):
+    """Up to ``n_candidates`` distinct configurations drawn from ``grid``.
+
+    ``first`` (e.g. the current parameters) leads the list, so the search
+    can only replace it with a configuration that scores better.
+    """
+    n_total = math.prod(len(values) for values in grid.values())
+    sampler = ParameterSampler(grid, n_iter=min(n_candidates, n_total), random_state=seed)
+    configs = [{key: _plain(value) for key, value in sorted(config.items())} for config in sampler]
+    if first is not None:
+        first = {key: _plain(first[key]) for key in sorted(grid)}
+        configs = [first] + [config for config in configs if config != first][:n_candidates - 1]
+    return configs
+
+
+def rung_schedule(n_candidates, n_rows, space, eta=DEFAULT_ETA):
+    """(configurations, rows, resource) per rung; the last rung gets the full budget."""
+    n_rungs = int(math.floor(math.log(max(n_candidates, 1), eta) + 1e-9)) + 1
+    schedule = []
+    for rung in range(n_rungs):
+        scale = eta ** (rung - n_rungs + 1)
+        schedule.append((
+            max(1, math.ceil(n_candidates / eta ** rung)),
+            min(n_rows, max(MIN_ROWS, int(n_rows * scale))),
+            max(space['min_resource'], int(round(space['max_resource'] * scale))),
+        ))
+    return schedule
+
+
+def data_signature(X, y):
+    """Hash of the tuning data; saved state is only reused for the same data."""
+    digest = hashlib.sha256()
+    digest.update(','.join(X.columns).encode())
+    digest.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+    digest.update(np.ascontiguousarray(np.asarray(y, dtype=np.float64)).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def load_state(path=TUNING_STATE_PATH):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state, path=TUNING_STATE_PATH):
+    """Write the state atomically, so an interrupted run leaves the last good copy."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_tuned_params(path=TUNED_PARAMS_PATH):
+    """Winning parameters per model name from earlier searches ({} if none)."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_tuned_params(tuned, path=TUNED_PARAMS_PATH):
+    save_state(tuned, path)
+
+
+def tuning_split(n_rows):
+    """Fit/score row positions for tuning, both inside the holdout training rows."""
+    holdout_train, _ = holdout_split(n_rows)
+    return train_test_split(holdout_train, test_size=HOLDOUT_SIZE, random_state=RANDOM_STATE)
+
+
+def successive_halving(name, estimator, X, y, n_candidates=DEFAULT_CANDIDATES, eta=DEFAULT_ETA,
+                       workers=DEFAULT_WORKERS, state_path=TUNING_STATE_PATH, fresh=False, log=print):
+    """Search ``SEARCH_SPACES[name]`` for ``estimator``; returns the winning parameters.
+
+    The returned dict includes the resource parameter at its full value,
+    ready for ``estimator.set_params``. ``fresh`` discards saved progress.
+    """
+    space = SEARCH_SPACES[name]
+    current = estimator.get_params()
+    configs = sample_configs(space['grid'], n_candidates, first=current)
+    fit_rows, score_rows = tuning_split(len(X))
+    # A fixed shuffle, so each rung's subsample contains the previous one
+    fit_rows = np.random.RandomState(RANDOM_STATE).permutation(fit_rows)
+    schedule = rung_schedule(len(configs), len(fit_rows), space, eta)
+
+    search = {
+        'configs': configs,
+        'eta': eta,
+        'resource': space['resource'],
+        'schedule': schedule,
+        'data': data_signature(X, y),
+    }
+    key = hashlib.sha256(json.dumps(search, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    state = load_state(state_path)
+    entry = state.get(name)
+    if fresh or entry is None or entry.get('key') != key:
+        entry = {'key': key, 'search': search, 'rungs': [], 'best': None}
+    elif entry.get('best') is not None:
+        log(f"  {name}: search already complete in {state_path}")
+        return entry['best']
+    else:
+        done = sum(len(rung['scores']) for rung in entry['rungs'])
+        log(f"  {name}: resuming from {state_path} ({done} fit(s) already scored)")
+    state[name] = entry
+
+    context = pool_context(workers)
+    threads = 1 if context is not None else None
+    survivors = list(range(len(configs)))
+    with SharedMatrix(X, y) as shared:
+        for rung, (n_configs, n_rows, resource) in enumerate(schedule):
+            if rung == len(entry['rungs']):
+                entry['rungs'].append({'rows': n_rows, 'resource': resource, 'scores': {}})
+            scores = entry['rungs'][rung]['scores']
+            survivors = survivors[:n_configs]
+
+            pending = [i for i in survivors if str(i) not in scores]
+            tasks = []
+            for i in pending:
+                model = clone(estimator).set_params(**configs[i], **{space['resource']: resource})
+                if context is not None:
+                    model = single_threaded(model)
+                tasks.append((name, model, False, shared.x_path, shared.y_path, shared.columns,
+                              fit_rows[:n_rows], score_rows, f'rung{rung}', threads))
+            for task_index, result in iter_fit_results(tasks, context, workers):
+                scores[str(pending[task_index])] = {'r2': result['r2'], 'rmse': result['rmse'],
+                                                    'fit_seconds': result['fit_seconds']}
+                save_state(state, state_path)
+
+            # Best first; ties keep the sampling order
+            survivors.sort(key=lambda i: -scores[str(i)]['r2'])
+            best_score = scores[str(survivors[0])]
+            log(f"  {name} rung {rung}: {len(survivors)} config(s) x {n_rows:,} rows, "
+                f"{space['resource']}={resource} -> best R² {best_score['r2']:.4f}")
+
+    winner = survivors[0]
+    entry['best'] = {**configs[winner], space['resource']: space['max_resource']}
+    entry['best_r2'] = entry['rungs'][-1]['scores'][str(winner)]['r2']
+    save_state(state, state_path)
+    return entry['best']
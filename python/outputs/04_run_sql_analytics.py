@@ -1,80 +1,119 @@
-import pandas as pd
-from sqlalchemy import create_engine
+import argparse
 import os
-import re
+import sys
 
-print("Running SQL Analytics...\n")
-
-# Connect to database
-engine = create_engine('sqlite:///data/food_delivery.db')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-# Create output folder
-os.makedirs('data/exports', exist_ok=True)
+from delivery.analytics import DEFAULT_WORKERS, EXPORTS_DIR, SQL_FILES, cube_available, run_queries, use_cube
+from delivery.instrument import step
+from delivery.query_cache import CACHE_DIR, DEFAULT_MAX_BYTES, QueryCache
+from delivery.sqlscript import matches_selector, parse_selector, read_queries
 
-# List of SQL files to execute
-sql_files = [
-    'sql/02_core_metrics.sql',
-    'sql/03_delivery_person_analysis.sql',
-    'sql/04_advanced_queries.sql'
-]
+parser = argparse.ArgumentParser(description="Run the SQL analytics queries and export the results")
+parser.add_argument('--query', '-q', action='append', default=None, metavar='NUMBER_OR_NAME',
+                    help="Run only this query (number or name); repeat to run several")
+parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                    help="Queries run at once, each on its own read-only connection (1 = sequential)")
+parser.add_argument('--no-cube', action='store_true',
+                    help="Scan the deliveries table for every query instead of using the aggregate cube")
+parser.add_argument('--no-cache', action='store_true',
+                    help="Run every query against the database instead of reusing cached results")
+parser.add_argument('--clear-cache', action='store_true',
+                    help=f"Empty {CACHE_DIR} before running")
+parser.add_argument('--cache-size-mb', type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                    help="Size limit of the result cache; least recently used results are evicted")
+args = parser.parse_args()
 
-results = {}
+print("Running SQL Analytics...\n")
 
-for sql_file in sql_files:
+# Collect the named queries from every SQL file; they are independent reads
+sql_files = []
+for sql_file in SQL_FILES:
     if not os.path.exists(sql_file):
         print(f"[WARNING] File not found: {sql_file}")
         continue
-    
-    print(f"\n{'='*60}")
-    print(f"Executing: {sql_file}")
-    print(f"{'='*60}\n")
-    
-    # Read SQL file
-    with open(sql_file, 'r') as f:
-        sql_content = f.read()
-    
-    # Extract queries using regex - look for comments with "QUERY" followed by SELECT statement
-    # Pattern: -- QUERY <number>: <name> followed by SELECT...;
-    pattern = r'--\s*QUERY\s+\d+:\s*(.+?)\n(.*?)(?=--\s*QUERY|\Z)'
-    matches = re.finditer(pattern, sql_content, re.DOTALL | re.IGNORECASE)
-    
-    for match in matches:
-        query_name = match.group(1).strip()
-        sql_query = match.group(2).strip()
-        
-        # Clean up the SQL - remove comment lines at the beginning
-        sql_lines = [line for line in sql_query.split('\n') if line.strip() and not line.strip().startswith('--')]
-        sql_query = ' '.join([line.strip() for line in sql_lines])
-        
-        if not sql_query or 'SELECT' not in sql_query.upper():
-            continue
-        
-        try:
-            # Execute query
-            df = pd.read_sql(sql_query, engine)
-            
-            # Display results (truncate if too many columns)
-            print(f"\n[{query_name}]")
-            print(f"{'-'*60}")
-            if len(df) > 0:
-                print(df.head(20).to_string(index=False))
-                if len(df) > 20:
-                    print(f"... ({len(df) - 20} more rows)")
-            print(f"Rows returned: {len(df)}")
-            
-            # Save to CSV
-            safe_name = query_name.replace(' ', '_').replace(':', '').replace('/', '_').lower()
-            output_file = f"data/exports/{safe_name}.csv"
-            df.to_csv(output_file, index=False)
-            print(f"[Saved to: {output_file}]")
-            
-            results[query_name] = df
-            
-        except Exception as e:
-            print(f"[ERROR in {query_name}: {str(e)}]")
+    sql_files.append(sql_file)
+
+selectors = [parse_selector(value) for value in args.query] if args.query else None
+statements = list(read_queries(sql_files, selectors))
+if selectors is not None:
+    for selector in selectors:
+        if not any(matches_selector(statement, selector) for statement in statements):
+            print(f"[WARNING] No query matches: {selector}")
+
+# GROUP BY metrics are rolled up from the aggregate cube the loader maintains
+from_cube = set()
+if not args.no_cube:
+    if cube_available():
+        statements, from_cube = use_cube(statements)
+    else:
+        print("[No aggregate cube in the database; scanning deliveries for every query]")
+
+print(f"[Executing {len(statements)} queries on {args.workers} connection(s), "
+      f"{len(from_cube)} from the aggregate cube...]")
+
+# Results of unchanged queries on unchanged data are served from the cache
+cache = None
+if not args.no_cache:
+    try:
+        cache = QueryCache(max_bytes=int(args.cache_size_mb * 2**20))
+    except ImportError as e:
+        print(f"[Result cache disabled: {e}]")
+    else:
+        if args.clear_cache:
+            cache.clear()
+
+with step('run_queries', queries=len(statements)) as timing:
+    results = run_queries([(statement.name, statement.sql) for statement in statements],
+                          workers=args.workers, cache=cache)
+wall_seconds = timing.wall_s
+
+# Report in query order, grouped by source file
+executed = 0
+current_file = None
+for statement, result in zip(statements, results):
+    if statement.source != current_file:
+        current_file = statement.source
+        print(f"\n{'='*60}")
+        print(f"Executing: {current_file}")
+        print(f"{'='*60}\n")
+
+    query_name = result['name']
+    if result['error'] is not None:
+        print(f"[ERROR in {query_name}: {result['error']}]")
+        continue
+
+    df = result['df']
+    # Display results (truncate if too many rows)
+    print(f"\n[{query_name}]")
+    print(f"{'-'*60}")
+    if len(df) > 0:
+        print(df.head(20).to_string(index=False))
+        if len(df) > 20:
+            print(f"... ({len(df) - 20} more rows)")
+    print(f"Rows returned: {len(df)}")
+    print(f"[Saved to: {result['output']}]")
+    executed += 1
+
+print(f"\n{'='*60}")
+print(f"[QUERY TIMINGS]")
+print(f"{'='*60}")
+timed = sorted(zip(statements, results), key=lambda pair: pair[1]['seconds'], reverse=True)
+for statement, result in timed:
+    source = 'cache' if result['cached'] else 'cube' if statement.number in from_cube else 'table'
+    print(f"   {result['seconds']:7.3f}s  [{source:5}] {result['name']}")
+
+total_seconds = sum(result['seconds'] for result in results)
+slowest = max((result['seconds'] for result in results), default=0.0)
+print(f"\n   Sum of query times: {total_seconds:.3f}s")
+print(f"   Slowest query:      {slowest:.3f}s")
+print(f"   Wall-clock time:    {wall_seconds:.3f}s")
+if cache is not None:
+    print(f"   Cache: {cache.hits} hit(s), {cache.misses} miss(es), "
+          f"{cache.total_bytes() / 2**20:.2f} MB in {CACHE_DIR}")
 
 print(f"\n{'='*60}")
 print(f"[SQL ANALYTICS COMPLETE!]")
 print(f"{'='*60}")
-print(f"\nTotal queries executed: {len(results)}")
-print(f"Results saved to: data/exports/")
\ No newline at end of file
+print(f"\nTotal queries executed: {executed}")
+print(f"Results saved to: {EXPORTS_DIR}/")
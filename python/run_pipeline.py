@@ -0,0 +1,44 @@
+import argparse
+import sys
+import time
+
+from delivery.pipeline import DEFAULT_JOBS, PIPELINE_DIR, STAGES, PipelineRunner
+
+stage_names = [stage.name for stage in STAGES]
+
+parser = argparse.ArgumentParser(description="Run the pipeline scripts whose inputs changed since their last run.")
+parser.add_argument('stages', nargs='*', metavar='STAGE',
+                    help=f"Run only these stages and what they depend on ({', '.join(stage_names)})")
+parser.add_argument('--jobs', '-j', type=int, default=DEFAULT_JOBS,
+                    help="Stages run at the same time when they do not depend on each other")
+parser.add_argument('--force', nargs='*', metavar='STAGE', default=None,
+                    help="Rerun these stages (all selected stages when given no names) even if unchanged")
+parser.add_argument('--dry-run', action='store_true', help="Print what would run and why, then exit")
+args = parser.parse_args()
+
+try:
+    force = (args.force or args.stages or stage_names) if args.force is not None else ()
+    runner = PipelineRunner(jobs=args.jobs, force=force, targets=args.stages or None)
+except ValueError as e:
+    parser.error(str(e))
+
+print("="*70)
+print("FOOD DELIVERY PIPELINE")
+print("="*70)
+
+if args.dry_run:
+    print(f"\n{'Stage':<16}{'Script':<42}Action")
+    for name, reason in runner.plan():
+        print(f"{name:<16}{runner.stages[name].script:<42}{'run (' + reason + ')' if reason else 'skip'}")
+    sys.exit(0)
+
+print(f"\nRunning up to {args.jobs} stage(s) at a time; logs in {PIPELINE_DIR}/logs/\n")
+start_time = time.perf_counter()
+status = runner.run()
+wall_seconds = time.perf_counter() - start_time
+
+counts = {outcome: sum(1 for value in status.values() if value == outcome)
+          for outcome in ['ran', 'skipped', 'failed', 'blocked']}
+print(f"\n[{counts['ran']} ran, {counts['skipped']} up to date, {counts['failed']} failed, "
+      f"{counts['blocked']} blocked in {wall_seconds:.1f}s]")
+sys.exit(1 if counts['failed'] or counts['blocked'] else 0)
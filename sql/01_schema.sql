@@ -5,6 +5,7 @@
 DROP TABLE IF EXISTS deliveries;
 DROP TABLE IF EXISTS delivery_persons;
 DROP TABLE IF EXISTS restaurants;
+DROP TABLE IF EXISTS delivery_cube;
 
 -- ============================================
 -- DELIVERIES TABLE (Main table)
@@ -59,6 +60,64 @@ CREATE TABLE deliveries (
     delivery_speed VARCHAR(20)
 );
 
+-- ============================================
+-- LOAD WATERMARKS (one row per load, kept across rebuilds)
+-- ============================================
+CREATE TABLE IF NOT EXISTS load_watermarks (
+    load_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    loaded_at TIMESTAMP NOT NULL,
+    mode VARCHAR(20) NOT NULL,          -- 'full' or 'incremental'
+    rows_in INT,
+    rows_inserted INT,
+    rows_updated INT,
+    max_order_date DATE,                -- latest Order_Date in the table after the load
+    table_rows INT
+);
+
+-- ============================================
+-- AGGREGATE CUBE (measures of delivered orders per grouping set and date,
+-- filled by the loader, read by sql/05_cube_queries.sql)
+-- ============================================
+CREATE TABLE IF NOT EXISTS delivery_cube (
+    grouping_set VARCHAR(20) NOT NULL,
+    
+    -- Date dimensions (on every row)
+    Order_Date DATE,
+    order_year INT,
+    order_month INT,
+    order_dayofweek INT,
+    day_name VARCHAR(20),
+    is_weekend BOOLEAN,
+    
+    -- Dimensions of the grouping set (NULL when not part of it)
+    City VARCHAR(100),
+    order_hour INT,
+    time_period VARCHAR(20),
+    is_peak_hour BOOLEAN,
+    Weatherconditions VARCHAR(50),
+    weather_severity INT,
+    Road_traffic_density VARCHAR(50),
+    traffic_level INT,
+    Vehicle_condition VARCHAR(50),
+    Type_of_vehicle VARCHAR(50),
+    distance_category VARCHAR(50),
+    delivery_speed VARCHAR(20),
+    Festival BOOLEAN,
+    
+    -- Measures
+    deliveries INT NOT NULL,
+    time_sum REAL,
+    time_sumsq REAL,
+    time_min REAL,
+    time_max REAL,
+    distance_count INT,
+    distance_sum REAL,
+    rating_count INT,
+    rating_sum REAL,
+    time_per_km_count INT,
+    time_per_km_sum REAL
+);
+
 -- ============================================
 -- INDEXES FOR PERFORMANCE
 -- ============================================
@@ -69,4 +128,5 @@ CREATE INDEX idx_weather ON deliveries(Weatherconditions);
 CREATE INDEX idx_traffic ON deliveries(Road_traffic_density);
 CREATE INDEX idx_time_period ON deliveries(time_period);
 CREATE INDEX idx_distance ON deliveries(delivery_distance_km);
-CREATE INDEX idx_delivery_time ON deliveries(Time_taken_min);
\ No newline at end of file
+CREATE INDEX idx_delivery_time ON deliveries(Time_taken_min);
+CREATE INDEX idx_cube_set_date ON delivery_cube(grouping_set, Order_Date);
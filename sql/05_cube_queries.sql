@@ -0,0 +1,278 @@
+-- ============================================
+-- CORE METRICS FROM THE AGGREGATE CUBE
+-- Same results as the queries of the same number in
+-- 02_core_metrics.sql and 04_advanced_queries.sql, rolled up from
+-- delivery_cube instead of scanning deliveries.
+-- ============================================
+
+-- ============================================
+-- QUERY 2: DELIVERY TIME BY CITY
+-- ============================================
+
+SELECT
+    City,
+    SUM(deliveries) as total_deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(MIN(time_min), 2) as min_time,
+    ROUND(MAX(time_max), 2) as max_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance,
+    ROUND(SUM(time_per_km_sum) / SUM(time_per_km_count), 2) as time_per_km
+FROM delivery_cube
+WHERE grouping_set = 'city'
+GROUP BY City
+ORDER BY avg_time DESC;
+
+-- ============================================
+-- QUERY 3: PEAK HOURS ANALYSIS
+-- ============================================
+
+SELECT
+    order_hour,
+    time_period,
+    SUM(deliveries) as total_orders,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_delivery_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance,
+    is_peak_hour
+FROM delivery_cube
+WHERE grouping_set = 'hour'
+GROUP BY order_hour, time_period, is_peak_hour
+ORDER BY order_hour;
+
+-- ============================================
+-- QUERY 4: DAY OF WEEK PATTERNS
+-- ============================================
+
+SELECT
+    day_name,
+    order_dayofweek,
+    is_weekend,
+    SUM(deliveries) as total_deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance
+FROM delivery_cube
+WHERE grouping_set = 'date'
+GROUP BY day_name, order_dayofweek, is_weekend
+ORDER BY order_dayofweek;
+
+-- ============================================
+-- QUERY 5: WEATHER IMPACT ON DELIVERY TIME
+-- ============================================
+
+SELECT
+    Weatherconditions,
+    weather_severity,
+    SUM(deliveries) as deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(MIN(time_min), 2) as min_time,
+    ROUND(MAX(time_max), 2) as max_time,
+    ROUND(SQRT(SUM(time_sumsq) / SUM(deliveries) - (SUM(time_sum) / SUM(deliveries)) * (SUM(time_sum) / SUM(deliveries))), 2) as std_dev
+FROM delivery_cube
+WHERE grouping_set = 'weather_traffic'
+GROUP BY Weatherconditions, weather_severity
+ORDER BY avg_time DESC;
+
+-- ============================================
+-- QUERY 6: TRAFFIC DENSITY ANALYSIS
+-- ============================================
+
+SELECT
+    Road_traffic_density,
+    traffic_level,
+    SUM(deliveries) as deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance,
+    ROUND(100.0 * SUM(deliveries) / SUM(SUM(deliveries)) OVER (), 2) as percentage
+FROM delivery_cube
+WHERE grouping_set = 'weather_traffic'
+GROUP BY Road_traffic_density, traffic_level
+ORDER BY traffic_level;
+
+-- ============================================
+-- QUERY 7: VEHICLE TYPE PERFORMANCE
+-- ============================================
+
+SELECT
+    Type_of_vehicle,
+    SUM(deliveries) as deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance,
+    ROUND(SUM(rating_sum) / SUM(rating_count), 2) as avg_rating,
+    ROUND(SUM(time_per_km_sum) / SUM(time_per_km_count), 2) as efficiency_time_per_km
+FROM delivery_cube
+WHERE grouping_set = 'vehicle'
+GROUP BY Type_of_vehicle
+ORDER BY avg_time;
+
+-- ============================================
+-- QUERY 8: DISTANCE CATEGORY ANALYSIS
+-- ============================================
+
+SELECT
+    distance_category,
+    SUM(deliveries) as deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance,
+    ROUND(MIN(time_min), 2) as min_time,
+    ROUND(MAX(time_max), 2) as max_time
+FROM delivery_cube
+WHERE grouping_set = 'distance'
+  AND distance_category IS NOT NULL
+GROUP BY distance_category
+ORDER BY
+    CASE distance_category
+        WHEN 'Very Close (<2km)' THEN 1
+        WHEN 'Close (2-5km)' THEN 2
+        WHEN 'Medium (5-10km)' THEN 3
+        WHEN 'Far (>10km)' THEN 4
+    END;
+
+-- ============================================
+-- QUERY 9: DELIVERY SPEED DISTRIBUTION
+-- ============================================
+
+SELECT
+    delivery_speed,
+    SUM(deliveries) as count,
+    ROUND(100.0 * SUM(deliveries) / SUM(SUM(deliveries)) OVER (), 2) as percentage,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance
+FROM delivery_cube
+WHERE grouping_set = 'speed'
+  AND delivery_speed IS NOT NULL
+GROUP BY delivery_speed
+ORDER BY
+    CASE delivery_speed
+        WHEN 'Very Fast' THEN 1
+        WHEN 'Fast' THEN 2
+        WHEN 'Normal' THEN 3
+        WHEN 'Slow' THEN 4
+        WHEN 'Very Slow' THEN 5
+    END;
+
+-- ============================================
+-- QUERY 10: FESTIVAL IMPACT
+-- ============================================
+
+SELECT
+    CASE WHEN Festival = 1 THEN 'Festival Day' ELSE 'Regular Day' END as day_type,
+    SUM(deliveries) as deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance,
+    ROUND(SUM(rating_sum) / SUM(rating_count), 2) as avg_rating
+FROM delivery_cube
+WHERE grouping_set = 'festival'
+GROUP BY Festival
+ORDER BY Festival DESC;
+
+-- ============================================
+-- QUERY 16: MONTHLY DELIVERY TRENDS
+-- ============================================
+
+SELECT
+    order_year,
+    order_month,
+    SUM(deliveries) as deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance
+FROM delivery_cube
+WHERE grouping_set = 'date'
+GROUP BY order_year, order_month
+ORDER BY order_year, order_month;
+
+-- ============================================
+-- QUERY 17: DAILY DELIVERY VOLUME & PERFORMANCE
+-- ============================================
+
+SELECT
+    Order_Date,
+    day_name,
+    SUM(deliveries) as deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance
+FROM delivery_cube
+WHERE grouping_set = 'date'
+GROUP BY Order_Date, day_name
+ORDER BY Order_Date;
+
+-- ============================================
+-- QUERY 18: PEAK VS NON-PEAK PERFORMANCE
+-- ============================================
+
+SELECT
+    CASE WHEN is_peak_hour = 1 THEN 'Peak Hours' ELSE 'Off-Peak' END as period_type,
+    SUM(deliveries) as deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance,
+    ROUND(SQRT(SUM(time_sumsq) / SUM(deliveries) - (SUM(time_sum) / SUM(deliveries)) * (SUM(time_sum) / SUM(deliveries))), 2) as time_std_dev
+FROM delivery_cube
+WHERE grouping_set = 'hour'
+GROUP BY is_peak_hour;
+
+-- ============================================
+-- QUERY 19: WEATHER + TRAFFIC COMBINED IMPACT
+-- ============================================
+
+SELECT
+    Weatherconditions,
+    Road_traffic_density,
+    SUM(deliveries) as deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(SUM(distance_sum) / SUM(distance_count), 2) as avg_distance
+FROM delivery_cube
+WHERE grouping_set = 'weather_traffic'
+GROUP BY Weatherconditions, Road_traffic_density
+HAVING SUM(deliveries) >= 50  -- Minimum sample size
+ORDER BY avg_time DESC
+LIMIT 20;
+
+-- ============================================
+-- QUERY 20: VEHICLE CONDITION ANALYSIS
+-- ============================================
+
+SELECT
+    Vehicle_condition,
+    Type_of_vehicle,
+    SUM(deliveries) as deliveries,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(SUM(rating_sum) / SUM(rating_count), 2) as avg_rating
+FROM delivery_cube
+WHERE grouping_set = 'vehicle'
+GROUP BY Vehicle_condition, Type_of_vehicle
+ORDER BY Vehicle_condition, avg_time;
+
+-- ============================================
+-- QUERY 22: MOVING AVERAGE (7-DAY)
+-- ============================================
+
+WITH daily_metrics AS (
+    SELECT
+        Order_Date,
+        SUM(deliveries) as deliveries,
+        SUM(time_sum) / SUM(deliveries) as avg_time
+    FROM delivery_cube
+    WHERE grouping_set = 'date'
+    GROUP BY Order_Date
+)
+SELECT
+    Order_Date,
+    deliveries,
+    ROUND(avg_time, 2) as avg_time,
+    ROUND(AVG(avg_time) OVER (
+        ORDER BY Order_Date
+        ROWS BETWEEN 6 PRECEDING AND CURRENT ROW
+    ), 2) as ma_7day
+FROM daily_metrics
+ORDER BY Order_Date;
+
+-- ============================================
+-- QUERY 23: PERCENTILE ANALYSIS (SQLite Compatible)
+-- ============================================
+
+SELECT
+    'Overall' as category,
+    ROUND(MIN(time_min), 2) as min_time,
+    ROUND(SUM(time_sum) / SUM(deliveries), 2) as avg_time,
+    ROUND(MAX(time_max), 2) as max_time,
+    SUM(deliveries) as total_deliveries
+FROM delivery_cube
+WHERE grouping_set = 'date';